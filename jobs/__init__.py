@@ -1 +1,20 @@
+import os
 
+PARSER_BACKENDS = ('html.parser', 'lxml')
+
+_parser_backend = os.environ.get('DATASOURCES_PARSER', 'html.parser')
+
+
+def set_parser_backend(name: str) -> None:
+    """
+    Select the HTML parser used by the scrapers, one of :data:`PARSER_BACKENDS`.
+    The default can be set with the environment variable ``DATASOURCES_PARSER``.
+    """
+    global _parser_backend
+    if name not in PARSER_BACKENDS:
+        raise Exception("Unknown parser backend: {}".format(name))
+    _parser_backend = name
+
+
+def get_parser_backend() -> str:
+    return _parser_backend
@@ -0,0 +1,73 @@
+"""
+Compare :func:`json.load` with :func:`jobs.jsonstream.extract` on generated SWR and Tankerkönig responses::
+
+    python3 -mjobs.bench_json [--locations 2000] [--stations 5000]
+"""
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from jobs import jsonstream
+
+CC = 'DE0008834'
+
+
+def swr_document(locations: int) -> bytes:
+    codes = [CC] + ['DE{:07d}'.format(i) for i in range(locations - 1)]
+    weather = {'temp': '21', 'humidity': '54', 'wind': '12.5', 'symbol': 'sunny', 'timestamp': '1531173610',
+               'dayForecast': {'morning': {'temp': '15'}, 'evening': {'temp': '19'}}}
+    return json.dumps({
+        'availableLocations': {cc: {'stateCode': 'BW', 'regionCode': '1', 'name': 'Freiburg ' + cc} for cc in codes},
+        'current': {cc: weather for cc in codes},
+        'forecast': {'day{}'.format(d): {cc: weather for cc in codes} for d in range(7)},
+    }).encode('utf-8')
+
+
+def tankerkoenig_document(stations: int) -> bytes:
+    return json.dumps({'ok': True, 'license': 'CC BY 4.0', 'data': 'MTS-K', 'status': 'ok', 'stations': [
+        {'id': '{:08x}-0000-0000-0000-000000000000'.format(i), 'name': 'Station {}'.format(i), 'brand': 'ARAL',
+         'street': 'Hauptstr.', 'place': 'Kehl', 'lat': 48.5, 'lng': 7.8, 'dist': 1.2, 'diesel': 1.459,
+         'e5': 1.599, 'e10': 1.539, 'isOpen': True, 'houseNumber': '1', 'postCode': 77694}
+        for i in range(stations)]}).encode('utf-8')
+
+
+def measure(func, data: bytes):
+    """:return: (seconds, peak traced bytes) of `func` applied to a file with `data`"""
+    start = time.perf_counter()
+    func(io.BytesIO(data))
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func(io.BytesIO(data))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--locations', type=int, default=2000)
+    parser.add_argument('--stations', type=int, default=5000)
+    args = parser.parse_args()
+
+    keys = frozenset(('id', 'name', 'brand', 'place', 'isOpen', 'diesel', 'e5', 'e10'))
+    cases = [
+        ('swr', swr_document(args.locations),
+         lambda f: json.load(f)['current'][CC],
+         lambda f: list(jsonstream.extract(f, ('availableLocations', CC), ('current', CC), ('forecast', '*', CC)))),
+        ('tankerkoenig', tankerkoenig_document(args.stations),
+         lambda f: [{k: s[k] for k in keys} for s in json.load(f)['stations']],
+         lambda f: list(jsonstream.extract(f, ('status',), ('stations', '*', keys)))),
+    ]
+    print("{:<14} {:>10} {:>12} {:>12} {:>12} {:>12}".format(
+        "document", "size", "json.load", "peak", "extract", "peak"))
+    for name, data, load, extract in cases:
+        load_s, load_peak = measure(load, data)
+        extract_s, extract_peak = measure(extract, data)
+        print("{:<14} {:>8.1f}MB {:>10.1f}ms {:>10.1f}MB {:>10.1f}ms {:>10.1f}MB".format(
+            name, len(data) / 1e6, load_s * 1000, load_peak / 1e6, extract_s * 1000, extract_peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the parser backends on the recorded pages in ``jobs/fixtures``::
+
+    python3 -mjobs.bench_parsers [--seconds 1.0] [--scale 200]
+
+`scale` repeats the catalog rows of the ESG page to emulate a large catalog.
+"""
+import argparse
+import os
+import re
+import time
+
+import jobs
+from jobs import clever_tanken, esg, prix_carburant
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name: str) -> bytes:
+    """:return: the content of the file `name` in :data:`FIXTURES`"""
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def scale_catalog(page: bytes, scale: int) -> bytes:
+    """:return: `page` with the catalog rows of the ESG page repeated `scale` times"""
+    rows = re.findall(rb'<tr[^>]*data-sku.*?</tr>', page, re.DOTALL)
+    start = page.index(rows[0])
+    end = page.index(rows[-1]) + len(rows[-1])
+    return page[:start] + b"\n".join(rows) * scale + page[end:]
+
+
+def bench(func, seconds: float) -> float:
+    """:return: calls of `func` per second"""
+    n = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=1.0)
+    parser.add_argument('--scale', type=int, default=200)
+    args = parser.parse_args()
+
+    pages = [
+        ('esg', lambda b, page=load_fixture('esg.html'): esg.parse(page, backend=b)),
+        ('esg x{}'.format(args.scale), lambda b, page=scale_catalog(load_fixture('esg.html'), args.scale):
+            esg.parse(page, backend=b)),
+        ('clever_tanken', lambda b, page=load_fixture('clever_tanken.html'): clever_tanken.parse(page, '0', backend=b)),
+        ('prix_carburant', lambda b, page=load_fixture('prix_carburant.html'):
+            prix_carburant.parse(page, '0', backend=b)),
+    ]
+    print("{:<20} {:>14} {:>14} {:>8}".format("page", *jobs.PARSER_BACKENDS, "gain"))
+    for name, parse in pages:
+        rates = [bench(lambda: parse(backend), args.seconds) for backend in jobs.PARSER_BACKENDS]
+        print("{:<20} {:>12.1f}/s {:>12.1f}/s {:>7.1f}x".format(name, *rates, rates[1] / rates[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+End-to-end benchmark of the jobs configured in `tab_main.json` (fetch, parse, transform, serialize to line
+protocol) on recorded responses, served by a local :class:`jobs.replay.ReplayServer`::
+
+    python3 -mjobs.bench_pipeline [--scale 10] [--rounds 3] [--output result.json] [--compare previous.json]
+
+Without ``--recordings`` the recordings are built from ``jobs/fixtures`` and generated JSON documents, `scale`
+multiplies the number of stations and catalog rows, and the station and location properties of the fuel jobs
+are pointed at them. The jobs run their configured actions, as the scheduler executes them, while the fetch and
+parse functions they call are timed (:data:`STAGES`). The rest of the action is the ``transform`` stage. The JSON
+sources parse while they read, their reads count as ``parse``. The result holds the best time per job and stage
+(``fetch``, ``parse``, ``transform``, ``serialize``) over `rounds`, so runs of different commits can be compared
+with ``--compare``.
+"""
+import argparse
+import contextlib
+import functools
+import inspect
+import json
+import os
+import subprocess
+import tempfile
+import time
+import typing
+import urllib.request
+
+import scheduler.config
+from jobs import bench_json, bench_parsers, clever_tanken, esg, jsonstream, prix_carburant, replay, swr_wetter, \
+    tankerkoenig
+from scheduler import Job, Scheduler
+from scheduler.influxdb import Dumper
+
+API_KEY = '00000000-0000-0000-0000-000000000002'
+LOCATION = (48.5, 7.8, 10)
+# jobs of tab_main.json with recordings by record_fixtures
+JOBS = ('ESG', 'Clever-Tanken', 'prix_carburant', 'SWR Wetter', 'Tankerkönig')
+# functions called by the configured actions, timed as stage
+STAGES = (('fetch', urllib.request, 'urlopen'), ('fetch', esg, 'fetch'), ('fetch', clever_tanken, 'fetch'),
+          ('fetch', prix_carburant, 'fetch'), ('parse', esg, 'parse'), ('parse', clever_tanken, 'parse'),
+          ('parse', prix_carburant, 'parse'), ('parse', jsonstream, 'extract'))
+
+Stages = typing.Dict[str, float]
+
+
+class Timer:
+    """Time per stage, a stage entered within another one is only counted for the inner stage"""
+
+    def __init__(self) -> None:
+        self.stages: Stages = {}
+        self._active: typing.List[typing.List] = []  # [stage, start] of the entered stages
+
+    def start(self, stage: str) -> None:
+        now = time.perf_counter()
+        if self._active:
+            self._add(self._active[-1][0], now - self._active[-1][1])
+        self._active.append([stage, now])
+
+    def stop(self) -> None:
+        now = time.perf_counter()
+        stage, start = self._active.pop()
+        self._add(stage, now - start)
+        if self._active:
+            self._active[-1][1] = now
+
+    def _add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def __call__(self, stage: str, func, *args):
+        self.start(stage)
+        try:
+            return func(*args)
+        finally:
+            self.stop()
+
+    def wrap(self, stage: str, func):
+        """:return: `func` timed as `stage`, including the iteration of the generators it returns"""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            result = self(stage, lambda: func(*args, **kwargs))
+            return self._generator(stage, result) if inspect.isgenerator(result) else result
+
+        return timed
+
+    def _generator(self, stage: str, generator):
+        while True:
+            self.start(stage)
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                self.stop()
+            yield item
+
+
+@contextlib.contextmanager
+def timing(timer: Timer):
+    """Time the functions of :data:`STAGES` with `timer`"""
+    originals = [(module, attribute, getattr(module, attribute)) for _, module, attribute in STAGES]
+    for stage, module, attribute in STAGES:
+        setattr(module, attribute, timer.wrap(stage, getattr(module, attribute)))
+    try:
+        yield
+    finally:
+        for module, attribute, original in originals:
+            setattr(module, attribute, original)
+
+
+def serialize(job: Job, result) -> str:
+    return "\n".join(map(str, Dumper()._convert(job, result)))
+
+
+def record_fixtures(directory: str, scale: int) -> typing.Dict[str, typing.Any]:
+    """Build recordings for all pipelines, :return: parameters of the pipelines"""
+    cassette = replay.Cassette(directory)
+    html = [('Content-Type', 'text/html; charset=utf-8')]
+    js = [('Content-Type', 'application/json')]
+
+    cassette.save('GET', esg.URL, None, 200, html,
+                  bench_parsers.scale_catalog(bench_parsers.load_fixture('esg.html'), 20 * scale))
+    stations = ['{}'.format(10000 + i) for i in range(5 * scale)]
+    for station_id in stations:
+        cassette.save('GET', clever_tanken.URL + station_id, None, 200, html,
+                      bench_parsers.load_fixture('clever_tanken.html'))
+        cassette.save('POST', prix_carburant.URL + station_id, b"", 200, html,
+                      bench_parsers.load_fixture('prix_carburant.html'))
+    cassette.save('GET', swr_wetter.URL + "?cc=" + bench_json.CC, None, 200, js,
+                  bench_json.swr_document(100 * scale))
+    lat, lng, rad = LOCATION
+    cassette.save('GET', tankerkoenig.URL.format(api_key=API_KEY, lat=lat, lng=lng, rad=rad), None, 200, js,
+                  bench_json.tankerkoenig_document(100 * scale))
+    return {'stations': stations}
+
+
+def properties(params: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """:return: job properties of `tab_main.json` pointing the fuel jobs at the recordings"""
+    stations = {station_id: "" for station_id in params['stations']}
+    lat, lng, rad = LOCATION
+    return {'Tankerkönig': {'api_key': API_KEY, 'lat': lat, 'lng': lng, 'rad': rad},
+            'Clever-Tanken': {'stations': stations},
+            'prix_carburant': {'stations': stations}}
+
+
+def run_pipelines(s: Scheduler, names: typing.Iterable[str]) -> typing.Dict[str, Stages]:
+    """Execute the actions of the jobs `names` of `s` once, :return: seconds by job and stage"""
+    results = {}
+    for name in names:
+        job = s.get_job_by_name(name)
+        t = Timer()
+        with timing(t):
+            result = t('transform', lambda: list(job.execute(s) or []))
+        t('serialize', serialize, job, result)
+        results[name] = {stage: t.stages[stage] for stage in ('fetch', 'parse', 'transform', 'serialize')
+                         if stage in t.stages}
+    return results
+
+
+def _commit() -> typing.Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(__file__)).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config', default='tab_main.json')
+    parser.add_argument('--jobs', nargs='*', default=list(JOBS), help='names of the jobs to run')
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--recordings', default=None, help='directory recorded with jobs.replay')
+    parser.add_argument('--stations', nargs='*', default=[], help='station ids recorded in --recordings')
+    parser.add_argument('--output', default=None, help='file to write the timings to as JSON')
+    parser.add_argument('--compare', default=None, help='JSON file of a previous run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.recordings or tmp
+        params = record_fixtures(directory, args.scale) if args.recordings is None \
+            else {'stations': args.stations}
+        overrides = properties(params) if args.recordings is None or args.stations else {}
+        s = Scheduler()
+        scheduler.config.ConfigLoader(args.config, s, overrides).reload()
+        unknown = [name for name in args.jobs if s.get_job_by_name(name) is None]
+        if unknown:
+            parser.error("jobs {} are not configured in {}".format(unknown, args.config))
+        best: typing.Dict[str, Stages] = {}
+        with replay.replaying(directory):
+            for _ in range(args.rounds):
+                for pipeline, stages in run_pipelines(s, args.jobs).items():
+                    for stage, seconds in stages.items():
+                        previous = best.setdefault(pipeline, {}).get(stage)
+                        best[pipeline][stage] = seconds if previous is None else min(previous, seconds)
+        s.close()
+
+    result = {'commit': _commit(), 'scale': args.scale, 'rounds': args.rounds, 'seconds': best}
+    previous = None
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)['seconds']
+
+    print("{:16} {:12} {:>10} {:>8}".format('job', 'stage', 'ms', 'change'))
+    for pipeline, stages in best.items():
+        for stage, seconds in stages.items():
+            change = ""
+            old = (previous or {}).get(pipeline, {}).get(stage)
+            if old:
+                change = "{:+.0%}".format(seconds / old - 1)
+            print("{:16} {:12} {:10.1f} {:>8}".format(pipeline, stage, seconds * 1000, change))
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
-import codecs
 import logging
+import typing
 from enum import Enum
 from html.parser import HTMLParser
 from urllib import request
 
+import jobs
+
 State = Enum('State', 'fuel_name fuel_price station_name idle')
 
 
 class Tankstelle:
+    __slots__ = ('name', 'preise', 'id')
+
     def __init__(self):
         self.name = ""
         self.preise = {}
@@ -74,26 +78,38 @@ class Parser(HTMLParser):
 URL = "http://www.clever-tanken.de/tankstelle_details/"
 
 
-def execute(station_id: str):
-    parser = Parser()
+def fetch(station_id: str) -> bytes:
+    """:return: the raw station detail page"""
     r = request.Request(URL + station_id)
     r.add_header('Host', 'www.clever-tanken.de')
     r.add_header('User-Agent', 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:30.0) Gecko/20100101 Firefox/30.0')
     try:
         with request.urlopen(r) as f:
-            f2 = codecs.getreader('utf-8')(f)
-            f2.errors = 'ignore'
-            for line in f2.readlines():
-                parser.feed(line)
-
-            tankstelle = parser.tankstelle
-            tankstelle.id = station_id
-            return tankstelle
+            return f.read()
     except Exception as e:
         logging.error("Failed for station: %s", station_id)
         raise e
 
 
+def parse(data: bytes, station_id: str, backend: typing.Optional[str] = None) -> Tankstelle:
+    """
+    :return: the station parsed from a page returned by :func:`fetch`
+    :param backend: one of :data:`jobs.PARSER_BACKENDS`, default: :func:`jobs.get_parser_backend`
+    """
+    if (backend or jobs.get_parser_backend()) == 'lxml':
+        from .lxml_backend import parse_clever_tanken
+        return parse_clever_tanken(data, station_id)
+    parser = Parser()
+    parser.feed(data.decode('utf-8', 'ignore'))
+    parser.close()
+    tankstelle = parser.tankstelle
+    tankstelle.id = station_id
+    return tankstelle
+
+
+def execute(station_id: str):
+    return parse(fetch(station_id), station_id)
+
 
 if __name__ == "__main__":
     from pprint import pprint
@@ -1,7 +1,7 @@
-import codecs
-import json
 from urllib.request import urlopen, Request
 
+from jobs import jsonstream
+
 
 def load(url: str):
     request = Request(url)
@@ -9,10 +9,8 @@ def load(url: str):
         "User-Agent",
         "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; FSL 7.0.6.01001)")
     with urlopen(request) as f:
-        f2 = codecs.getreader('utf-8')(f)
-        data = json.load(f2)
-        data = {i: data[i] for i in data if type(data[i]) in (int, float)}
-        return data
+        return {path[0]: value for path, value in jsonstream.extract(f, ('*',), scalars=True)
+                if type(value) in (int, float)}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+"""
+Concurrent polling of the status pages of many devices of one model.
+
+A :class:`Model` describes where the status page is and holds the compiled pattern that extracts the values.
+:class:`Poller` fetches the page of every host in a thread pool with a per-host timeout. Hosts that fail are
+skipped and probed again after an exponentially growing delay.
+"""
+import ipaddress
+import logging
+import time
+import typing
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler.records import NO_TAGS, Point
+
+
+class Model:
+    """
+    :param path: path of the status page
+    :param pattern: compiled pattern, every named group becomes the value of a field, converted by `convert`
+    :param measurement: format of the measurement name, with the field name and the host (dots replaced)
+    """
+
+    def __init__(self, name: str, path: str, pattern: typing.Pattern[str], measurement: str,
+                 convert: typing.Callable[[str], typing.Any] = int, encoding: str = 'utf-8') -> None:
+        self.name = name
+        self.path = path
+        self.pattern = pattern
+        self.measurement = measurement
+        self.convert = convert
+        self.encoding = encoding
+
+    def url(self, host: str) -> str:
+        return "http://{}{}".format(host, self.path)
+
+    def extract(self, text: str) -> typing.Dict[str, typing.Any]:
+        m = self.pattern.search(text)
+        if m is None:
+            return {}
+        return {field: self.convert(value) for field, value in m.groupdict().items() if value is not None}
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} {name}>".format(cls=self.__class__, name=self.name)
+
+
+def expand(hosts: typing.Iterable[str]) -> typing.List[str]:
+    """:return: `hosts` with networks (``10.1.0.0/28``) replaced by their host addresses"""
+    result = []
+    for host in hosts:
+        if '/' in host:
+            result.extend(str(address) for address in ipaddress.ip_network(host, strict=False).hosts())
+        else:
+            result.append(host)
+    return result
+
+
+class _HostState:
+    __slots__ = ('failures', 'next_probe')
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.next_probe = 0.0
+
+
+class Poller:
+    """
+    Polls `hosts` (names, addresses or networks) of `model`.
+
+    :param timeout: seconds per host
+    :param backoff: seconds until the first re-probe of a failed host, doubled per failure up to `max_backoff`
+    """
+
+    def __init__(self, model: Model, hosts: typing.Iterable[str], timeout: float = 5.0, workers: int = 16,
+                 backoff: float = 60.0, max_backoff: float = 3600.0) -> None:
+        self.model = model
+        self.hosts = expand(hosts)
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._workers = workers
+        self._states = {host: _HostState() for host in self.hosts}
+        self._names: typing.Dict[typing.Tuple[str, str], str] = {}
+
+    def _fetch(self, host: str) -> typing.Dict[str, typing.Any]:
+        request = urllib.request.Request(self.model.url(host))
+        with urllib.request.urlopen(request, timeout=self.timeout) as f:
+            return self.model.extract(f.read().decode(self.model.encoding, 'replace'))
+
+    def _name(self, field: str, host: str) -> str:
+        name = self._names.get((field, host))
+        if name is None:
+            name = self._names[(field, host)] = self.model.measurement.format(field=field,
+                                                                              host=host.replace(".", "_"))
+        return name
+
+    def up(self, now: typing.Optional[float] = None) -> typing.List[str]:
+        """:return: hosts that are polled in a cycle at `now`"""
+        now = time.monotonic() if now is None else now
+        return [host for host in self.hosts if self._states[host].next_probe <= now]
+
+    def poll(self, now: typing.Optional[float] = None) -> typing.List[Point]:
+        """:return: the values of all reachable hosts"""
+        now = time.monotonic() if now is None else now
+        hosts = self.up(now)
+        if not hosts:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self._workers, len(hosts)),
+                                thread_name_prefix="poll-" + self.model.name) as executor:
+            futures = [(host, executor.submit(self._fetch, host)) for host in hosts]
+        points = []
+        for host, future in futures:
+            state = self._states[host]
+            try:
+                values = future.result()
+            except Exception as e:
+                state.failures += 1
+                delay = min(self.backoff * 2 ** (state.failures - 1), self.max_backoff)
+                state.next_probe = now + delay
+                logging.info("Device %s unreachable (%s), next probe in %ds", host, e, delay)
+                continue
+            state.failures = 0
+            state.next_probe = 0.0
+            points.extend(Point(self._name(field, host), NO_TAGS, value) for field, value in values.items())
+        return points
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} model={model} hosts={n}>".format(cls=self.__class__, model=self.model.name,
+                                                                 n=len(self.hosts))
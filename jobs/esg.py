@@ -1,12 +1,16 @@
-import codecs
 import logging
+import typing
 import urllib.parse
 import urllib.request
 from enum import Enum
 from html.parser import HTMLParser
 
+import jobs
+
 
 class Product:
+    __slots__ = ('price', 'name', 'sku')
+
     def __init__(self):
         self.price = ""
         self.name = ""
@@ -69,17 +73,30 @@ class Parser(HTMLParser):
 URL = "http://www.edelmetall-handel.de/quickbuy/twozero/"
 
 
-def execute():
-    """Always fetches full catalog"""
+def fetch() -> bytes:
+    """:return: the raw catalog page"""
     request = urllib.request.Request(URL)
     with urllib.request.urlopen(request) as f:
-        # with open("index.html", 'rb') as f:
-        f2 = codecs.getreader('utf-8')(f)
-        f2.errors = 'ignore'
-        parser = Parser()
-        for line in f2.readlines():
-            parser.feed(line)
-        return parser.products
+        return f.read()
+
+
+def parse(data: bytes, backend: typing.Optional[str] = None):
+    """
+    :return: the products found in a catalog page returned by :func:`fetch`
+    :param backend: one of :data:`jobs.PARSER_BACKENDS`, default: :func:`jobs.get_parser_backend`
+    """
+    if (backend or jobs.get_parser_backend()) == 'lxml':
+        from .lxml_backend import parse_esg
+        return parse_esg(data)
+    parser = Parser()
+    parser.feed(data.decode('utf-8', 'ignore'))
+    parser.close()
+    return parser.products
+
+
+def execute():
+    """Always fetches full catalog"""
+    return parse(fetch())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+Normalization of fuel prices shared by the fuel sources.
+
+The sources name the same fuel differently, :data:`FUEL_NAMES` maps them to :class:`Fuel`.
+:func:`normalize` turns the raw station records of a source into columns in one pass.
+"""
+import array
+import typing
+from enum import Enum
+
+from scheduler.records import Point, make_tags
+
+
+class Fuel(Enum):
+    E5 = 'SP95-E5'
+    E10 = 'SP95-E10'
+    DIESEL = 'Diesel'
+    E85 = 'E85'
+
+
+FUEL_NAMES: typing.Dict[str, typing.Dict[str, Fuel]] = {
+    'prix_carburant': {'SP95': Fuel.E5, 'SP95-E10': Fuel.E10, 'Gazole': Fuel.DIESEL, 'E85': Fuel.E85},
+    'clever_tanken': {'Super E5': Fuel.E5, 'Super E10': Fuel.E10, 'Diesel': Fuel.DIESEL},
+    'tankerkoenig': {'e5': Fuel.E5, 'e10': Fuel.E10, 'diesel': Fuel.DIESEL},
+}
+
+# (station id, station name, fuel name -> price) as delivered by a source, prices may be strings or None
+StationRecord = typing.Tuple[str, str, typing.Mapping[str, typing.Any]]
+
+
+class FuelPrices:
+    """Prices of many stations as columns, one row per (station, fuel)"""
+    __slots__ = ('source', 'station_ids', 'names', 'fuels', 'prices')
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.station_ids: typing.List[str] = []
+        self.names: typing.List[str] = []
+        self.fuels: typing.List[Fuel] = []
+        self.prices = array.array('d')
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def points(self, prefix: str = 'tankstelle', id_prefix: typing.Optional[str] = None,
+               registry=None) -> typing.Iterator[Point]:
+        """
+        :param prefix: measurement is ``{prefix}.{fuel}``
+        :param id_prefix: the tag id is ``{id_prefix}:{station id}``, or the plain station id if None
+        :param registry: :class:`jobs.stations.Registry` with the tags of the stations, its merged stations are
+                         written to ``{registry.prefix}.{fuel}``. Prices that another source of the same station
+                         wrote already are skipped
+        """
+        own = {fuel: "{}.{}".format(prefix, fuel.value) for fuel in Fuel}
+        merged = {fuel: "{}.{}".format(registry.prefix, fuel.value) for fuel in Fuel} if registry is not None \
+            else own
+        measurements = own
+        tags = None
+        last_id = None
+        for station_id, name, fuel, price in zip(self.station_ids, self.names, self.fuels, self.prices):
+            if station_id != last_id:
+                if registry is not None:
+                    tags = registry.tags(self.source, station_id, name, id_prefix)
+                    measurements = merged if registry.is_merged(self.source, station_id) else own
+                else:
+                    tags = make_tags(name=name, id=station_id if id_prefix is None else
+                                     "{}:{}".format(id_prefix, station_id))
+                last_id = station_id
+            measurement = measurements[fuel]
+            if registry is not None and registry.is_duplicate(self.source, station_id, measurement, tags, price):
+                continue
+            yield Point(measurement, tags, price)
+
+
+def normalize(source: str, stations: typing.Iterable[StationRecord]) -> FuelPrices:
+    """
+    :param source: key of :data:`FUEL_NAMES`
+    :return: the known fuels with a price of all `stations`
+    """
+    names = FUEL_NAMES[source]
+    result = FuelPrices(source)
+    station_ids, station_names, fuels, prices = result.station_ids, result.names, result.fuels, result.prices
+    for station_id, station_name, station_prices in stations:
+        for fuel_name, price in station_prices.items():
+            fuel = names.get(fuel_name)
+            if fuel is None or price is None or price == '':
+                continue
+            try:
+                price = float(price)
+            except ValueError:  # e.g. 'Rupture de stock'
+                continue
+            station_ids.append(station_id)
+            station_names.append(station_name)
+            fuels.append(fuel)
+            prices.append(price)
+    return result
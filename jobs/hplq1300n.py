@@ -1,26 +1,17 @@
-import codecs
 import re
-import urllib.request
-from collections import namedtuple
 
-Data = namedtuple('Data', ['hostname', 'value'])
+from jobs.devices import Model, Poller
 
-URL = "http://{}/hp/device/info_suppliesStatus.html"
+MODEL = Model('hplq1300n', "/hp/device/info_suppliesStatus.html", re.compile(r">(?P<toner>[0-9]+)%<br"),
+              "hplq1300n.{field}.{host}")
 
 
-def job(host: str) -> Data:
-    url = URL.format(host)
-    name = host.replace(".", "_")
-    request = urllib.request.Request(url)
-    with urllib.request.urlopen(request) as f:
-        f2 = codecs.getreader('utf-8')(f)
-        for line in f2.readlines():
-            m = re.match(".*>([0-9]*)%<br", line)
-            if m:
-                return Data(name, int(m.groups()[0]))
+def job(*hosts: str):
+    return Poller(MODEL, hosts).poll()
 
 
 if __name__ == "__main__":
+    import sys
     from pprint import pprint
 
-    pprint(job("10.1.0.10"))
+    pprint(job(*(sys.argv[1:] or ["10.1.0.10"])))
@@ -0,0 +1,280 @@
+"""
+Incremental extraction of selected values from large JSON documents.
+
+:func:`extract` reads the document in chunks and only decodes the values whose path matches one of the
+patterns, everything else is skipped without building Python objects. Matched values are decoded with the
+C decoder of :mod:`json`.
+
+Streaming keeps the memory bounded by the chunk size and the matched values, but takes 2-3 times as long as
+:func:`json.load` of the whole document. Documents up to `stream_above` bytes are therefore decoded as a whole
+and the patterns are applied to the Python objects, only larger ones are streamed.
+
+A pattern is a tuple of path components. A component is a key, an array index, ``'*'`` (any key or index) or,
+as last component, a set of keys: the matched object is returned with these keys only::
+
+    extract(f, ('current', 'DE0008834'), ('forecast', '*', 'DE0008834'))
+    extract(f, ('status',), ('stations', '*', {'id', 'e5', 'e10', 'diesel'}))
+"""
+import codecs
+import json
+import re
+import typing
+
+Path = typing.Tuple[typing.Union[str, int], ...]
+Pattern = typing.Tuple[typing.Any, ...]
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_NON_STRUCTURAL = re.compile(r'[^"\[\]{}]*')
+_KEY = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:[ \t\n\r]*', re.DOTALL)
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,}\]])')
+_NUMBER = re.compile(r'[-+0-9.eE]*')
+_NUMBER_START = frozenset('-0123456789')
+_decoder = json.JSONDecoder()
+
+
+class _Stream:
+    def __init__(self, fp, chunk_size: int, head: typing.Union[bytes, str] = b"") -> None:
+        """:param head: data already read from `fp`"""
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = self._decoder.decode(head) if isinstance(head, bytes) else head
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = 0) -> bool:
+        """
+        Read at least `size` characters more, keeping the unconsumed rest of the buffer starting at `pos`.
+        :return: False at the end of the document
+        """
+        text = ""
+        while not self.eof and (not text or len(text) < size):
+            data = self._fp.read(max(self._chunk_size, size - len(text)))
+            if isinstance(data, bytes):
+                text += self._decoder.decode(data, final=not data)
+            else:
+                text += data
+            if not data:
+                self.eof = True
+        if text:
+            self.buf = self.buf[self.pos:] + text
+            self.pos = 0
+            return True
+        return False
+
+    def _fill_or_fail(self, size: int = 0) -> None:
+        if not self.fill(size):
+            raise ValueError("Unexpected end of JSON document")
+
+    def peek(self) -> str:
+        """:return: the next non whitespace character or "" at the end of the document"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError("Expected '{}' at position {}".format(char, self.pos))
+        self.pos += 1
+
+    def value(self) -> typing.Any:
+        if self.peek() in _NUMBER_START:
+            # a number at the end of the buffer may continue in the next chunk
+            while _NUMBER.match(self.buf, self.pos).end() == len(self.buf) and self.fill():
+                pass
+        while True:
+            try:
+                value, self.pos = _decoder.raw_decode(self.buf, self.pos)
+                return value
+            except json.JSONDecodeError:
+                # incomplete value, read as much again as is buffered to stay linear for large values
+                self._fill_or_fail(len(self.buf) - self.pos)
+
+    def key(self) -> str:
+        self.peek()
+        while True:
+            try:
+                key, end = json.decoder.scanstring(self.buf, self.pos + 1)
+                self.pos = end
+                return key
+            except json.JSONDecodeError:
+                self._fill_or_fail()
+
+    def skip(self) -> None:
+        char = self.peek()
+        if char not in '[{':
+            self.value()
+            return
+        try:
+            # values that are completely buffered are skipped fastest by the C decoder
+            _, self.pos = _decoder.raw_decode(self.buf, self.pos)
+            return
+        except json.JSONDecodeError:
+            pass
+        depth = 0
+        i = self.pos
+        while True:
+            i = _NON_STRUCTURAL.match(self.buf, i).end()
+            if i == len(self.buf):
+                self.pos = i
+                self._fill_or_fail()
+                i = self.pos
+                continue
+            char = self.buf[i]
+            if char == '"':
+                m = _STRING.match(self.buf, i)
+                if m is None:
+                    self.pos = i
+                    self._fill_or_fail()
+                    i = self.pos
+                    continue
+                i = m.end()
+            elif char in '[{':
+                depth += 1
+                i += 1
+            else:
+                depth -= 1
+                i += 1
+            if depth == 0:
+                self.pos = i
+                return
+
+
+def _matches(component, key) -> bool:
+    return component == '*' or component == key or (isinstance(component, (set, frozenset)) and key in component)
+
+
+class _Extractor:
+    def __init__(self, stream: _Stream, scalars: bool) -> None:
+        self._stream = stream
+        self._scalars = scalars
+
+    def walk(self, path: Path, live: typing.List[Pattern]) -> typing.Iterator[typing.Tuple[Path, typing.Any]]:
+        """:param live: the patterns matching `path` so far"""
+        s = self._stream
+        depth = len(path)
+        if not live:
+            s.skip()
+            return
+        if any(len(p) == depth and (not p or not isinstance(p[-1], (set, frozenset))) for p in live):
+            if self._scalars and s.peek() in '[{':
+                s.skip()
+            else:
+                yield path, s.value()
+            return
+
+        char = s.peek()
+        selection = [p[-1] for p in live if len(p) == depth + 1 and isinstance(p[-1], (set, frozenset))]
+        if selection and char == '{':
+            yield path, self._select(set().union(*selection))
+        elif char == '{':
+            s.pos += 1
+            if s.peek() == '}':
+                s.pos += 1
+                return
+            while True:
+                m = _KEY.match(s.buf, s.pos)
+                if m is not None and m.end() < len(s.buf):
+                    key = m.group(1)
+                    if '\\' in key:
+                        key = json.loads('"' + key + '"')
+                    s.pos = m.end()
+                else:  # key crosses the end of the buffer
+                    key = s.key()
+                    s.expect(':')
+                child = [p for p in live if _matches(p[depth], key)]
+                if child:
+                    yield from self.walk(path + (key,), child)
+                else:
+                    s.skip()
+                if not self._next('}'):
+                    return
+        elif char == '[':
+            s.pos += 1
+            if s.peek() == ']':
+                s.pos += 1
+                return
+            index = 0
+            while True:
+                child = [p for p in live if _matches(p[depth], index)]
+                if child:
+                    yield from self.walk(path + (index,), child)
+                else:
+                    s.skip()
+                index += 1
+                if not self._next(']'):
+                    return
+        else:
+            s.skip()
+
+    def _next(self, end: str) -> bool:
+        """:return: True if another member follows, False if the container ends with `end`"""
+        s = self._stream
+        m = _SEPARATOR.match(s.buf, s.pos)
+        if m is not None:
+            s.pos = m.end()
+            if m.group(1) == ',':
+                return True
+            if m.group(1) == end:
+                return False
+        if s.peek() == ',':
+            s.pos += 1
+            return True
+        s.expect(end)
+        return False
+
+    def _select(self, keys: typing.Set[str]) -> typing.Dict[str, typing.Any]:
+        # selected objects are records, small enough to be decoded as a whole
+        value = self._stream.value()
+        return {key: value[key] for key in keys if key in value}
+
+
+def _walk(value, path: Path, live: typing.List[Pattern],
+          scalars: bool) -> typing.Iterator[typing.Tuple[Path, typing.Any]]:
+    """:meth:`_Extractor.walk` on a decoded document"""
+    depth = len(path)
+    if any(len(p) == depth and (not p or not isinstance(p[-1], (set, frozenset))) for p in live):
+        if not (scalars and isinstance(value, (dict, list))):
+            yield path, value
+        return
+    selection = [p[-1] for p in live if len(p) == depth + 1 and isinstance(p[-1], (set, frozenset))]
+    if selection and isinstance(value, dict):
+        yield path, {key: value[key] for key in set().union(*selection) if key in value}
+        return
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for key, member in items:
+        child = [p for p in live if len(p) > depth and _matches(p[depth], key)]
+        if child:
+            yield from _walk(member, path + (key,), child, scalars)
+
+
+def extract(fp, *patterns: Pattern, chunk_size: int = 64 * 1024, scalars: bool = False,
+            stream_above: int = 1024 * 1024) -> typing.Iterator[typing.Tuple[Path, typing.Any]]:
+    """
+    :param fp: binary (UTF-8) or text file object
+    :param scalars: only report matched values that are no objects or arrays
+    :param stream_above: documents up to this size are decoded as a whole, which is faster but needs the memory
+                         of all their objects, larger ones are streamed
+    :return: (path, value) of the values matching `patterns`, in document order
+    """
+    head = []
+    size = 0
+    while size <= stream_above:
+        data = fp.read(stream_above + 1 - size)
+        if not data:
+            document = (b"" if isinstance(data, bytes) else "").join(head)
+            yield from _walk(json.loads(document), (), list(patterns), scalars)
+            return
+        head.append(data)
+        size += len(data)
+    stream = _Stream(fp, chunk_size, (b"" if isinstance(head[0], bytes) else "").join(head))
+    yield from _Extractor(stream, scalars).walk((), list(patterns))
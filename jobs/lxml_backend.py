@@ -0,0 +1,140 @@
+"""
+Parser backend for the scrapers using the C parser of lxml and precompiled XPath expressions.
+Produces the same objects as the :class:`html.parser.HTMLParser` state machines of the scrapers.
+"""
+import typing
+
+from lxml import etree, html
+
+from . import clever_tanken, esg, prix_carburant
+
+
+def _document(data: bytes):
+    text = data.decode('utf-8', 'ignore')
+    if text.strip() == "":
+        return None
+    return html.document_fromstring(text)
+
+
+def _texts(element, stop_tags: typing.Tuple[str, ...]) -> typing.Iterator[str]:
+    """
+    :return: the text pieces inside `element` in document order, up to the first end tag in `stop_tags`.
+             The state machines of the scrapers leave their state on the first matching end tag.
+    """
+    for event, el in etree.iterwalk(element, events=('start', 'end')):
+        if event == 'start':
+            if el.text:
+                yield el.text
+        elif el is element or el.tag in stop_tags:
+            return
+        elif el.tail:
+            yield el.tail
+
+
+_esg_rows = etree.XPath("//tr[@data-sku]")
+_esg_name = etree.XPath(".//h3[@class='product-name']")
+_esg_price = etree.XPath(".//span[@class='price']")
+
+
+def parse_esg(data: bytes) -> typing.List[esg.Product]:
+    products = []
+    doc = _document(data)
+    if doc is None:
+        return products
+    for row in _esg_rows(doc):
+        names, prices = _esg_name(row), _esg_price(row)
+        if not names or not prices:
+            continue
+        product = esg.Product()
+        product.sku = row.get('data-sku')
+        product.name = "".join(_texts(names[0], ('a',))).strip()
+        price = "".join(_texts(prices[0], ('span',)))
+        if not product.name or not price or not product.sku:
+            continue
+        product.price = float(price.replace(".", "").replace(",", ".").split("\xa0")[0])
+        products.append(product)
+    return products
+
+
+_clever_elements = etree.XPath(
+    "//div[@class='fuel-price-type']"
+    " | //span[@id='main-content-fuel-station-header-name' or @itemprop='http://schema.org/addressCountry']"
+    " | //span[@ng-bind='display_preis']")
+
+
+def parse_clever_tanken(data: bytes, station_id: str) -> clever_tanken.Tankstelle:
+    tankstelle = clever_tanken.Tankstelle()
+    tankstelle.id = station_id
+    doc = _document(data)
+    if doc is None:
+        return tankstelle
+    current_fuel_name = None
+    for el in _clever_elements(doc):
+        if el.tag == 'div':
+            current_fuel_name = ""
+            for text in _texts(el, ('span', 'div')):
+                current_fuel_name += text.strip().replace(':', '')
+                tankstelle.preise[current_fuel_name] = ""
+        elif el.get('ng-bind') == 'display_preis':
+            if current_fuel_name is None:
+                continue
+            preis = tankstelle.preise.get(current_fuel_name, "") + "".join(_texts(el, ('span',)))
+            preis = preis.strip()
+            if preis == "":
+                tankstelle.preise.pop(current_fuel_name, None)
+            else:
+                tankstelle.preise[current_fuel_name] = float(preis)
+            current_fuel_name = None
+        else:
+            for text in _texts(el, ('span',)):
+                if len(text.strip()) > 0:
+                    if len(tankstelle.name) > 0:
+                        tankstelle.name += " "
+                    tankstelle.name += text.strip()
+    return tankstelle
+
+
+_prix_station = etree.XPath("(//div[@id='colg'])[1]")
+_prix_pricelist = etree.XPath("(//div[@id='prix'])[1]")
+
+
+def parse_prix_carburant(data: bytes, station_id: str) -> prix_carburant.Station:
+    station = prix_carburant.Station()
+    doc = _document(data)
+    if doc is not None:
+        for colg in _prix_station(doc):
+            for text in _texts(colg, ('p',)):
+                if len(text.strip()) > 0:
+                    station.station_name += text.strip() + ". "
+        for pricelist in _prix_pricelist(doc):
+            _prix_prices(pricelist, station.prices)
+    try:
+        station.clean()
+        station.id = station_id
+        return station
+    except Exception as e:
+        raise Exception("Failed for station: {}".format(station_id), e)
+
+
+def _prix_prices(pricelist, prices: typing.Dict[str, str]) -> None:
+    """Fuel names are in <strong>, the price is the text following it up to the next <strong> or </div>"""
+    current = None
+    in_name = False
+    for event, el in etree.iterwalk(pricelist, events=('start', 'end')):
+        if event == 'start':
+            if el.tag == 'strong':
+                current, in_name = "", True
+            text = el.text
+        elif el.tag == 'div':
+            return
+        else:
+            if el.tag == 'strong':
+                in_name = False
+            text = el.tail
+        if not text or current is None:
+            continue
+        if in_name:
+            current += text.strip().replace(':', '')
+            prices[current] = ""
+        elif text.strip() != "0.000":
+            prices[current] += text.strip()
@@ -1,23 +1,24 @@
-import codecs
 import logging
 import typing
 from enum import Enum
 from html.parser import HTMLParser
 from urllib import request
 
+import jobs
+
 
 rupture = 'Rupture de stock'
 
 class Station:
+    __slots__ = ('station_name', 'prices', 'id')
+
     def __init__(self):
         self.station_name = ""
         self.prices = {}
         self.id = None
 
     def clean(self):
-        self.prices = filter(lambda kv: kv[1] != '', self.prices.items())
-        self.prices = filter(lambda kv: kv[1] != rupture, self.prices)
-        self.prices = dict(map(lambda kv: (kv[0], float(kv[1])), self.prices))
+        self.prices = {name: float(price) for name, price in self.prices.items() if price != '' and price != rupture}
 
     def __repr__(self):
         return "Prix: {} {}".format(self.station_name, self.prices)
@@ -75,8 +76,8 @@ class Parser(HTMLParser):
 URL = "https://www.prix-carburants.gouv.fr/map/recupererInfosPdv/"
 
 
-def _execute(station_id: str):
-    parser = Parser()
+def fetch(station_id: str) -> bytes:
+    """:return: the raw station info page"""
     r = request.Request(URL + station_id, data=b"")
     r.add_header('User-Agent', 'Mozilla/5.0 (X11; Linux x86_64; rv:64.0) Gecko/20100101 Firefox/64.0')
     r.add_header('X-Requested-With', 'XMLHttpRequest')
@@ -84,18 +85,30 @@ def _execute(station_id: str):
     r.add_header('Connection', 'keep-alive')
     r.add_header('Content-type', 'application/x-www-form-urlencoded; charset=UTF-8')
     with request.urlopen(r) as f:
-        # with open("info.html", 'rb') as f:
-        f2 = codecs.getreader('utf-8')(f)
-        f2.errors = 'ignore'
-        for line in f2.readlines():
-            parser.feed(line)
+        return f.read()
 
-        try:
-            prix = parser.get_prix()
-            prix.id = station_id
-            return prix
-        except Exception as e:
-            raise Exception("Failed for station: {}".format(station_id), e)
+
+def parse(data: bytes, station_id: str, backend: typing.Optional[str] = None) -> Station:
+    """
+    :return: the station parsed from a page returned by :func:`fetch`
+    :param backend: one of :data:`jobs.PARSER_BACKENDS`, default: :func:`jobs.get_parser_backend`
+    """
+    if (backend or jobs.get_parser_backend()) == 'lxml':
+        from .lxml_backend import parse_prix_carburant
+        return parse_prix_carburant(data, station_id)
+    parser = Parser()
+    parser.feed(data.decode('utf-8', 'ignore'))
+    parser.close()
+    try:
+        prix = parser.get_prix()
+        prix.id = station_id
+        return prix
+    except Exception as e:
+        raise Exception("Failed for station: {}".format(station_id), e)
+
+
+def _execute(station_id: str):
+    return parse(fetch(station_id), station_id)
 
 
 def execute(*ids) -> typing.Iterable[Station]:
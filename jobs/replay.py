@@ -0,0 +1,212 @@
+"""
+Record the HTTP responses of the jobs and replay them offline.
+
+The jobs use :func:`urllib.request.urlopen`, so both modes install a global opener::
+
+    with replay.recording('recordings'):
+        jobs.esg.execute()                  # real request, response saved in recordings/
+
+    with replay.replaying('recordings'):
+        jobs.esg.execute()                  # served by a local ReplayServer from recordings/
+
+A recording is stored as ``<key>.json`` (url, method, status, headers) and ``<key>.body``, where the key is a
+hash of method, url and request body. Query parameters named in `redact` (API keys) are masked before hashing and
+storing, so recordings can be shared and replayed with any key.
+"""
+import contextlib
+import hashlib
+import http.server
+import io
+import json
+import logging
+import os
+import threading
+import typing
+import urllib.parse
+import urllib.request
+import urllib.response
+
+REDACT = ('apikey', 'api_key')
+
+Recording = typing.Tuple[int, typing.List[typing.Tuple[str, str]], bytes]
+
+
+def redact_url(url: str, redact: typing.Iterable[str] = REDACT) -> str:
+    parts = urllib.parse.urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(k, 'REDACTED' if k in redact else v) for k, v in urllib.parse.parse_qsl(parts.query, True)]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+class Cassette:
+    """Directory of recorded responses"""
+
+    def __init__(self, directory: str, redact: typing.Iterable[str] = REDACT) -> None:
+        self.directory = directory
+        self.redact = tuple(redact)
+
+    def key(self, method: str, url: str, body: typing.Optional[bytes] = None) -> str:
+        h = hashlib.sha1("{} {}\n".format(method, redact_url(url, self.redact)).encode('utf-8'))
+        h.update(body or b"")
+        return h.hexdigest()
+
+    def save(self, method: str, url: str, body: typing.Optional[bytes], status: int,
+             headers: typing.List[typing.Tuple[str, str]], data: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.key(method, url, body)
+        path = os.path.join(self.directory, key)
+        with open(path + '.body', 'wb') as f:
+            f.write(data)
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'method': method, 'url': redact_url(url, self.redact), 'status': status,
+                       'headers': [[k, v] for k, v in headers if k.lower() != 'transfer-encoding']}, f, indent=1)
+        return key
+
+    def load(self, key: str) -> typing.Optional[Recording]:
+        path = os.path.join(self.directory, key)
+        if not os.path.exists(path + '.json'):
+            return None
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(path + '.body', 'rb') as f:
+            data = f.read()
+        return meta['status'], [(k, v) for k, v in meta['headers']], data
+
+
+class RecordHandler(urllib.request.BaseHandler):
+    """Saves every response into a :class:`Cassette`"""
+
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+
+    def http_response(self, request: urllib.request.Request, response):
+        data = response.read()
+        key = self.cassette.save(request.get_method(), request.full_url, request.data, response.status,
+                                 list(response.headers.items()), data)
+        logging.info("Recorded %s %s as %s", request.get_method(), redact_url(request.full_url), key)
+        replayed = urllib.response.addinfourl(io.BytesIO(data), response.headers, response.url, response.status)
+        replayed.msg = response.msg
+        return replayed
+
+    https_response = http_response
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    """Local stand-in server answering ``/<key>`` with the recording `key` of `cassette`"""
+    daemon_threads = True
+
+    def __init__(self, cassette: Cassette, address: typing.Tuple[str, int] = ('127.0.0.1', 0)) -> None:
+        super().__init__(address, _ReplayRequestHandler)
+        self.cassette = cassette
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return "http://{}:{}/".format(*self.server_address[:2])
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class _ReplayRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _replay(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+        recording = self.server.cassette.load(self.path.lstrip('/'))
+        if recording is None:
+            self.send_error(404, "Not recorded")
+            return
+        status, headers, data = recording
+        self.send_response(status)
+        for k, v in headers:
+            if k.lower() not in ('content-length', 'connection', 'date', 'server'):
+                self.send_header(k, v)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_HEAD = _replay
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayHandler(urllib.request.BaseHandler):
+    """Sends every request to a :class:`ReplayServer` instead of the original host"""
+    handler_order = 100  # before all other request processors
+
+    def __init__(self, server: ReplayServer) -> None:
+        self.server = server
+
+    def http_request(self, request: urllib.request.Request) -> urllib.request.Request:
+        key = self.server.cassette.key(request.get_method(), request.full_url, request.data)
+        if self.server.cassette.load(key) is None:
+            raise Exception("No recording of {} {}".format(request.get_method(), redact_url(request.full_url)))
+        method = request.get_method()
+        request.full_url = self.server.url + key
+        request.method = method
+        return request
+
+    https_request = http_request
+
+
+@contextlib.contextmanager
+def _opener(*handlers: urllib.request.BaseHandler):
+    previous = urllib.request._opener
+    urllib.request.install_opener(urllib.request.build_opener(*handlers))
+    try:
+        yield
+    finally:
+        urllib.request.install_opener(previous)
+
+
+@contextlib.contextmanager
+def recording(directory: str, redact: typing.Iterable[str] = REDACT):
+    """Record the responses of all :func:`urllib.request.urlopen` calls into `directory`"""
+    with _opener(RecordHandler(Cassette(directory, redact))):
+        yield
+
+
+@contextlib.contextmanager
+def replaying(directory: str, redact: typing.Iterable[str] = REDACT):
+    """
+    Answer all :func:`urllib.request.urlopen` calls from the recordings in `directory`, requests without
+    recording fail
+    """
+    server = ReplayServer(Cassette(directory, redact))
+    server.start()
+    try:
+        with _opener(ReplayHandler(server)):
+            yield server
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    import runpy
+    import sys
+
+    parser = argparse.ArgumentParser(description="Run a job module while recording or replaying its requests")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('directory')
+    parser.add_argument('module', help="e.g. jobs.esg")
+    parser.add_argument('args', nargs='*')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sys.argv = [args.module] + args.args
+    with (recording if args.mode == 'record' else replaying)(args.directory):
+        runpy.run_module(args.module, run_name='__main__')
@@ -0,0 +1,100 @@
+"""
+Soak test of the configured jobs: runs `tab_main.json` in simulated time against recorded responses, served by
+a local :class:`jobs.replay.ReplayServer`, and fails if the memory grows after the warmup::
+
+    python3 -mjobs.soak [--days 28] [--max-rss-growth-mb 32] [--max-traced-growth-mb 4] [--output soak.json]
+
+Without ``--recordings`` the recordings of :mod:`jobs.bench_pipeline` are used and the station and location
+properties of the fuel jobs are pointed at them. Jobs without recordings fail on every run, which soaks their
+error path. The results pass through the :class:`scheduler.control.Results` of the control endpoint and are
+formatted to line protocol, but not sent anywhere. The exit status is 1 if a limit was exceeded.
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import typing
+
+import scheduler.config
+from jobs import bench_pipeline, replay
+from scheduler import Scheduler, time_ns, timedelta_ns
+from scheduler.control import Results
+from scheduler.influxdb import Dumper, format_line
+from scheduler.memory import SimulatedClock, Soak
+
+MB = 1024 * 1024
+
+
+class Discard(Dumper):
+    """Processor formatting the results to line protocol without sending them"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines = 0
+
+    def _insert(self, lines: typing.Iterable) -> None:
+        for line in lines:
+            format_line(line)
+            self.lines += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config', default='tab_main.json')
+    parser.add_argument('--days', type=int, default=28, help='simulated days')
+    parser.add_argument('--warmup-days', type=int, default=2)
+    parser.add_argument('--sample-hours', type=int, default=24)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--recordings', default=None, help='directory recorded with jobs.replay')
+    parser.add_argument('--stations', nargs='*', default=[], help='station ids recorded in --recordings')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=32)
+    parser.add_argument('--max-traced-growth-mb', type=float, default=4)
+    parser.add_argument('--no-trace', action='store_true', help='do not trace with tracemalloc, only the RSS')
+    parser.add_argument('--output', default=None, help='file to write the samples and job statistics to as JSON')
+    parser.add_argument('--log-level', default='CRITICAL')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    clock = SimulatedClock(time_ns())
+    s = Scheduler(clock)
+    results = Results()
+    s.add_processor(results)
+    s.add_processor(Discard())
+    soak = Soak(s, clock, trace=not args.no_trace)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.recordings or tmp
+        params = bench_pipeline.record_fixtures(directory, args.scale) if args.recordings is None \
+            else {'stations': args.stations}
+        overrides = bench_pipeline.properties(params) if args.recordings is None or args.stations else {}
+        scheduler.config.ConfigLoader(args.config, s, overrides).reload()
+        with replay.replaying(directory):
+            soak.run(timedelta_ns(days=args.days), timedelta_ns(hours=args.sample_hours),
+                     timedelta_ns(days=args.warmup_days))
+        s.close()
+
+    print("{:>6} {:>8} {:>10} {:>10}".format('day', 'runs', 'rss MB', 'traced MB'))
+    for sample in soak.samples:
+        traced = "{:10.1f}".format(sample.traced / MB) if sample.traced is not None else "{:>10}".format('-')
+        print("{:6.1f} {:8} {:10.1f} {}".format((sample.t_ns - soak.samples[0].t_ns) / timedelta_ns(days=1),
+                                                sample.runs, sample.rss / MB, traced))
+    jobs = {job.name: job.memory.as_dict() for job in map(s.get_job_by_name, s.next_runs())}
+    print("{:28} {:>6} {:>14} {:>14}".format('job', 'runs', 'rss growth', 'traced growth'))
+    for name, memory in sorted(jobs.items(), key=lambda item: -item[1]['traced_growth']):
+        print("{:28} {:6} {:14,} {:14,}".format(name, memory['runs'], memory['rss_growth'], memory['traced_growth']))
+    for line in soak.growth():
+        print(line)
+
+    problems = soak.check(int(args.max_rss_growth_mb * MB), int(args.max_traced_growth_mb * MB))
+    for problem in problems:
+        print(problem)
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'days': args.days, 'runs': soak.runs, 'samples': [s._asdict() for s in soak.samples],
+                       'jobs': jobs, 'growth': soak.growth(), 'problems': problems}, f, indent=1)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
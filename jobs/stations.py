@@ -0,0 +1,137 @@
+"""
+Registry of the fuel stations of all sources, loaded from a JSON file like ``stations.json``::
+
+    {"dedup_seconds": 900,
+     "stations": [
+       {"clever_tanken": "54296", "comment": "ESSO Endingen"},
+       {"key": "aral-tiengen", "name": "ARAL Tiengen", "clever_tanken": "10355", "tankerkoenig": "5bf85d09-..."}
+     ]}
+
+An entry names the id of a station at one or more sources of :data:`jobs.fuel.FUEL_NAMES`. With ``key`` and
+``name`` the points of all its sources get the same measurement ``<Registry.prefix>.<fuel>`` (default
+``tankstelle``, also for sources that write other stations to their own prefix like ``tankerkoenig``) and the same
+tags ``id=<key>,name=<name>``, so the same physical station is one series. Without them the measurement and tags
+are those of the source, as for stations that are not registered. The tag sets are built once and shared by all
+points of a station.
+
+A price of a station with several sources that another source wrote within ``dedup_seconds`` is skipped.
+"""
+import json
+import sys
+import threading
+import time
+import typing
+
+from jobs.fuel import FUEL_NAMES
+from scheduler.records import Tags, make_tags
+
+_FIELDS = frozenset(('key', 'name', 'comment'))
+
+
+class Station(typing.NamedTuple):
+    key: typing.Optional[str]
+    name: typing.Optional[str]
+    ids: typing.Dict[str, str]  # source -> station id at the source
+    comment: typing.Optional[str] = None
+
+
+def _intern_tags(tags: Tags) -> Tags:
+    return tuple((sys.intern(k), sys.intern(v)) for k, v in tags)
+
+
+class Registry:
+    """Stations indexed by source and id, see the module documentation for the file format"""
+    # measurement prefix of the stations with key, shared by all sources
+    prefix = 'tankstelle'
+
+    def __init__(self, stations: typing.Iterable[Station] = (), dedup_seconds: float = 900.0,
+                 path: typing.Optional[str] = None) -> None:
+        self.path = path
+        self.dedup_ns = int(dedup_seconds * 1000 * 1000 * 1000)
+        self.stations: typing.List[Station] = []
+        self._index: typing.Dict[typing.Tuple[str, str], Station] = {}
+        self._tags: typing.Dict[typing.Tuple[str, str, typing.Optional[str]], Tags] = {}
+        self._lock = threading.Lock()
+        # (measurement, tags) -> (source, value, time) of the last point of stations with several sources
+        self._written: typing.Dict[typing.Tuple[str, Tags], typing.Tuple[str, float, int]] = {}
+        for station in stations:
+            self.add(station)
+
+    @classmethod
+    def load(cls, path: str) -> 'Registry':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stations = []
+        for entry in data.get('stations', []):
+            unknown = set(entry) - _FIELDS - set(FUEL_NAMES)
+            if unknown:
+                raise Exception("Unknown fields {} of station {} in {}".format(sorted(unknown), entry, path))
+            ids = {source: str(entry[source]) for source in FUEL_NAMES if source in entry}
+            stations.append(Station(entry.get('key'), entry.get('name'), ids, entry.get('comment')))
+        return cls(stations, data.get('dedup_seconds', 900.0), path)
+
+    def add(self, station: Station) -> None:
+        if not station.ids:
+            raise Exception("Station {} has no id of a source".format(station))
+        if (station.key is None) != (station.name is None):
+            raise Exception("Station {} needs both key and name, or neither".format(station))
+        for source, station_id in station.ids.items():
+            if (source, station_id) in self._index:
+                raise Exception("Station {} of {} is registered twice".format(station_id, source))
+            self._index[(source, station_id)] = station
+            if station.key is not None:
+                self._tags[(source, station_id, None)] = _intern_tags(make_tags(id=station.key, name=station.name))
+        self.stations.append(station)
+
+    def get(self, source: str, station_id: str) -> typing.Optional[Station]:
+        return self._index.get((source, station_id))
+
+    def is_merged(self, source: str, station_id: str) -> bool:
+        """:return: True if the points of the station are merged with those of its other sources"""
+        station = self._index.get((source, station_id))
+        return station is not None and station.key is not None
+
+    def ids(self, source: str) -> typing.List[str]:
+        """:return: the ids of the registered stations of `source`"""
+        return [station.ids[source] for station in self.stations if source in station.ids]
+
+    def tags(self, source: str, station_id: str, name: str, id_prefix: typing.Optional[str] = None) -> Tags:
+        """
+        :param name: the name reported by the source
+        :param id_prefix: the tag id of stations without key is ``{id_prefix}:{station id}``, or the plain id
+        :return: the shared tags of the station
+        """
+        tags = self._tags.get((source, station_id, None))
+        if tags is None:
+            tags = self._tags.get((source, station_id, name))
+        if tags is None:
+            tags = _intern_tags(make_tags(name=name, id=station_id if id_prefix is None else
+                                          "{}:{}".format(id_prefix, station_id)))
+            with self._lock:
+                self._tags[(source, station_id, name)] = tags
+        return tags
+
+    def is_duplicate(self, source: str, station_id: str, measurement: str, tags: Tags, value: float,
+                     now_ns: typing.Optional[int] = None) -> bool:
+        """
+        :return: True if another source of the station wrote `value` to the series within ``dedup_seconds``,
+                 otherwise the point is remembered as written by `source`
+        """
+        station = self._index.get((source, station_id))
+        if station is None or len(station.ids) < 2 or station.key is None:
+            return False
+        now_ns = now_ns if now_ns is not None else time.time_ns()
+        key = (measurement, tags)
+        with self._lock:
+            last = self._written.get(key)
+            if last is not None and last[0] != source and last[1] == value and now_ns - last[2] < self.dedup_ns:
+                return True
+            self._written[key] = (source, value, now_ns)
+        return False
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} path={path} stations={n}>".format(cls=self.__class__, path=repr(self.path),
+                                                                  n=len(self.stations))
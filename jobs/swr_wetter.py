@@ -1,50 +1,90 @@
-import codecs
-import json
 import re
+import sys
+import typing
 import urllib.parse
 import urllib.request
 
+from jobs import jsonstream
+from scheduler.records import NO_TAGS, Point
+
 URL = "http://www.swr.de/-/id=5491998/cf=42/did=13968954/format=json/nid=5491998/17ag7cb/index.json"
 
+SKIP_KEYS = frozenset(['timestamp', 'dayForecast'])
+NOT_AVAILABLE = "k. A."
+
+# first matching pattern converts the string value, other values are kept as strings. The types are those of the
+# series already written: "07", "0.5" and "-0.5" stay strings
+COERCION = (
+    (re.compile(r"-?[1-9][0-9]*|0"), int),
+    (re.compile(r"-?[1-9][0-9]*\.[0-9]*"), float),
+)
+
+# metric names by (region basename, section, key), reused over the polls. The forecast sections may be named by
+# date, the cache is cleared when it is full
+_names: typing.Dict[typing.Tuple[str, str, str], str] = {}
+MAX_NAMES = 4096
+
+
+def coerce(value):
+    if not isinstance(value, str):
+        return value
+    for pattern, convert in COERCION:
+        if pattern.fullmatch(value):
+            return convert(value)
+    return value
+
 
-def job(cc):
+def _name(basename: str, section: str, key: str) -> str:
+    name = _names.get((basename, section, key))
+    if name is None:
+        if len(_names) >= MAX_NAMES:
+            _names.clear()
+        name = _names[(basename, section, key)] = sys.intern("{}.{}.{}".format(basename, section, key))
+    return name
+
+
+def transform(basename: str, section: str, value_dict: typing.Dict[str, typing.Any]) -> typing.List[Point]:
+    return [Point(_name(basename, section, key), NO_TAGS, coerce(value))
+            for key, value in value_dict.items()
+            if key not in SKIP_KEYS and value != NOT_AVAILABLE]
+
+
+def job(*ccs):
     """
-    cc: id of the region. See webpage: http://www.swr.de/wetter
+    ccs: ids of the regions, all are read from a single response. See webpage: http://www.swr.de/wetter
     """
-    params = urllib.parse.urlencode({'cc': cc})
+    params = urllib.parse.urlencode({'cc': ccs[0]})
     request = urllib.request.Request(URL + "?" + params)
     request.add_header(
         "User-Agent",
         "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; FSL 7.0.6.01001)")
 
-    def transformDict(name, value_dict):
-        for (key, value) in value_dict.items():
-            if key in ['timestamp', 'dayForecast']:
-                continue
-            if value == "k. A.":
-                continue
-            elif re.match("^-?[1-9]+[0-9]*$", value) or value == "0":
-                value = int(value)
-            elif re.match("^-?[1-9]+[0-9]*.?[0-9]*$", value):
-                value = float(value)
-            yield {'name' : "{}.{}.{}".format(basename, name, key), 'value': value}
-
+    patterns = [pattern for cc in ccs for pattern in (('availableLocations', cc), ('current', cc),
+                                                      ('forecast', '*', cc))]
+    locations = {}
+    values = []
     with urllib.request.urlopen(request) as f:
-        f2 = codecs.getreader('utf-8')(f)
-        response = json.load(f2)
-        basename = "swr_wetter.{stateCode}.{regionCode}.{name}".format(
-            **response['availableLocations'][cc])
+        for path, value in jsonstream.extract(f, *patterns):
+            if path[0] == 'availableLocations':
+                locations[path[1]] = value
+            elif path[0] == 'current':
+                values.append((path[1], "current", value))
+            else:
+                values.append((path[2], "forecast." + path[1], value))
 
-        for d in transformDict("current", response['current'][cc]):
-            yield d
+    for cc in ccs:
+        if cc not in locations:
+            raise Exception("Unknown location {}".format(cc))
+    basenames = {cc: "swr_wetter.{stateCode}.{regionCode}.{name}".format(**location)
+                 for cc, location in locations.items()}
 
-        for (day, value) in response['forecast'].items():
-            value = value[cc]
-            for d in transformDict("forecast." + day, value):
-                yield d
+    points = []
+    for cc, section, value_dict in values:
+        points.extend(transform(basenames[cc], section, value_dict))
+    return points
 
 
 if __name__ == "__main__":
     from pprint import pprint
 
-    pprint(list(job("DE0008834")))
+    pprint(job(*(sys.argv[1:] or ["DE0008834"])))
@@ -1,15 +1,202 @@
+"""
+Network interface counters from ``/sys/class/net/<device>/statistics``.
+
+:class:`Sampler` keeps the counter files open and reads them with :func:`os.pread`, so a sample of all interfaces
+costs one system call per counter. Rates are computed from monotonic timestamps and aggregated to min/max/avg
+between two calls of :meth:`Sampler.collect`.
+"""
+import os
 import socket
+import threading
+import time
+import typing
+
+from scheduler.records import Point, make_tags
+
+ROOT = '/sys/class/net'
+
+Key = typing.Tuple[str, str]  # device, counter
+
+
+MAX_INCREASE = 1 << 31  # largest increase of a counter between two samples taken as a wrap
+
+
+def delta(previous: int, current: int, max_increase: int = MAX_INCREASE) -> typing.Optional[int]:
+    """
+    :return: increase of a counter, None if it was reset. A decrease is a 32 or 64 bit wrap only if `previous` was
+             within `max_increase` of the wrap and the increase is at most `max_increase`.
+    """
+    if current >= previous:
+        return current - previous
+    for wrap in (1 << 32, 1 << 64):
+        if wrap - max_increase <= previous < wrap and current + wrap - previous <= max_increase:
+            return current + wrap - previous
+    return None
+
+
+class _Aggregate:
+    __slots__ = ('min', 'max', 'sum', 'count')
+
+    def __init__(self) -> None:
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+
+
+class Sampler:
+    """
+    Samples the counters of all interfaces, or of `devices`, and computes rates per second.
+
+    :param counters: names of the statistics files, all if None
+    """
+
+    def __init__(self, devices: typing.Optional[typing.Iterable[str]] = None,
+                 counters: typing.Optional[typing.Iterable[str]] = None, root: str = ROOT) -> None:
+        self._devices = frozenset(devices) if devices is not None else None
+        self._counters = frozenset(counters) if counters is not None else None
+        self._root = root
+        self._hostname = socket.gethostname()
+        self._fds: typing.Dict[Key, int] = {}
+        self._previous: typing.Dict[Key, typing.Tuple[int, int]] = {}
+        self._aggregates: typing.Dict[Key, _Aggregate] = {}
+        self._tags: typing.Dict[str, typing.Tuple] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def scan(self) -> None:
+        """Open the counters of interfaces that appeared since the last scan"""
+        with self._lock:
+            for device in sorted(os.listdir(self._root)):
+                if self._devices is not None and device not in self._devices:
+                    continue
+                directory = os.path.join(self._root, device, 'statistics')
+                if not os.path.isdir(directory):
+                    continue
+                for counter in sorted(os.listdir(directory)):
+                    key = (device, counter)
+                    if key in self._fds or (self._counters is not None and counter not in self._counters):
+                        continue
+                    try:
+                        self._fds[key] = os.open(os.path.join(directory, counter), os.O_RDONLY)
+                    except OSError:
+                        continue
+
+    def read(self) -> typing.Dict[Key, int]:
+        """:return: current values of the open counters"""
+        values = {}
+        with self._lock:
+            for key, fd in list(self._fds.items()):
+                try:
+                    values[key] = int(os.pread(fd, 32, 0))
+                except (OSError, ValueError):
+                    # interface removed
+                    os.close(fd)
+                    del self._fds[key]
+                    self._previous.pop(key, None)
+        return values
+
+    def sample(self) -> None:
+        """Read all counters and add the rates since the previous sample to the aggregates"""
+        now_ns = time.monotonic_ns()
+        values = self.read()
+        with self._lock:
+            for key, value in values.items():
+                previous = self._previous.get(key)
+                self._previous[key] = (now_ns, value)
+                if previous is None or now_ns <= previous[0]:
+                    continue
+                increase = delta(previous[1], value)
+                if increase is None:
+                    # counter reset, e.g. the driver was reloaded
+                    continue
+                aggregate = self._aggregates.get(key)
+                if aggregate is None:
+                    aggregate = self._aggregates[key] = _Aggregate()
+                aggregate.add(increase * 1e9 / (now_ns - previous[0]))
+
+    def collect(self) -> typing.List[Point]:
+        """:return: min/max/avg rate per counter since the last call, fields of measurement sys_network.<counter>"""
+        with self._lock:
+            aggregates, self._aggregates = self._aggregates, {}
+        points = []
+        for (device, counter), aggregate in sorted(aggregates.items()):
+            tags = self._tags.get(device)
+            if tags is None:
+                tags = self._tags[device] = make_tags(hostname=self._hostname, device=device)
+            measurement = "sys_network." + counter
+            points.append(Point(measurement, tags, aggregate.min, 'min'))
+            points.append(Point(measurement, tags, aggregate.max, 'max'))
+            points.append(Point(measurement, tags, aggregate.sum / aggregate.count, 'avg'))
+        return points
+
+    def start(self, interval: float = 1.0) -> None:
+        """Sample every `interval` seconds in a background thread"""
+        self.scan()
+        self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="sys-network", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            self._previous.clear()
+
+    def _run(self, interval: float) -> None:
+        next_time = time.monotonic()
+        while True:
+            next_time += interval
+            if self._stop.wait(max(0.0, next_time - time.monotonic())):
+                return
+            self.sample()
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} root={root} counters={n}>".format(cls=self.__class__, root=repr(self._root),
+                                                                  n=len(self._fds))
+
+
+_sampler: typing.Optional[Sampler] = None
 
 
-def job(device, stat_type):
-    f = open('/sys/class/net/' + device + '/statistics/' + stat_type, 'r')
-    value = f.read()
-    ivalue = int(value.replace("\n", ""))
-    f.close()
-    return {'hostname': socket.gethostname(), 'device': device, 'stat_type': stat_type, 'value': ivalue}
+def job(interval: float = 1.0, devices: typing.Optional[typing.List[str]] = None,
+        counters: typing.Optional[typing.List[str]] = None) -> typing.List[Point]:
+    """
+    Rates of all interfaces aggregated since the previous run. The first run starts sampling every
+    `interval` seconds in the background and returns nothing.
+    """
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(devices, counters)
+        _sampler.start(interval)
+        return []
+    _sampler.scan()
+    return _sampler.collect()
 
 
 if __name__ == "__main__":
     from pprint import pprint
 
-    pprint(job("eth1", "rx_bytes"))
+    sampler = Sampler()
+    sampler.start(0.2)
+    time.sleep(2)
+    pprint(sampler.collect())
+    sampler.close()
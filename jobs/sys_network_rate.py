@@ -1,22 +1,28 @@
+import socket
+import time
 from collections import namedtuple
 
+from jobs.sys_network import ROOT, delta
+
 Data = namedtuple('Data', ['hostname', 'device', 'entry', 'value'])
+
+# (monotonic ns, value) of the previous call by (device, entry)
 temp = {}
 
-def job(device, entry, intervals):
-    global temp
-    f = open('/sys/class/net/' + device + '/statistics/' + entry, 'r')
-    value = f.read()
-    ivalue = int(value.replace("\n", ""))
-    f.close()
+
+def job(device, entry):
+    with open(ROOT + '/' + device + '/statistics/' + entry, 'r') as f:
+        ivalue = int(f.read())
+    now_ns = time.monotonic_ns()
 
     return_value = []
-    if entry in temp:
-        rate = (ivalue - temp[entry]) / intervals  # bytes/s
-        if rate > 0:
-            # prevent counter overflows
-            return_value = [Data('laer.2.localnet.cc', device, entry, rate)]
+    previous = temp.get((device, entry))
+    if previous is not None and now_ns > previous[0]:
+        increase = delta(previous[1], ivalue)
+        if increase is not None:  # None if the counter was reset
+            rate = increase * 1e9 / (now_ns - previous[0])  # per second
+            return_value = [Data(socket.gethostname(), device, entry, rate)]
 
-    temp[entry] = ivalue
+    temp[(device, entry)] = (now_ns, ivalue)
 
     return return_value
@@ -1,41 +1,212 @@
-import codecs
 import json
 import logging
+import math
+import os
+import time
 import typing
 from collections import namedtuple
 from urllib import request
 
+from jobs import jsonstream
+
 Data = namedtuple('Data', ['name', 'id', 'type', 'price'])
 
 
 URL = "https://creativecommons.tankerkoenig.de/json/list.php?lat={lat}&lng={lng}&rad={rad}&sort=dist&type=all&apikey={api_key}"
+PRICES_URL = "https://creativecommons.tankerkoenig.de/json/prices.php?ids={ids}&apikey={api_key}"
 
+FUELS = ('diesel', 'e5', 'e10')
+MAX_RADIUS = 25.0  # km, limit of list.php
+PRICES_BATCH = 10  # ids per prices.php request
 
-def execute(api_key : str, lat: float, lng : float, rad: float) -> typing.Iterable[Data]:
-    url = URL.format(api_key=api_key, rad=rad, lat=lat, lng=lng)
-    r = request.Request(url)
+StationRecord = typing.Tuple[str, str, typing.Dict[str, typing.Optional[float]]]
+
+
+_STATION_KEYS = frozenset(('id', 'name', 'brand', 'place', 'isOpen') + FUELS)
+
+
+def _list(api_key: str, lat: float, lng: float, rad: float) -> typing.List[dict]:
+    """:return: the stations around a point, with the keys :data:`_STATION_KEYS` only"""
+    data = {'stations': []}
+    with request.urlopen(request.Request(URL.format(api_key=api_key, rad=rad, lat=lat, lng=lng))) as f:
+        for path, value in jsonstream.extract(f, ('status',), ('message',), ('stations', '*', _STATION_KEYS)):
+            if path[0] == 'stations':
+                data['stations'].append(value)
+            else:
+                data[path[0]] = value
+    if not data.get('status') == 'ok':
+        raise Exception("Error %s", data.get('message'))
+    return data['stations']
+
+
+def _station_name(station: dict) -> str:
+    return "{} - {} - {}".format(station['place'], station['brand'], station['name'])
+
+
+def stations(api_key: str, lat: float, lng: float, rad: float) -> typing.Iterator[StationRecord]:
+    """:return: (id, name, {'e5': price, 'e10': price, 'diesel': price}) of the open stations, see :mod:`jobs.fuel`"""
     try:
-        with request.urlopen(r) as f:
-            f2 = codecs.getreader('utf-8')(f)
-            data = json.load(f2)
-            if not data['status'] == 'ok':
-                raise Exception("Error %s", data['message'])
-        for station in data['stations']:
-            name = "{} - {} - {}".format(station['place'], station['brand'], station['name'])
+        data = _list(api_key, lat, lng, rad)
+        for station in data:
             if not station['isOpen'] == True:
                 continue
-
-            if "diesel" in station and station['diesel'] is not None:
-                yield Data(name, station['id'], 'Diesel', station['diesel'])
-            if "e5" in station and station['e5'] is not None:
-                yield Data(name, station['id'], 'SP95-E5', station['e5'])
-            if "e10" in station and station['e10'] is not None:
-                yield Data(name, station['id'], 'SP95-E10', station['e10'])
+            yield station['id'], _station_name(station), {fuel: station.get(fuel) for fuel in FUELS}
     except Exception as e:
         logging.error("Failed for: %f %f %f", lat, lng, rad)
         raise e
 
 
+def prices(api_key: str, ids: typing.Sequence[str]) -> typing.Iterator[typing.Tuple[str, dict]]:
+    """:return: (id, {'e5': price, ...}) of the open stations in `ids`, queried in batches of :data:`PRICES_BATCH`"""
+    for i in range(0, len(ids), PRICES_BATCH):
+        batch = ids[i:i + PRICES_BATCH]
+        data = {'prices': {}}
+        with request.urlopen(request.Request(PRICES_URL.format(api_key=api_key, ids=",".join(batch)))) as f:
+            for path, value in jsonstream.extract(f, ('ok',), ('message',), ('prices', '*')):
+                if path[0] == 'prices':
+                    data['prices'][path[1]] = value
+                else:
+                    data[path[0]] = value
+        if not data.get('ok'):
+            raise Exception("Error {}".format(data.get('message')))
+        for station_id, station in data['prices'].items():
+            if station.get('status') != 'open':
+                continue
+            # prices.php reports unavailable fuels as false
+            yield station_id, {fuel: station.get(fuel) or None for fuel in FUELS}
+
+
+_KM_PER_DEGREE = 111.32
+
+
+def _to_km(lat: float, lng: float, lat0: float) -> typing.Tuple[float, float]:
+    return lng * _KM_PER_DEGREE * math.cos(math.radians(lat0)), lat * _KM_PER_DEGREE
+
+
+def _inside(x: float, y: float, polygon: typing.List[typing.Tuple[float, float]]) -> bool:
+    inside = False
+    for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+def _distance_to_segment(x, y, x1, y1, x2, y2) -> float:
+    dx, dy = x2 - x1, y2 - y1
+    t = 0.0 if dx == dy == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+
+def tiles(polygon: typing.Sequence[typing.Tuple[float, float]], rad: float = MAX_RADIUS) \
+        -> typing.List[typing.Tuple[float, float]]:
+    """
+    Cover an area with radius queries.
+
+    :param polygon: (lat, lng) corners of the area, two corners are taken as bounding box
+    :param rad: radius of one query in km
+    :return: (lat, lng) centers of circles with radius `rad` covering `polygon`
+    """
+    if len(polygon) == 2:
+        (lat1, lng1), (lat2, lng2) = polygon
+        polygon = [(lat1, lng1), (lat1, lng2), (lat2, lng2), (lat2, lng1)]
+    lat0 = sum(lat for lat, _ in polygon) / len(polygon)
+    corners = [_to_km(lat, lng, lat0) for lat, lng in polygon]
+    xs, ys = [x for x, _ in corners], [y for _, y in corners]
+    # the squares inscribed in the circles of a grid with this spacing cover the plane
+    step = rad * math.sqrt(2)
+    nx = max(1, math.ceil((max(xs) - min(xs)) / step))
+    ny = max(1, math.ceil((max(ys) - min(ys)) / step))
+    x0 = (min(xs) + max(xs) - (nx - 1) * step) / 2
+    y0 = (min(ys) + max(ys) - (ny - 1) * step) / 2
+    result = []
+    for j in range(ny):
+        for i in range(nx):
+            x, y = x0 + i * step, y0 + j * step
+            if _inside(x, y, corners) or \
+                    min(_distance_to_segment(x, y, *a, *b) for a, b in zip(corners, corners[1:] + corners[:1])) <= rad:
+                result.append((y / _KM_PER_DEGREE, x / (_KM_PER_DEGREE * math.cos(math.radians(lat0)))))
+    return result
+
+
+class StationIndex:
+    """
+    Static station data (names) of a region, optionally persisted as JSON at `path`.
+    After :func:`region` filled the index, only prices are queried until it is older than `max_age` seconds or
+    the area or radius changed.
+    """
+
+    def __init__(self, path: typing.Optional[str] = None, max_age: float = 24 * 60 * 60) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.names: typing.Dict[str, str] = {}
+        self.updated: float = 0.0
+        self.area: typing.Optional[typing.List[typing.List[float]]] = None
+        self.rad: typing.Optional[float] = None
+        if path is not None and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.names = data['names']
+            self.updated = data['updated']
+            self.area = data.get('area')
+            self.rad = data.get('rad')
+
+    def is_fresh(self, now: float, polygon: typing.Sequence[typing.Tuple[float, float]], rad: float) -> bool:
+        return bool(self.names) and now - self.updated < self.max_age and self.area == _area(polygon) and \
+            self.rad == rad
+
+    def update(self, names: typing.Dict[str, str], now: float,
+               polygon: typing.Sequence[typing.Tuple[float, float]], rad: float) -> None:
+        self.names = names
+        self.updated = now
+        self.area = _area(polygon)
+        self.rad = rad
+        if self.path is not None:
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'names': names, 'updated': now, 'area': self.area, 'rad': rad}, f)
+            os.replace(self.path + '.tmp', self.path)
+
+
+def _area(polygon: typing.Sequence[typing.Tuple[float, float]]) -> typing.List[typing.List[float]]:
+    """:return: `polygon` as stored in the JSON of :class:`StationIndex`"""
+    return [[float(lat), float(lng)] for lat, lng in polygon]
+
+
+def region(api_key: str, polygon: typing.Sequence[typing.Tuple[float, float]], index: StationIndex,
+           rad: float = MAX_RADIUS, now: typing.Optional[float] = None) -> typing.List[StationRecord]:
+    """
+    :return: (id, name, prices) of the open stations in the area covered by :func:`tiles`.
+             Stations of overlapping tiles are reported once. With a fresh `index` only prices.php is queried.
+    """
+    now = time.time() if now is None else now
+    if index.is_fresh(now, polygon, rad):
+        names = index.names
+        return [(station_id, names[station_id], station_prices)
+                for station_id, station_prices in prices(api_key, list(names))]
+
+    records = {}
+    names = {}
+    for lat, lng in tiles(polygon, rad):
+        for station in _list(api_key, lat, lng, rad):
+            if station['id'] in names:
+                continue
+            names[station['id']] = _station_name(station)
+            if station['isOpen'] == True:
+                records[station['id']] = (station['id'], names[station['id']],
+                                          {fuel: station.get(fuel) for fuel in FUELS})
+    index.update(names, now, polygon, rad)
+    return list(records.values())
+
+
+_TYPES = (('diesel', 'Diesel'), ('e5', 'SP95-E5'), ('e10', 'SP95-E10'))
+
+
+def execute(api_key : str, lat: float, lng : float, rad: float) -> typing.Iterable[Data]:
+    for station_id, name, prices in stations(api_key, lat, lng, rad):
+        for key, type in _TYPES:
+            if prices[key] is not None:
+                yield Data(name, station_id, type, prices[key])
+
+
 if __name__ == '__main__':
     import argparse
     import pprint
@@ -0,0 +1,62 @@
+import http.server
+import threading
+import unittest
+
+from jobs import devices, hplq1300n
+from scheduler.records import NO_TAGS, Point
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    level = 0
+
+    def do_GET(self):
+        data = "<html>\n<td>Black Cartridge</td><td>{}%<br></td>\n</html>".format(self.level).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(level):
+    handler = type('Handler{}'.format(level), (Handler,), {'level': level})
+    server = http.server.HTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.servers = [_serve(42), _serve(7)]
+        # port of a server that is closed again, connections are refused
+        down = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        self.down = "127.0.0.1:{}".format(down.server_port)
+        down.server_close()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_expand(self):
+        self.assertEqual(devices.expand(['10.1.0.0/30', 'printer']), ['10.1.0.1', '10.1.0.2', 'printer'])
+
+    def test_poll(self):
+        hosts = ["127.0.0.1:{}".format(server.server_port) for server in self.servers]
+        poller = devices.Poller(hplq1300n.MODEL, hosts + [self.down], timeout=2.0, backoff=10.0)
+        points = poller.poll(now=100.0)
+        self.assertEqual(points, [Point('hplq1300n.toner.' + host.replace('.', '_'), NO_TAGS, level)
+                                  for host, level in zip(hosts, (42, 7))])
+
+        # the failed host is skipped with a growing delay
+        self.assertEqual(poller.up(now=109.0), hosts)
+        self.assertEqual(poller.up(now=110.0), hosts + [self.down])
+        poller.poll(now=110.0)
+        self.assertEqual(poller.up(now=129.0), hosts)
+        self.assertEqual(poller.up(now=130.0), hosts + [self.down])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from jobs.fuel import Fuel, normalize
+from scheduler.records import Point
+
+
+class TestNormalize(unittest.TestCase):
+    def test_sources(self):
+        prices = normalize('prix_carburant', [
+            ('1', 'A', {'Gazole': '1.459', 'SP95': 1.6, 'E85': 'Rupture de stock', 'GPLc': '0.9', 'SP95-E10': ''}),
+            ('2', 'B', {'SP95-E10': '1.5'}),
+        ])
+        self.assertEqual(prices.station_ids, ['1', '1', '2'])
+        self.assertEqual(prices.fuels, [Fuel.DIESEL, Fuel.E5, Fuel.E10])
+        self.assertEqual(list(prices.prices), [1.459, 1.6, 1.5])
+
+        prices = normalize('tankerkoenig', [('x', 'C', {'e5': None, 'e10': 1.7, 'diesel': 1.5})])
+        self.assertEqual(prices.fuels, [Fuel.E10, Fuel.DIESEL])
+
+    def test_points(self):
+        prices = normalize('clever_tanken', [('10355', 'ARAL', {'Diesel': 1.459, 'Super E5': 1.599})])
+        points = list(prices.points(id_prefix='clever_tanken'))
+        tags = (('id', 'clever_tanken:10355'), ('name', 'ARAL'))
+        self.assertEqual(points, [Point('tankstelle.Diesel', tags, 1.459), Point('tankstelle.SP95-E5', tags, 1.599)])
+        self.assertIs(points[0].tags, points[1].tags)
+        self.assertEqual(list(prices.points('tankerkoenig'))[0].measurement, 'tankerkoenig.Diesel')
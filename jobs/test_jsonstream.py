@@ -0,0 +1,68 @@
+import io
+import json
+import unittest
+
+from jobs.jsonstream import extract
+
+DOCUMENT = {
+    "status": "ok",
+    "ok": True,
+    "count": 12345.678,
+    "stations": [
+        {"id": "a", "e5": 1.799, "e10": None, "name": "Aral \"Nord\"", "tags": [1, {"x": "]}"}]},
+        {"id": "b", "e5": 1.819, "e10": 1.759, "diesel": -1.5e-3},
+    ],
+    "current": {"DE0008834": {"temperature": 12, "nested": {"deep": [1, 2, 3]}}, "ä\\": 1},
+    "empty": {},
+    "none": [],
+}
+
+
+def run(*patterns, chunk_size=64 * 1024, stream_above=0, **kwargs):
+    data = json.dumps(DOCUMENT, indent=1, ensure_ascii=False).encode('utf-8')
+    return list(extract(io.BytesIO(data), *patterns, chunk_size=chunk_size, stream_above=stream_above, **kwargs))
+
+
+class TestExtract(unittest.TestCase):
+    def test_chunk_sizes(self):
+        patterns = [('status',), ('count',), ('stations', '*', 'e5'), ('current', 'DE0008834'),
+                    ('current', 'ä\\'), ('stations', 1, {'id', 'diesel', 'missing'})]
+        expected = [
+            (('status',), "ok"),
+            (('count',), 12345.678),
+            (('stations', 0, 'e5'), 1.799),
+            (('stations', 1), {'id': 'b', 'diesel': -1.5e-3}),
+            (('current', 'DE0008834'), DOCUMENT['current']['DE0008834']),
+            (('current', 'ä\\'), 1),
+        ]
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(run(*patterns, chunk_size=chunk_size), expected)
+        for stream_above in (10, 1 << 20):
+            with self.subTest(stream_above=stream_above):
+                self.assertEqual(run(*patterns, chunk_size=7, stream_above=stream_above), expected)
+
+    def test_selection(self):
+        result = run(('stations', '*', {'id', 'e10'}))
+        self.assertEqual(result, [(('stations', 0), {'id': 'a', 'e10': None}),
+                                  (('stations', 1), {'id': 'b', 'e10': 1.759})])
+
+    def test_scalars(self):
+        for stream_above in (0, 1 << 20):
+            result = run(('*',), scalars=True, chunk_size=5, stream_above=stream_above)
+            self.assertEqual(result, [(('status',), "ok"), (('ok',), True), (('count',), 12345.678)])
+
+    def test_text(self):
+        for stream_above in (0, 1 << 20):
+            result = list(extract(io.StringIO('[1, [2, 3], {"a": 4}]'), ('*', '*'), chunk_size=2,
+                                  stream_above=stream_above))
+            self.assertEqual(result, [((1, 0), 2), ((1, 1), 3), ((2, 'a'), 4)])
+
+    def test_truncated(self):
+        for stream_above in (0, 1 << 20):
+            with self.assertRaises(ValueError):
+                list(extract(io.BytesIO(b'{"a": [1, 2'), ('b',), chunk_size=4, stream_above=stream_above))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+
+import jobs
+from jobs import clever_tanken, esg, prix_carburant
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fields(obj) -> dict:
+    return {name: getattr(obj, name) for name in obj.__slots__}
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class TestHTMLParser(unittest.TestCase):
+    def test_esg(self):
+        products = esg.parse(fixture('esg.html'), backend='html.parser')
+        self.assertEqual([p.sku for p in products], ['GB001', 'GB010', 'SM001', 'SB1KG', 'PT001'])
+        self.assertEqual(products[1].name, '10 g Goldbarren & Zertifikat')
+        self.assertEqual(products[0].price, 1712.35)
+
+    def test_clever_tanken(self):
+        tankstelle = clever_tanken.parse(fixture('clever_tanken.html'), '10355', backend='html.parser')
+        self.assertEqual(tankstelle.id, '10355')
+        self.assertEqual(tankstelle.preise, {'Diesel': 1.459, 'Super E10': 1.539, 'Super E5': 1.599})
+
+    def test_prix_carburant(self):
+        station = prix_carburant.parse(fixture('prix_carburant.html'), '67116002', backend='html.parser')
+        self.assertEqual(station.station_name, 'TOTAL ACCESS. 12 Route de Strasbourg. 67116 REICHSTETT. ')
+        self.assertEqual(station.prices, {'Gazole': 1.459, 'SP95': 1.619, 'SP95-E10': 1.579})
+
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class TestLxmlParity(unittest.TestCase):
+    def assertParity(self, parse, *args):
+        for name in sorted(os.listdir(FIXTURES)):
+            if name.startswith(parse.__module__.split('.')[-1]):
+                expected = parse(fixture(name), *args, backend='html.parser')
+                actual = parse(fixture(name), *args, backend='lxml')
+                self.assertEqual(repr(actual), repr(expected), name)
+                if isinstance(expected, list):
+                    self.assertEqual([fields(a) for a in actual], [fields(e) for e in expected], name)
+                else:
+                    self.assertEqual(fields(actual), fields(expected), name)
+
+    def test_esg(self):
+        self.assertParity(esg.parse)
+
+    def test_clever_tanken(self):
+        self.assertParity(clever_tanken.parse, '10355')
+
+    def test_prix_carburant(self):
+        self.assertParity(prix_carburant.parse, '67116002')
+
+    def test_default_backend(self):
+        jobs.set_parser_backend('lxml')
+        try:
+            self.assertEqual(len(esg.parse(fixture('esg.html'))), 5)
+        finally:
+            jobs.set_parser_backend('html.parser')
+        self.assertRaises(Exception, jobs.set_parser_backend, 'bs4')
+
+    def test_empty(self):
+        self.assertEqual(esg.parse(b'', backend='lxml'), [])
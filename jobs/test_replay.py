@@ -0,0 +1,68 @@
+import http.server
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from jobs import replay
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    calls = 0
+
+    def _answer(self):
+        type(self).calls += 1
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        data = "{} {} {}".format(self.command, self.path, body.decode()).encode('utf-8')
+        self.send_response(200 if 'missing' not in self.path else 404)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+def _read(url, data=None):
+    with urllib.request.urlopen(urllib.request.Request(url, data=data)) as f:
+        return f.status, f.headers['Content-Type'], f.read()
+
+
+class TestReplay(unittest.TestCase):
+    def test_record_replay(self):
+        server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = "http://127.0.0.1:{}".format(server.server_port)
+        with tempfile.TemporaryDirectory() as directory:
+            with replay.recording(directory):
+                recorded = [_read(base + "/a?apikey=secret&x=1"), _read(base + "/b", b"q=1")]
+                with self.assertRaises(urllib.error.HTTPError):
+                    _read(base + "/missing")
+            server.shutdown()
+            server.server_close()
+            self.assertEqual(Handler.calls, 3)
+            for name in os.listdir(directory):
+                if not name.endswith('.json'):
+                    continue
+                with open(os.path.join(directory, name), 'rb') as f:
+                    self.assertNotIn(b'apikey=secret', f.read())
+
+            with replay.replaying(directory):
+                self.assertEqual(_read(base + "/a?apikey=other&x=1"), recorded[0])
+                self.assertEqual(_read(base + "/b", b"q=1"), recorded[1])
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    _read(base + "/missing")
+                self.assertEqual(cm.exception.code, 404)
+                with self.assertRaises(Exception):
+                    _read(base + "/b", b"q=2")
+            self.assertEqual(Handler.calls, 3)
+            self.assertEqual(recorded[0][2], b"GET /a?apikey=secret&x=1 ")
+
+
+if __name__ == '__main__':
+    unittest.main()
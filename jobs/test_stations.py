@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+
+from jobs.fuel import normalize
+from jobs.stations import Registry, Station
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry([
+            Station(None, None, {'clever_tanken': '54296'}, "ESSO Endingen"),
+            Station('aral-tiengen', 'ARAL Tiengen', {'clever_tanken': '10355', 'prix_carburant': '68740001',
+                                                     'tankerkoenig': '5bf85d09'}),
+        ])
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stations.json')
+            with open(path, 'w') as f:
+                json.dump({'dedup_seconds': 60, 'stations': [
+                    {'clever_tanken': '54296', 'comment': "ESSO Endingen"},
+                    {'key': 'k', 'name': 'N', 'clever_tanken': 10355, 'tankerkoenig': 'abc'}]}, f)
+            registry = Registry.load(path)
+            self.assertEqual(len(registry), 2)
+            self.assertEqual(registry.ids('clever_tanken'), ['54296', '10355'])
+            self.assertEqual(registry.get('tankerkoenig', 'abc').key, 'k')
+            self.assertEqual(registry.dedup_ns, 60 * 1000 * 1000 * 1000)
+
+            with open(path, 'w') as f:
+                json.dump({'stations': [{'clever_tanken': '1', 'adress': ''}]}, f)
+            with self.assertRaises(Exception):
+                Registry.load(path)
+        with self.assertRaises(Exception):
+            self.registry.add(Station(None, None, {'clever_tanken': '54296'}))
+
+    def test_tags(self):
+        prices = normalize('clever_tanken', [('10355', 'ARAL', {'Diesel': 1.459, 'Super E5': 1.599}),
+                                             ('54296', 'ESSO', {'Diesel': 1.479})])
+        points = list(prices.points(id_prefix='clever_tanken', registry=self.registry))
+        self.assertEqual(points[0].tags, (('id', 'aral-tiengen'), ('name', 'ARAL Tiengen')))
+        # not merged with another source: the tags of the source
+        self.assertEqual(points[2].tags, (('id', 'clever_tanken:54296'), ('name', 'ESSO')))
+        again = list(prices.points(id_prefix='clever_tanken', registry=self.registry))
+        self.assertIs(again[0].tags, points[0].tags)
+        self.assertIs(again[2].tags, points[2].tags)
+
+    def test_dedup(self):
+        clever = normalize('clever_tanken', [('10355', 'ARAL', {'Diesel': 1.459, 'Super E5': 1.599})])
+        prix = normalize('prix_carburant', [('68740001', 'Aral', {'Gazole': '1.459', 'SP95': '1.609'})])
+        self.assertEqual(len(list(clever.points(registry=self.registry))), 2)
+        # the same diesel price from the other source is written once
+        points = list(prix.points(registry=self.registry))
+        self.assertEqual([p.measurement for p in points], ['tankstelle.SP95-E5'])
+        # the own source writes it again
+        self.assertEqual(len(list(clever.points(registry=self.registry))), 2)
+
+    def test_merge_with_own_prefix(self):
+        clever = normalize('clever_tanken', [('10355', 'ARAL', {'Diesel': 1.459, 'Super E5': 1.599})])
+        tanker = normalize('tankerkoenig', [('5bf85d09', 'ARAL', {'diesel': 1.459, 'e5': 1.609}),
+                                            ('ffff', 'JET', {'diesel': 1.399})])
+        self.assertEqual({p.measurement for p in clever.points(id_prefix='clever_tanken', registry=self.registry)},
+                         {'tankstelle.Diesel', 'tankstelle.SP95-E5'})
+        points = list(tanker.points('tankerkoenig', registry=self.registry))
+        # the registered station is one series with the other sources, the diesel price was written by them
+        self.assertEqual([(p.measurement, p.tags, p.value) for p in points], [
+            ('tankstelle.SP95-E5', (('id', 'aral-tiengen'), ('name', 'ARAL Tiengen')), 1.609),
+            ('tankerkoenig.Diesel', (('id', 'ffff'), ('name', 'JET')), 1.399)])
+
+
+if __name__ == '__main__':
+    unittest.main()
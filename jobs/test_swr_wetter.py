@@ -0,0 +1,74 @@
+import http.server
+import json
+import threading
+import unittest
+
+from jobs import swr_wetter
+from scheduler.records import NO_TAGS, Point
+
+
+def _location(cc, name):
+    return {'stateCode': 'BW', 'regionCode': cc[-2:], 'name': name}
+
+
+DOCUMENT = {
+    'availableLocations': {'DE01': _location('DE01', 'Kehl'), 'DE02': _location('DE02', 'Lahr')},
+    'current': {'DE01': {'temperature': '12', 'timestamp': '1', 'wind': 'k. A.'},
+                'DE02': {'temperature': '-3.5', 'icon': 'sun'}},
+    'forecast': {'day1': {'DE01': {'max': '0', 'dayForecast': 'x'}, 'DE02': {'max': '07'}}},
+}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = json.dumps(DOCUMENT).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSwrWetter(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self._url = swr_wetter.URL
+        swr_wetter.URL = "http://127.0.0.1:{}/index.json".format(self.server.server_port)
+
+    def tearDown(self):
+        swr_wetter.URL = self._url
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_coerce(self):
+        values = ('12', '-3', '0', '1.5', '-3.5', '10.', '07', '0.5', '-0.5', '12a3', '1,5', 'sun', 3)
+        self.assertEqual([swr_wetter.coerce(v) for v in values],
+                         [12, -3, 0, 1.5, -3.5, 10.0, '07', '0.5', '-0.5', '12a3', '1,5', 'sun', 3])
+
+    def test_names_bounded(self):
+        swr_wetter._names.clear()
+        for day in range(swr_wetter.MAX_NAMES + 10):
+            swr_wetter._name('swr_wetter.BW', 'forecast.{}'.format(day), 'max')
+        self.assertLessEqual(len(swr_wetter._names), swr_wetter.MAX_NAMES)
+
+    def test_regions(self):
+        points = swr_wetter.job('DE01', 'DE02')
+        self.assertEqual(points, [
+            Point('swr_wetter.BW.01.Kehl.current.temperature', NO_TAGS, 12),
+            Point('swr_wetter.BW.02.Lahr.current.temperature', NO_TAGS, -3.5),
+            Point('swr_wetter.BW.02.Lahr.current.icon', NO_TAGS, 'sun'),
+            Point('swr_wetter.BW.01.Kehl.forecast.day1.max', NO_TAGS, 0),
+            Point('swr_wetter.BW.02.Lahr.forecast.day1.max', NO_TAGS, '07'),
+        ])
+        self.assertIs(swr_wetter.job('DE01')[0].measurement, points[0].measurement)
+
+    def test_unknown(self):
+        with self.assertRaises(Exception):
+            swr_wetter.job('DE01', 'DE99')
+
+
+if __name__ == '__main__':
+    unittest.main()
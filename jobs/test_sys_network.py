@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+
+from jobs.sys_network import Sampler, delta
+
+
+class TestSampler(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        for device in ('eth0', 'lo'):
+            os.makedirs(os.path.join(self.root.name, device, 'statistics'))
+            self.write(device, 'rx_bytes', 0)
+            self.write(device, 'tx_bytes', 0)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def write(self, device, counter, value):
+        with open(os.path.join(self.root.name, device, 'statistics', counter), 'w') as f:
+            f.write("{}\n".format(value))
+
+    def test_delta(self):
+        self.assertEqual(delta(10, 15), 5)
+        self.assertEqual(delta((1 << 32) - 10, 5), 15)
+        self.assertEqual(delta((1 << 64) - 10, 5), 15)
+        self.assertIsNone(delta(1 << 40, 5))
+        self.assertIsNone(delta(123456, 100))
+
+    def test_reset(self):
+        sampler = Sampler(counters=['rx_bytes'], devices=['eth0'], root=self.root.name)
+        sampler.scan()
+        self.write('eth0', 'rx_bytes', 10 ** 9)
+        sampler.sample()
+        time.sleep(0.01)
+        self.write('eth0', 'rx_bytes', 1000)
+        sampler.sample()
+        self.assertEqual(sampler.collect(), [])
+        time.sleep(0.01)
+        self.write('eth0', 'rx_bytes', 2000)
+        sampler.sample()
+        points = sampler.collect()
+        sampler.close()
+        self.assertEqual(len(points), 3)
+        self.assertTrue(all(0 < p.value < 10 ** 9 for p in points))
+
+    def test_rates(self):
+        sampler = Sampler(counters=['rx_bytes'], root=self.root.name)
+        sampler.scan()
+        self.assertEqual(sorted(sampler.read()), [('eth0', 'rx_bytes'), ('lo', 'rx_bytes')])
+        sampler.sample()
+        for value in (1000, 5000):
+            time.sleep(0.01)
+            self.write('eth0', 'rx_bytes', value)
+            sampler.sample()
+        points = sampler.collect()
+        sampler.close()
+
+        eth0 = {p.field: p.value for p in points if ('device', 'eth0') in p.tags}
+        lo = {p.field: p.value for p in points if ('device', 'lo') in p.tags}
+        self.assertEqual({p.measurement for p in points}, {'sys_network.rx_bytes'})
+        self.assertLess(eth0['min'], eth0['max'])
+        self.assertTrue(eth0['min'] <= eth0['avg'] <= eth0['max'])
+        self.assertGreater(eth0['min'], 0)
+        self.assertEqual(lo, {'min': 0.0, 'max': 0.0, 'avg': 0.0})
+        self.assertEqual(sampler.collect(), [])
+
+    def test_removed_device(self):
+        sampler = Sampler(root=self.root.name)
+        sampler.scan()
+        self.write('lo', 'rx_bytes', '')
+        self.assertEqual(sorted(sampler.read()), [('eth0', 'rx_bytes'), ('eth0', 'tx_bytes'), ('lo', 'tx_bytes')])
+        sampler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import time
+import unittest
+
+from jobs import sys_network_rate
+
+
+class TestJob(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.root.name, 'eth0', 'statistics'))
+        self.old_root = sys_network_rate.ROOT
+        sys_network_rate.ROOT = self.root.name
+        sys_network_rate.temp.clear()
+
+    def tearDown(self):
+        sys_network_rate.ROOT = self.old_root
+        sys_network_rate.temp.clear()
+        self.root.cleanup()
+
+    def run_job(self, value):
+        with open(os.path.join(self.root.name, 'eth0', 'statistics', 'rx_bytes'), 'w') as f:
+            f.write("{}\n".format(value))
+        time.sleep(0.001)
+        return sys_network_rate.job('eth0', 'rx_bytes')
+
+    def test_reset(self):
+        self.assertEqual(self.run_job(10 ** 9), [])
+        self.assertGreater(self.run_job(10 ** 9 + 1000)[0].value, 0)
+        # counter reset, no rate until the next value
+        self.assertEqual(self.run_job(500), [])
+        result = self.run_job(1500)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(0 < result[0].value < 10 ** 9 / 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
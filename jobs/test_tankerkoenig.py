@@ -0,0 +1,98 @@
+import http.server
+import json
+import math
+import os
+import tempfile
+import threading
+import unittest
+import urllib.parse
+
+from jobs import tankerkoenig
+
+
+def _station(station_id, lat, lng):
+    return {'id': station_id, 'name': 'Station ' + station_id, 'brand': 'ARAL', 'place': 'Kehl', 'isOpen': True,
+            'lat': lat, 'lng': lng, 'e5': 1.6, 'e10': 1.5, 'diesel': 1.4}
+
+
+STATIONS = [_station(str(i), 48.5 + i * 0.05, 7.8 + i * 0.05) for i in range(6)]
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        self.requests.append((url.path, query))
+        if url.path == '/list.php':
+            # every station is in every tile, the overlap is deduplicated by the client
+            body = {'status': 'ok', 'stations': STATIONS}
+        else:
+            ids = query['ids'][0].split(',')
+            body = {'ok': True, 'prices': {i: {'status': 'open', 'e5': 1.7, 'e10': False, 'diesel': 1.3}
+                                           for i in ids}}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTiles(unittest.TestCase):
+    def test_cover(self):
+        area = [(48.4, 7.7), (48.8, 8.2)]
+        centers = tankerkoenig.tiles(area, 10.0)
+        self.assertGreater(len(centers), 1)
+        for lat in (48.4, 48.6, 48.8):
+            for lng in (7.7, 7.95, 8.2):
+                distance = min(math.hypot((lat - c_lat) * 111.32,
+                                          (lng - c_lng) * 111.32 * math.cos(math.radians(48.6)))
+                               for c_lat, c_lng in centers)
+                self.assertLessEqual(distance, 10.0)
+
+    def test_single(self):
+        self.assertEqual(len(tankerkoenig.tiles([(48.6, 7.9), (48.61, 7.91)], 25.0)), 1)
+
+
+class TestRegion(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.urls = tankerkoenig.URL, tankerkoenig.PRICES_URL
+        tankerkoenig.URL = base + "/list.php?lat={lat}&lng={lng}&rad={rad}&apikey={api_key}"
+        tankerkoenig.PRICES_URL = base + "/prices.php?ids={ids}&apikey={api_key}"
+        Handler.requests = []
+
+    def tearDown(self):
+        tankerkoenig.URL, tankerkoenig.PRICES_URL = self.urls
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_region(self):
+        index = tankerkoenig.StationIndex()
+        area = [(48.4, 7.7), (48.8, 8.2)]
+        records = tankerkoenig.region('key', area, index, rad=10.0, now=1000.0)
+        self.assertEqual(sorted(r[0] for r in records), [s['id'] for s in STATIONS])
+        self.assertEqual(len(Handler.requests), len(tankerkoenig.tiles(area, 10.0)))
+        self.assertEqual(index.names['0'], 'Kehl - ARAL - Station 0')
+
+        Handler.requests = []
+        records = tankerkoenig.region('key', area, index, rad=10.0, now=2000.0)
+        self.assertEqual([path for path, _ in Handler.requests], ['/prices.php'])
+        self.assertEqual(records[0], ('0', 'Kehl - ARAL - Station 0', {'diesel': 1.3, 'e5': 1.7, 'e10': None}))
+        self.assertIs(records[0][1], index.names['0'])
+
+        # a changed area or radius is queried again, also after loading the saved index
+        with tempfile.TemporaryDirectory() as tmp:
+            index = tankerkoenig.StationIndex(os.path.join(tmp, 'index.json'))
+            tankerkoenig.region('key', area, index, rad=10.0, now=1000.0)
+            for changed_area, rad in ((area, 10.0), ([(48.4, 7.7), (48.6, 8.0)], 10.0), (area, 5.0)):
+                Handler.requests = []
+                tankerkoenig.region('key', changed_area, tankerkoenig.StationIndex(index.path), rad=rad, now=2000.0)
+                self.assertEqual(Handler.requests[0][0], '/prices.php' if rad == 10.0 and changed_area is area
+                                 else '/list.php')
@@ -1,13 +1,19 @@
-import calendar
+import collections
+import concurrent.futures
 import datetime
+import heapq
 import inspect
+import itertools
 import logging
 import re
 import reprlib
-import sched
+import threading
 import time
 import typing
 
+from .logs import lazy
+from .memory import JobMemory
+
 
 def time_ns() -> int:
     """:return: the current time in nanoseconds"""
@@ -30,11 +36,33 @@ def sleep_ns(t) -> None:
     time.sleep(t / 1000 / 1000 / 1000)
 
 
+def chunks(result, size: int) -> typing.Iterator[typing.Any]:
+    """
+    :return: `result` in parts for the processors. Iterators (generators, :func:`map`, ...) are read in lists of up
+             to `size` items, so every processor sees all items without the whole result in memory. Other results
+             are passed as they are. At least one part is returned, empty if the iterator was empty
+    """
+    if not isinstance(result, typing.Iterator):
+        yield result
+        return
+    chunk = list(itertools.islice(result, size))
+    yield chunk
+    while len(chunk) == size:
+        chunk = list(itertools.islice(result, size))
+        if chunk:
+            yield chunk
+
+
 class Job(object):
     """Base-Class for jobs that are scheduled in :class:`Scheduler`"""
     def __init__(self, name: str, **kwargs) -> None:
         self.name: str = name
         self.properties = kwargs
+        # planned and actual start of the current or last execution
+        self.planned_ns: typing.Optional[int] = None
+        self.started_ns: typing.Optional[int] = None
+        self.memory = JobMemory()
+        self._repr_cache: typing.Optional[str] = None
         self._execute_funcs: typing.List[typing.Callable[..., typing.Any]] = []
 
     def next(self, start_ns: int, t_ns: int, t_max_ns: int) -> typing.Optional[int]:
@@ -63,14 +91,17 @@ class Job(object):
                 return e(scheduler, self)
 
     def __repr__(self) -> str:
-        return "<{cls.__name__} name={name} {conf}>".format(cls=self.__class__, name=repr(self.name),
-                                                            conf=self.__repr_config__())
+        # jobs are not changed after they were added, the repr is built once for all log lines
+        if self._repr_cache is None:
+            self._repr_cache = "<{cls.__name__} name={name} {conf}>".format(cls=self.__class__, name=repr(self.name),
+                                                                            conf=self.__repr_config__())
+        return self._repr_cache
 
     def __repr_config__(self) -> str:
         return " "
 
 
-def every(seconds: int = 0, minutes: int = 0, hours: int = 0, name='Unnamed-Job', action=None) -> Job:
+def every(seconds: int = 0, minutes: int = 0, hours: int = 0, name='Unnamed-Job', action=None, **kwargs) -> Job:
     """
     Run a job in intervals.
 
@@ -79,12 +110,13 @@ def every(seconds: int = 0, minutes: int = 0, hours: int = 0, name='Unnamed-Job'
     :param hours: add hours to the interval. Default: 0
     :param name: Name of the Job
     :param action: a function to be executed, see :func:`Job.execute`
+    :param kwargs: properties of the job, e.g. ``cpu_heavy=True``
     :return: The job to be added to :class:`Scheduler`
     """
     n = seconds * 1000 * 1000 * 1000 + \
         minutes * 1000 * 1000 * 1000 * 60 + \
         hours * 1000 * 1000 * 1000 * 60 * 60
-    j = PeriodicJob(name, n)
+    j = PeriodicJob(name, n, **kwargs)
     j.add_action(action)
     return j
 
@@ -131,73 +163,92 @@ def make_test_expr(expr: str) -> typing.Callable[[int], bool]:
             raise Exception("More complex cron expression is not supported")
 
     exprs = expr.split(',')
-    if len(expr) == 1:
+    if len(exprs) == 1:
         return parse(expr)
     else:
-        funcs = map(parse, exprs)
+        funcs = list(map(parse, exprs))
         return lambda val: any(map(lambda func: func(val), funcs))
 
 
-def _generator(timedelta_func, datetime_func, expr_func):
-    def f(start_ns: int, stop_ns: int):
-        dt = datetime_from_ns(start_ns)
-        while int(dt.timestamp() * 1000 * 1000 * 1000) < stop_ns:
-            _dt = datetime_func(dt)
-            delta = timedelta_func(_dt)
-            # print("{}           -       {}".format(_dt, delta))
-            t_ns = int(dt.timestamp() * 1000 * 1000 * 1000)
-            if t_ns >= start_ns and expr_func(_dt):
-                yield (int(dt.timestamp() * 1000 * 1000 * 1000),
-                       int(((_dt + delta - datetime.timedelta(minutes=1)).timestamp() * 1000 * 1000 * 1000)))
-            dt = _dt + delta
+def _values(expr: str, first: int, last: int) -> typing.Tuple[int, ...]:
+    """:return: the values from `first` to `last` matching the cron field `expr`, sorted"""
+    test = make_test_expr(expr)
+    return tuple(value for value in range(first, last + 1) if test(value))
+
 
-    return f
+def _local_ns(day: datetime.date, hour: int = 0, minute: int = 0) -> int:
+    """
+    :return: the local wall time `hour`:`minute` on `day` in nanoseconds. A time that occurs twice when the clock
+             is set back is its first occurrence, a time skipped when the clock is set forward is moved past the gap
+    """
+    return int(datetime.datetime(day.year, day.month, day.day, hour, minute).timestamp()) * 1000 * 1000 * 1000
 
 
-def combine(start_ns: int, stop_ns: int, funcs):
-    f = funcs[0]
-    for (_start_ns, stop_ns) in f(start_ns, stop_ns):
-        # print("{}: {} {}  -> {} {}".format(repr(f), _start_ns, datetime_from_ns(start_ns), stop_ns, datetime_from_ns(stop_ns)))
-        if (len(funcs)) > 1:
-            r = combine(_start_ns, stop_ns, funcs[1:])
-            if r is not None:
-                return r
-        elif _start_ns >= start_ns:
-            # print("Found {} ".format(start_ns))
-            return _start_ns
+def _utc_offset(t_ns: int) -> int:
+    return time.localtime(t_ns // (1000 * 1000 * 1000)).tm_gmtoff
 
 
 class CronJob(Job):
+    """
+    Job running at the local wall times matching the cron fields. The fire times of :attr:`cache_days` days
+    ahead are computed at once and consumed by :meth:`next`, they are computed again when the clock was set back
+    or the UTC offset changed (daylight saving time, time zone).
+    """
+    cache_days: int = 1
+    # bound of the search for the next fire time of rare schedules, e.g. the 29th of February
+    max_search_days: int = 366 * 8
+
     def __init__(self, name: str, minute: str, hour: str, dow: str, dom: str, month: str, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.minute = minute
-        self.minute_f = _generator(lambda dt: datetime.timedelta(minutes=1),
-                                   lambda dt: datetime.datetime(year=dt.year, month=dt.month, day=dt.day,
-                                                                hour=dt.hour, minute=dt.minute),
-                                   lambda dt: make_test_expr(minute)(dt.minute))
         self.hour = hour
-        self.hour_f = _generator(lambda dt: datetime.timedelta(hours=1),
-                                 lambda dt: datetime.datetime(year=dt.year, month=dt.month, day=dt.day, hour=dt.hour),
-                                 lambda dt: make_test_expr(hour)(dt.hour))
         self.dow = dow
-        self.dow_f = _generator(lambda dt: datetime.timedelta(days=1),
-                                lambda dt: datetime.datetime(year=dt.year, month=dt.month, day=dt.day),
-                                lambda dt: make_test_expr(dow)(dt.isoweekday()))
         self.dom = dom
-        self.dom_f = _generator(lambda dt: datetime.timedelta(days=1),
-                                lambda dt: datetime.datetime(year=dt.year, month=dt.month, day=dt.day),
-                                lambda dt: make_test_expr(dom)(dt.day))
         self.month = month
-        self.month_f = _generator(lambda dt: datetime.timedelta(days=calendar.monthrange(dt.year, dt.month)[1]),
-                                  lambda dt: datetime.datetime(year=dt.year, month=dt.month, day=1),
-                                  lambda dt: make_test_expr(month)(dt.month))
+        self._minutes = _values(minute, 0, 59)
+        self._hours = _values(hour, 0, 23)
+        self._dows = frozenset(_values(dow, 1, 7))
+        self._doms = frozenset(_values(dom, 1, 31))
+        self._months = frozenset(_values(month, 1, 12))
+        self._cache: typing.Deque[int] = collections.deque()
+        self._cache_end_ns = 0  # all fire times before are in the cache
+        self._cache_offset: typing.Optional[int] = None
+        self._last_ns = 0
+
+    def _day(self, day: datetime.date) -> typing.List[int]:
+        """:return: the fire times on `day`"""
+        if day.month not in self._months or day.day not in self._doms or day.isoweekday() not in self._dows:
+            return []
+        start_ns = _local_ns(day)
+        if _local_ns(day + datetime.timedelta(days=1)) - start_ns == timedelta_ns(days=1):
+            minute_ns = timedelta_ns(minutes=1)
+            return [start_ns + (hour * 60 + minute) * minute_ns for hour in self._hours for minute in self._minutes]
+        # the clock is changed on this day
+        return sorted(set(_local_ns(day, hour, minute) for hour in self._hours for minute in self._minutes))
+
+    def _fill(self, t_ns: int) -> None:
+        """Compute the fire times after `t_ns` until the end of :attr:`cache_days` days ahead, at least one"""
+        self._cache.clear()
+        self._cache_offset = _utc_offset(t_ns)
+        day = datetime_from_ns(t_ns).date()
+        for i in range(self.max_search_days):
+            self._cache.extend(n for n in self._day(day) if n > t_ns)
+            day += datetime.timedelta(days=1)
+            if self._cache and i >= self.cache_days:
+                break
+        self._cache_end_ns = _local_ns(day)
 
     def next(self, start_ns: int, t_ns: int, t_max_ns: int):
         stop_ns = t_ns + t_max_ns
-        t_ns = t_ns - t_ns % (1000 * 1000 * 1000) # round current timestamp down to minutes
-        n = combine(t_ns + timedelta_ns(minutes=1), stop_ns,
-                    [self.month_f, self.dom_f, self.dow_f, self.hour_f, self.minute_f])
-        return n
+        while self._cache and self._cache[0] <= t_ns:
+            self._cache.popleft()
+        if not self._cache or t_ns < self._last_ns or t_ns >= self._cache_end_ns or \
+                _utc_offset(t_ns) != self._cache_offset:
+            self._fill(t_ns)
+        self._last_ns = t_ns
+        if self._cache and self._cache[0] < stop_ns:
+            return self._cache[0]
+        return None
 
     def __repr_config__(self):
         return " minute={_.minute} hour={_.hour} dow={_.dow} dom={_.dom} month={_.month}".format(_=self)
@@ -219,82 +270,373 @@ def cron(cron_expr: str, name='Unnamed-Job', action=None, **kwargs):
     return at(minute, hour, day_of_week, day_of_month, month, name, action, **kwargs)
 
 
-# noinspection PyProtectedMember
+class _Entry:
+    """
+    A planned run in the queue of :class:`Scheduler`, cancelled entries stay in the heap and are skipped.
+
+    :param reschedule: plan the next run after this one, None to only plan the next run without executing
+    """
+    __slots__ = ('time_ns', 'job', 'planned_ns', 'reschedule', 'cancelled')
+
+    def __init__(self, time_ns: int, job: Job, planned_ns: typing.Optional[int],
+                 reschedule: typing.Optional[bool]) -> None:
+        self.time_ns = time_ns
+        self.job = job
+        self.planned_ns = planned_ns
+        self.reschedule = reschedule
+        self.cancelled = False
+
+
 class Scheduler(object):
-    def __init__(self):
-        self._scheduler = sched.scheduler(timefunc=time_ns, delayfunc=sleep_ns)
-        self._jobs : typing.Dict[Job, typing.Optional[int, None]] = {}
+    # upper bound of a single wait, so the wall clock is checked again after it was set
+    max_wait_ns: int = 1000 * 1000 * 1000 * 60
+
+    def __init__(self, clock: typing.Callable[[], int] = time_ns):
+        """:param clock: current time in nanoseconds, e.g. a :class:`scheduler.memory.SimulatedClock`"""
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue: typing.List[typing.Tuple[int, int, _Entry]] = []
+        self._counter = itertools.count()
+        self._jobs : typing.Dict[Job, typing.Optional[_Entry]] = {}
         self._processors : typing.List[typing.Callable[[Job, typing.Any], None]] = []
-        self._time_start_ns :int = time_ns()
+        self._chunk_size: int = 1000
+        self._time_start_ns :int = clock()
         self._lookahead_ns : int = 1000 * 1000 * 1000 * 60 * 120
         self._repr = reprlib.Repr()
+        self._processes: int = 0
+        self._pool: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._shard = None
+        self._pending_now: typing.Set[Job] = set()
+        self._priming: typing.Set[Job] = set()
+        self._running = False
+        self._drain = False
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def set_shard(self, shard) -> None:
+        """
+        Share the jobs with other schedulers, see :class:`scheduler.sharding.Shard`. Only the runs claimed by
+        `shard` are executed. Periodic jobs are aligned to the epoch instead of the scheduler start, so all nodes
+        plan the same runs. Jobs added before are planned again.
+        """
+        with self._lock:
+            self._shard = shard
+            self._time_start_ns = 0 if shard is not None else self._clock()
+            now_ns = self._clock()
+            for job, entry in list(self._jobs.items()):
+                if entry is None:
+                    continue
+                entry.cancelled = True
+                entry = self._jobs[job] = self._plan(job, now_ns)
+                self._queue.append((entry.time_ns, next(self._counter), entry))
+            heapq.heapify(self._queue)
+            self._wakeup.notify_all()
+
+    def set_worker_processes(self, processes: int) -> None:
+        """
+        Enable parsing in worker processes for jobs with the property ``cpu_heavy``, see :func:`cpu_map`.
 
-    def remove_job_by_name(self, name : str):
-        with self._scheduler._lock:
-            remove = []
-            for job in filter(lambda j: j.name == name, self._jobs.keys()):
-                remove.append(job)
-                self._scheduler.cancel(self._jobs[job])
+        :param processes: number of worker processes, 0 disables the pool
+        """
+        with self._lock:
+            self._processes = processes
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
 
+    def cpu_map(self, job: Job, func: typing.Callable[..., typing.Any], *iterables) -> typing.Iterator[typing.Any]:
+        """
+        Like :func:`map`, but runs `func` in worker processes if `job` is marked ``cpu_heavy`` and worker processes
+        are enabled. Arguments and results are pickled, `func` must be a module level function.
+        Items are submitted as soon as they are produced by `iterables`, so fetching in the calling process overlaps
+        with parsing in the workers. Results are returned in order.
+        """
+        if self._processes > 0 and job.properties.get('cpu_heavy', False):
+            with self._lock:
+                if self._pool is None:
+                    self._pool = concurrent.futures.ProcessPoolExecutor(self._processes)
+                pool = self._pool
+            return pool.map(func, *iterables)
+        return map(func, *iterables)
+
+    def close(self) -> None:
+        """Shut down worker processes"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def remove_job_by_name(self, name : str):
+        with self._lock:
+            remove = [job for job in self._jobs.keys() if job.name == name]
             for job in remove:
-                del self._jobs[job]
+                entry = self._jobs.pop(job)
+                if entry is not None:
+                    entry.cancelled = True
+            self._wakeup.notify_all()
 
     def get_job_by_name(self, name : str) -> typing.Optional[Job]:
-        with self._scheduler._lock:
+        with self._lock:
             for job in filter(lambda j: j.name == name, self._jobs.keys()):
                 return job
         return None
 
     def add_job(self, job: Job):
-        with self._scheduler._lock:
+        with self._lock:
             if job.name in map(lambda j: j.name, self._jobs.keys()):
                 raise Exception("Job with name '{}' exists".format(job.name))
             self._jobs[job] = None
             self._schedule_job_run(job)
             return self
 
+    def add_jobs(self, jobs: typing.Iterable[Job]):
+        """Add several jobs, e.g. on startup. Their first runs are planned from one time and queued at once"""
+        jobs = list(jobs)
+        with self._lock:
+            names = set(job.name for job in self._jobs)
+            for job in jobs:
+                if job.name in names:
+                    raise Exception("Job with name '{}' exists".format(job.name))
+                names.add(job.name)
+            now_ns = self._clock()
+            for job in jobs:
+                entry = self._jobs[job] = self._plan(job, now_ns)
+                self._queue.append((entry.time_ns, next(self._counter), entry))
+            heapq.heapify(self._queue)
+            self._wakeup.notify_all()
+            return self
+
+    def prime(self, names: typing.Optional[typing.Iterable[str]] = None, workers: int = 4,
+              timeout: typing.Optional[float] = None) -> typing.Dict[str, bool]:
+        """
+        Execute the jobs `names` (default: all) once now, up to `workers` at the same time, e.g. after a deploy
+        before :meth:`start`. Their schedule is not changed. The results are passed to the processors from the
+        worker threads.
+
+        :param timeout: seconds to wait, jobs that did not finish by then keep running in the background. Until
+                        the priming run of a job finished, its scheduled runs are skipped.
+        :return: by job name whether the run finished, False for jobs whose previous priming run is still active
+        """
+        with self._lock:
+            if self._shard is not None:
+                logging.warning("No priming run with a shard, the nodes would all execute the jobs")
+                return {}
+            selected = [job for job in self._jobs if names is None or job.name in names]
+            jobs = [job for job in selected if job not in self._priming]
+            self._priming.update(jobs)
+        logging.info("Prime %d jobs with %d workers", len(jobs), workers)
+        executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="prime")
+        futures = {executor.submit(self._prime_func(job)): job.name for job in jobs}
+        done, _ = concurrent.futures.wait(futures, timeout)
+        executor.shutdown(wait=False)
+        finished = {job.name: False for job in selected}
+        finished.update({name: future in done for future, name in futures.items()})
+        return finished
+
+    def _prime_func(self, job: Job):
+        func = self._process_func(job, None, False)
+
+        def prime():
+            try:
+                func()
+            finally:
+                with self._lock:
+                    self._priming.discard(job)
+
+        return prime
+
+    def run_now(self, name: str) -> bool:
+        """
+        Execute the job `name` as soon as the running job finished, its schedule is not changed.
+
+        :return: False if a run requested before is still waiting
+        """
+        with self._lock:
+            job = self.get_job_by_name(name)
+            if job is None:
+                raise Exception("Job with name '{}' does not exist".format(name))
+            if job in self._pending_now:
+                return False
+            logging.info("Run %s now", job)
+            self._pending_now.add(job)
+            self._push(_Entry(self._clock(), job, None, False))
+            return True
+
+    def next_runs(self) -> typing.Dict[str, typing.Optional[int]]:
+        """:return: the planned time of the next run by job name, None if it is not planned within the lookahead"""
+        with self._lock:
+            return {job.name: entry.time_ns if entry is not None and entry.reschedule else None
+                    for job, entry in self._jobs.items()}
+
     def add_processor(self, processor : typing.Callable[[Job, typing.Any], None]) -> None:
-        with self._scheduler._lock:
+        with self._lock:
             logging.info("Add processor %s", processor)
             self._processors.append(processor)
 
     def remove_processor(self, processor : typing.Callable[[Job, typing.Any], None]) -> None:
-        with self._scheduler._lock:
+        with self._lock:
             self._processors.remove(processor)
 
-    def _process_func(self, job: Job):
+    def set_chunk_size(self, size: int) -> None:
+        """
+        Results that are iterators are passed to the processors in lists of up to `size` items, a processor may be
+        called several times per run, see :func:`chunks`
+        """
+        if size < 1:
+            raise Exception("Invalid chunk size {}".format(size))
+        self._chunk_size = size
+
+    def _process_func(self, job: Job, planned_ns: typing.Optional[int] = None, reschedule: bool = True):
         def execute():
             try:
+                if self._shard is not None and planned_ns is not None and \
+                        not self._shard.claim(job.name, planned_ns):
+                    logging.info("Skip job %s, run is owned by another node", job)
+                    return
                 logging.info("Execute job %s", job)
-                result = job.execute(self)
-                for p in self._processors:
-                    value_repr = self._repr.repr(result)
-                    logging.info("Execute result processor %s for job %s result: %s", p, job, value_repr)
-                    try:
-                        p(job, result)
-                    except:
-                        logging.exception("Execute result processor %s for job %s failed", p, job)
+                job.planned_ns = planned_ns
+                job.started_ns = self._clock()
+                with job.memory.measure():
+                    result = job.execute(self)
+                    for chunk in chunks(result, self._chunk_size):
+                        logging.info("Job %s result: %s", job, lazy(self._repr.repr, chunk))
+                        for p in self._processors:
+                            logging.debug("Execute result processor %s for job %s", p, job)
+                            try:
+                                p(job, chunk)
+                            except:
+                                logging.exception("Execute result processor %s for job %s failed", p, job)
                 logging.info("Execution finished for job %s", job)
             except:
                 logging.exception("Exception while job %s", job)
             finally:
                 # re-schedule for next execution
-                self._schedule_job_run(job)
+                if reschedule:
+                    self._schedule_job_run(job)
 
         return execute
 
+    def _push(self, entry: _Entry) -> None:
+        with self._lock:
+            heapq.heappush(self._queue, (entry.time_ns, next(self._counter), entry))
+            self._wakeup.notify_all()
+
     def _schedule_job_run(self, job):
-        now_ns = time_ns()
+        with self._lock:
+            if job not in self._jobs:
+                return  # removed
+            entry = self._jobs[job] = self._plan(job, self._clock())
+            self._push(entry)
+
+    def _plan(self, job: Job, now_ns: int) -> _Entry:
+        """:return: the queue entry of the next run of `job` after `now_ns`, called with the lock held"""
         stop_ns = now_ns + self._lookahead_ns
         next_ns = job.next(self._time_start_ns, now_ns, stop_ns)
         if next_ns is not None:
-            logging.info("Schedule {} in {}ns / at {}".format(job, next_ns - now_ns, datetime_from_ns(next_ns)))
-            id = self._scheduler.enterabs(next_ns, 0, self._process_func(job))
+            logging.info("Schedule %s in %dns / at %s", job, next_ns - now_ns, lazy(datetime_from_ns, next_ns))
+            entry = _Entry(next_ns, job, next_ns, True)
+        else:
+            # the next run is after the lookahead, ask the job again within the lookahead, a run exactly one
+            # lookahead ahead would never be found by retrying at its end
+            retry_ns = now_ns + self._lookahead_ns // 2
+            logging.info("No next schedule for job %s. Retry at %s", job, lazy(datetime_from_ns, retry_ns))
+            entry = _Entry(retry_ns, job, None, None)
+        return entry
+
+    def _next_entry(self) -> typing.Optional[_Entry]:
+        """Wait for the next due entry, :return: None when the scheduler stops"""
+        with self._lock:
+            while True:
+                while self._queue and self._queue[0][2].cancelled:
+                    heapq.heappop(self._queue)
+                if not self._running:
+                    if self._drain and self._queue and self._queue[0][0] <= self._clock():
+                        return heapq.heappop(self._queue)[2]
+                    return None
+                if not self._queue:
+                    self._wakeup.wait()
+                    continue
+                wait_ns = self._queue[0][0] - self._clock()
+                if wait_ns <= 0:
+                    return heapq.heappop(self._queue)[2]
+                self._wakeup.wait(min(wait_ns, self.max_wait_ns) / 1000 / 1000 / 1000)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._next_entry()
+            if entry is None:
+                return
+            self._execute(entry)
+
+    def _execute(self, entry: _Entry) -> None:
+        if entry.reschedule is False:
+            with self._lock:
+                self._pending_now.discard(entry.job)
+        if entry.job not in self._jobs:
+            return  # removed after run_now
+        if entry.reschedule is None:
+            self._schedule_job_run(entry.job)
+        elif entry.job in self._priming:
+            # the job and its state are not shared by concurrent runs
+            logging.warning("Skip job %s, its priming run is still active", entry.job)
+            if entry.reschedule:
+                self._schedule_job_run(entry.job)
         else:
-            logging.info("No next schedule for job {}. Retry in 10min".format(job))
-            id = self._scheduler.enterabs(now_ns + (1000 * 1000 * 1000 * 10 * 60), 0, lambda: self._schedule_job_run(job))
-        self._jobs[job] = id
+            self._process_func(entry.job, entry.planned_ns, entry.reschedule)()
+
+    def next_due_ns(self) -> typing.Optional[int]:
+        """:return: the time of the next run in the queue, None if it is empty"""
+        with self._lock:
+            while self._queue and self._queue[0][2].cancelled:
+                heapq.heappop(self._queue)
+            return self._queue[0][0] if self._queue else None
+
+    def run_pending(self) -> int:
+        """
+        Execute the runs that are due by the clock without waiting, instead of :meth:`start`. For simulations
+        with a clock that is advanced by the caller, see :mod:`scheduler.memory`.
+
+        :return: the number of executed entries
+        """
+        executed = 0
+        while True:
+            with self._lock:
+                due = self.next_due_ns()
+                if due is None or due > self._clock():
+                    return executed
+                entry = heapq.heappop(self._queue)[2]
+            self._execute(entry)
+            executed += 1
 
     def start(self, blocking: bool = True):
+        """
+        Execute the jobs until :meth:`stop` is called. Without `blocking` the jobs run in a background thread.
+        """
         logging.info("Start scheduler (blocking=%s)", blocking)
-        self._scheduler.run(blocking)
+        with self._lock:
+            if self._running:
+                raise Exception("Scheduler is already running")
+            self._running = True
+            self._drain = False
+        if blocking:
+            self._run()
+        else:
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, drain: bool = True, timeout: typing.Optional[float] = None) -> None:
+        """
+        Stop executing jobs. The running job is always finished.
+
+        :param drain: also execute the runs that are due already
+        :param timeout: seconds to wait for the background thread of ``start(False)``
+        """
+        logging.info("Stop scheduler (drain=%s)", drain)
+        with self._lock:
+            self._running = False
+            self._drain = drain
+            self._wakeup.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
@@ -0,0 +1,231 @@
+"""
+Columnar export of job results for offline analysis, as Parquet or Arrow IPC files (requires ``pyarrow``).
+
+Results are buffered per measurement and UTC day in column builders (:class:`array.array` for time and value,
+lists for field and tags) and written as one file per flush, when `max_rows` are buffered, after `max_age` or
+when the UTC day of the clock ended, partitioned like::
+
+    <path>/<measurement>/date=2019-03-01/part-<first timestamp>.parquet
+
+with the columns ``time`` (timestamp[ns]), ``field``, ``value`` (float64) and one string column per tag key.
+:func:`read` loads a time range of a measurement in a single scan of the partitions::
+
+    prices = read(path, 'tankstelle.Diesel', start_ns, stop_ns).to_pandas()
+"""
+import array
+import datetime
+import logging
+import os
+import threading
+import time
+import typing
+import urllib.parse
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for this sink
+    pyarrow = None
+
+from . import time_ns
+from .influxdb import Dumper
+from .logs import lazy
+from .records import Point
+
+FORMATS = ('parquet', 'arrow')
+
+_NS_PER_DAY = 24 * 60 * 60 * 1000 * 1000 * 1000
+_EPOCH = datetime.date(1970, 1, 1)
+_RESERVED = frozenset(['time', 'field', 'value', 'date'])
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise Exception("The columnar sink requires pyarrow, install it with: pip install pyarrow")
+
+
+def day(t_ns: int) -> str:
+    """:return: the UTC date of `t_ns` as partition value"""
+    return (_EPOCH + datetime.timedelta(days=t_ns // _NS_PER_DAY)).isoformat()
+
+
+def tag_column(key: str) -> str:
+    return 'tag_' + key if key in _RESERVED else key
+
+
+class _Columns:
+    """Column builders of one partition"""
+    __slots__ = ('time', 'field', 'value', 'tags', 'created_ns')
+
+    def __init__(self, created_ns: int = 0) -> None:
+        self.created_ns = created_ns  # monotonic time of the first row
+        self.time = array.array('q')
+        self.field: typing.List[str] = []
+        self.value = array.array('d')
+        self.tags: typing.Dict[str, typing.List[typing.Optional[str]]] = {}
+
+    def append(self, t_ns: int, tags: typing.Iterable[typing.Tuple[str, str]], field: str, value: float) -> None:
+        n = len(self.time)
+        for key, tag_value in tags:
+            column = self.tags.get(key)
+            if column is None:
+                column = self.tags[key] = [None] * n
+            column.append(tag_value)
+        self.time.append(t_ns)
+        self.field.append(field)
+        self.value.append(value)
+        for column in self.tags.values():
+            if len(column) == n:
+                column.append(None)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def table(self):
+        n = len(self.time)
+        # time and value are handed over as buffers, without a Python object per row
+        columns = {
+            'time': pyarrow.Array.from_buffers(pyarrow.int64(), n, [None, pyarrow.py_buffer(self.time)])
+            .cast(pyarrow.timestamp('ns', tz='UTC')),
+            'field': pyarrow.array(self.field, pyarrow.string()).dictionary_encode(),
+            'value': pyarrow.Array.from_buffers(pyarrow.float64(), n, [None, pyarrow.py_buffer(self.value)]),
+        }
+        for key in sorted(self.tags):
+            columns[tag_column(key)] = pyarrow.array(self.tags[key], pyarrow.string()).dictionary_encode()
+        return pyarrow.table(columns)
+
+
+Key = typing.Tuple[str, str]  # measurement, day
+
+
+class _Buffers:
+    """Column builders by measurement and day, and which of them are due to be written"""
+
+    def __init__(self, max_rows: int, max_age_ns: int) -> None:
+        self.max_rows = max_rows
+        self.max_age_ns = max_age_ns
+        self.columns: typing.Dict[Key, _Columns] = {}
+        self.today: typing.Optional[str] = None
+
+    def append(self, measurement: str, tags, field: str, value: float, t_ns: int,
+               now_ns: int) -> typing.Optional[typing.Tuple[Key, _Columns]]:
+        """:return: the buffer of the row if it is full, it is removed"""
+        key = (measurement, day(t_ns))
+        columns = self.columns.get(key)
+        if columns is None:
+            columns = self.columns[key] = _Columns(now_ns)
+        columns.append(t_ns, tags, field, value)
+        if len(columns) >= self.max_rows:
+            return key, self.columns.pop(key)
+        return None
+
+    def due(self, today: str, now_ns: int) -> typing.List[typing.Tuple[Key, _Columns]]:
+        """
+        :param today: the current UTC day, when it changes the buffers of the days before are due
+        :return: the removed buffers that are due
+        """
+        rollover = today != self.today
+        self.today = today
+        keys = [key for key, columns in self.columns.items()
+                if (rollover and key[1] < today) or now_ns - columns.created_ns >= self.max_age_ns]
+        return [(key, self.columns.pop(key)) for key in keys]
+
+    def pop_all(self) -> typing.List[typing.Tuple[Key, _Columns]]:
+        buffers, self.columns = self.columns, {}
+        return list(buffers.items())
+
+
+class ColumnarSink(Dumper):
+    """
+    Processor writing numeric job results into Parquet or Arrow IPC files below `path`.
+
+    :param file_format: one of :data:`FORMATS`
+    :param max_rows: rows buffered per measurement and day before they are written
+    :param max_age: seconds after which buffered rows are written
+    """
+
+    def __init__(self, path: str, file_format: str = 'parquet', max_rows: int = 64 * 1024,
+                 max_age: float = 3600.0) -> None:
+        super().__init__()
+        _require_pyarrow()
+        if file_format not in FORMATS:
+            raise Exception("Unknown format {}, expected one of {}".format(file_format, FORMATS))
+        self._path = path
+        self._format = file_format
+        self._lock = threading.Lock()
+        self._buffers = _Buffers(max_rows, int(max_age * 1000 * 1000 * 1000))
+        os.makedirs(path, exist_ok=True)
+
+    def _insert(self, lines: typing.Iterable) -> None:
+        now_ns = time_ns()
+        with self._lock:
+            for line in lines:
+                if isinstance(line, Point):
+                    self._append(line.measurement, line.tags, line.field, line.value,
+                                 line.timestamp if line.timestamp is not None else now_ns)
+                else:  # pyinflux.client.Line
+                    tags = tuple(sorted(line.tags.items()))
+                    for field, value in line.fields.items():
+                        self._append(line.key, tags, field, value,
+                                     line.timestamp if line.timestamp is not None else now_ns)
+            for key, columns in self._buffers.due(day(now_ns), time.monotonic_ns()):
+                self._write(key, columns)
+
+    def _append(self, measurement: str, tags, field: str, value, t_ns: int) -> None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            logging.debug("Columnar sink skips non numeric value %s of %s", lazy(self._repr.repr, value), measurement)
+            return
+        full = self._buffers.append(measurement, tags, field, value, t_ns, time.monotonic_ns())
+        if full is not None:
+            self._write(*full)
+
+    def _write(self, key: Key, columns: _Columns) -> None:
+        measurement, date = key
+        directory = os.path.join(self._path, urllib.parse.quote(measurement, safe=''), 'date=' + date)
+        os.makedirs(directory, exist_ok=True)
+        name = "part-{:020d}-{}.{}".format(columns.time[0], len(columns), self._format)
+        table = columns.table()
+        # files starting with a dot are ignored by readers until they are complete
+        tmp = os.path.join(directory, '.' + name)
+        path = os.path.join(directory, name)
+        if self._format == 'parquet':
+            pyarrow.parquet.write_table(table, tmp, compression='zstd')
+        else:
+            pyarrow.feather.write_feather(table, tmp, compression='zstd')
+        os.replace(tmp, path)
+
+    def flush(self) -> None:
+        """Write all buffered rows"""
+        with self._lock:
+            for key, columns in self._buffers.pop_all():
+                self._write(key, columns)
+
+    def __repr__(self):
+        return f"<{self.__class__.__module__}.{self.__class__.__name__} path={repr(self._path)} {self._format}>"
+
+
+def read(path: str, measurement: str, start_ns: int, stop_ns: int,
+         columns: typing.Optional[typing.List[str]] = None, file_format: str = 'parquet'):
+    """
+    :return: :class:`pyarrow.Table` of `measurement` with ``start_ns <= time < stop_ns``, only the day partitions
+             of the range are opened
+    """
+    _require_pyarrow()
+    directory = os.path.join(path, urllib.parse.quote(measurement, safe=''))
+    if not os.path.isdir(directory):
+        raise Exception("No data of measurement {} in {}".format(measurement, path))
+    partitioning = pyarrow.dataset.partitioning(pyarrow.schema([('date', pyarrow.string())]), flavor='hive')
+    file_format = 'parquet' if file_format == 'parquet' else 'feather'
+    dataset = pyarrow.dataset.dataset(directory, format=file_format, partitioning=partitioning)
+    days = (pyarrow.dataset.field('date') >= day(start_ns)) & (pyarrow.dataset.field('date') <= day(stop_ns - 1))
+    fragments = list(dataset.get_fragments(filter=days))
+    # the tag columns differ between the files
+    schema = pyarrow.unify_schemas([fragment.physical_schema for fragment in fragments] + [dataset.schema])
+    dataset = pyarrow.dataset.dataset([fragment.path for fragment in fragments], schema=schema, format=file_format,
+                                      partitioning=partitioning, partition_base_dir=directory)
+    time_type = pyarrow.timestamp('ns', tz='UTC')
+    condition = ((pyarrow.dataset.field('time') >= pyarrow.scalar(start_ns, time_type)) &
+                 (pyarrow.dataset.field('time') < pyarrow.scalar(stop_ns, time_type)))
+    return dataset.to_table(columns=columns, filter=condition)
@@ -0,0 +1,174 @@
+"""
+Declarative job configuration.
+
+A configuration file (JSON, or TOML on Python >= 3.11) lists the jobs::
+
+    {"jobs": [
+        {"name": "Telexoo.com-CHFGBP", "every": {"minutes": 10},
+         "action": "jobs.telexoo:execute", "args": ["CHF", "GBP"], "transform": "transforms:telexoo"},
+        {"name": "ESG", "at": {"minute": "0", "hour": "8,10,12"}, "properties": {"cpu_heavy": true},
+         "action": "transforms:execute_esg"}
+    ]}
+
+The schedule is one of ``every`` (arguments of :func:`scheduler.every`), ``at`` (arguments of :func:`scheduler.at`)
+or ``cron`` (expression for :func:`scheduler.cron`). ``action`` and ``transform`` reference functions as
+``module:function``, the modules are imported on the first execution of the job.
+Without ``args``/``kwargs`` the action is called like actions of :class:`scheduler.Job`, with zero, one (job) or two
+(scheduler, job) parameters. ``properties`` become the properties of the job.
+"""
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+import typing
+
+from . import at, cron, every, Job, Scheduler
+
+JobSpec = typing.Dict[str, typing.Any]
+
+
+def resolve(reference: str) -> typing.Callable[..., typing.Any]:
+    """:return: the object referenced by ``module:attribute``"""
+    module_name, _, attribute = reference.partition(':')
+    if not attribute:
+        raise Exception("Invalid reference '{}', expected module:attribute".format(reference))
+    obj = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+class LazyAction:
+    """Job action that imports its function and transform on first execution"""
+
+    def __init__(self, action: str, args: typing.Optional[typing.List] = None,
+                 kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+                 transform: typing.Optional[str] = None) -> None:
+        self.action = action
+        self.args = args
+        self.kwargs = kwargs
+        self.transform = transform
+        self._func: typing.Optional[typing.Callable[..., typing.Any]] = None
+        self._transform_func: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+
+    def __call__(self, scheduler, job):
+        if self._func is None:
+            # assigned together, so a transform that fails to resolve fails every run instead of being skipped
+            func = resolve(self.action)
+            self._transform_func = resolve(self.transform) if self.transform is not None else None
+            self._func = func
+
+        if self.args is not None or self.kwargs is not None:
+            result = self._func(*(self.args or []), **(self.kwargs or {}))
+        else:
+            n = len(inspect.signature(self._func).parameters)
+            result = self._func() if n == 0 else self._func(job) if n == 1 else self._func(scheduler, job)
+
+        if self._transform_func is not None:
+            return self._transform_func(result)
+        return result
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} {action}>".format(cls=self.__class__, action=self.action)
+
+
+def make_job(spec: JobSpec, properties: typing.Optional[typing.Dict[str, typing.Any]] = None) -> Job:
+    """:return: job described by `spec`, `properties` are added to the properties of the job"""
+    name = spec['name']
+    job_properties = dict(spec.get('properties', {}), **(properties or {}))
+    action = LazyAction(spec['action'], spec.get('args'), spec.get('kwargs'), spec.get('transform'))
+    if 'every' in spec:
+        return every(name=name, action=action, **spec['every'], **job_properties)
+    elif 'at' in spec:
+        return at(name=name, action=action, **spec['at'], **job_properties)
+    elif 'cron' in spec:
+        return cron(spec['cron'], name=name, action=action, **job_properties)
+    raise Exception("Job '{}' has no schedule, expected one of every, at, cron".format(name))
+
+
+def load(path: str) -> typing.List[JobSpec]:
+    """:return: job specifications from a JSON or TOML file"""
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    specs = config.get('jobs', [])
+    names = [spec['name'] for spec in specs]
+    if len(names) != len(set(names)):
+        raise Exception("Duplicate job names in {}".format(path))
+    return specs
+
+
+class ConfigLoader:
+    """
+    Keeps the jobs of a :class:`Scheduler` in sync with a configuration file.
+
+    :param properties: additional job properties by job name, e.g. API keys that are not part of the file
+    """
+
+    def __init__(self, path: str, scheduler: Scheduler,
+                 properties: typing.Optional[typing.Dict[str, typing.Dict[str, typing.Any]]] = None) -> None:
+        self.path = path
+        self._scheduler = scheduler
+        self._properties = properties or {}
+        self._specs: typing.Dict[str, JobSpec] = {}
+        self._mtime: typing.Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def reload(self) -> typing.Tuple[typing.List[str], typing.List[str]]:
+        """
+        Apply the configuration file to the scheduler. Only jobs whose specification changed are replaced.
+
+        :return: names of the added and of the removed jobs
+        """
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            specs = {spec['name']: spec for spec in load(self.path)}
+            jobs = {name: make_job(spec, self._properties.get(name)) for name, spec in specs.items()
+                    if self._specs.get(name) != spec}
+
+            removed = [name for name in self._specs if name not in specs or name in jobs]
+            for name in removed:
+                self._scheduler.remove_job_by_name(name)
+                del self._specs[name]
+            self._scheduler.add_jobs(jobs.values())
+            for name in jobs:
+                self._specs[name] = specs[name]
+            self._mtime = mtime
+            if removed or jobs:
+                logging.info("Loaded %s: added/replaced %s, removed %s", self.path, list(jobs), removed)
+            return list(jobs), removed
+
+    def check(self) -> None:
+        """Reload if the configuration file was modified"""
+        if os.stat(self.path).st_mtime != self._mtime:
+            self.reload()
+
+    def start(self, interval: float = 10.0) -> None:
+        """Check for modifications every `interval` seconds in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="config-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Reload of %s failed", self.path)
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} path={path}>".format(cls=self.__class__, path=repr(self.path))
@@ -0,0 +1,176 @@
+"""
+HTTP control endpoint of a :class:`scheduler.Scheduler`::
+
+    GET  /jobs                          jobs with the next planned run, the time of the last result and memory
+    POST /jobs/<name>/run?max_age=60    run the job now, unless its last result is younger than max_age seconds
+    GET  /jobs/<name>/results?n=5       the last n results as line protocol
+
+Answers are JSON. Runs are only queued in the scheduler, requests never wait for the execution of a job.
+"""
+import collections
+import http.server
+import itertools
+import json
+import threading
+import typing
+import urllib.parse
+
+from . import Job, Scheduler, datetime_from_ns, time_ns
+from .influxdb import Dumper
+
+
+class Result(typing.NamedTuple):
+    time_ns: int
+    lines: typing.List[str]
+    count: int  # lines of the complete result, only the first `max_lines` are kept
+    started_ns: typing.Optional[int] = None  # start of the run, the parts of a streamed result are joined by it
+
+
+class Results:
+    """
+    Processor keeping the last `history` results of every job in memory, converted to line protocol. The parts of a
+    result that is passed in chunks (see :func:`scheduler.chunks`) are kept as one result.
+
+    :param max_lines: lines kept per result, the rest is only counted
+    """
+
+    def __init__(self, history: int = 10, max_lines: int = 1000) -> None:
+        self.history = history
+        self.max_lines = max_lines
+        self._converter = Dumper()
+        self._lock = threading.Lock()
+        self._results: typing.Dict[str, typing.Deque[Result]] = {}
+
+    def __call__(self, job: Job, result) -> None:
+        lines = map(str, self._converter._convert(job, result))
+        with self._lock:
+            results = self._results.get(job.name)
+            if results is None:
+                results = self._results[job.name] = collections.deque(maxlen=self.history)
+            if results and job.started_ns is not None and results[-1].started_ns == job.started_ns:
+                previous = results.pop()
+            else:
+                previous = Result(time_ns(), [], 0, job.started_ns)
+            kept = list(itertools.islice(lines, self.max_lines - len(previous.lines)))
+            count = previous.count + len(kept) + sum(1 for _ in lines)
+            results.append(previous._replace(lines=previous.lines + kept, count=count))
+
+    def last(self, name: str, n: int = 1) -> typing.List[Result]:
+        """:return: up to `n` results of job `name`, newest first"""
+        with self._lock:
+            results = self._results.get(name, ())
+            return list(itertools.islice(reversed(results), n))
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} history={history}>".format(cls=self.__class__, history=self.history)
+
+
+def _iso(t_ns: typing.Optional[int]) -> typing.Optional[str]:
+    return datetime_from_ns(t_ns).isoformat() if t_ns is not None else None
+
+
+class ControlServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, scheduler: Scheduler, results: Results,
+                 address: typing.Tuple[str, int] = ('127.0.0.1', 8080)) -> None:
+        super().__init__(address, _ControlRequestHandler)
+        self.scheduler = scheduler
+        self.results = results
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def jobs(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        jobs = []
+        for name, next_ns in sorted(self.scheduler.next_runs().items()):
+            last = self.results.last(name)
+            job = self.scheduler.get_job_by_name(name)
+            jobs.append({'name': name, 'next': _iso(next_ns), 'last': _iso(last[0].time_ns) if last else None,
+                         'memory': job.memory.as_dict() if job is not None else None})
+        return jobs
+
+    def run(self, name: str, max_age: float = 0.0) -> typing.Dict[str, typing.Any]:
+        last = self.results.last(name)
+        if last and max_age > 0 and time_ns() - last[0].time_ns <= max_age * 1000 * 1000 * 1000:
+            return {'name': name, 'queued': False, 'cached': _iso(last[0].time_ns)}
+        return {'name': name, 'queued': self.scheduler.run_now(name), 'cached': None}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="control-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class _ControlRequestHandler(http.server.BaseHTTPRequestHandler):
+    def _send(self, status: int, body) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self) -> typing.Tuple[typing.List[str], typing.Dict[str, str]]:
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(part) for part in url.path.strip('/').split('/')]
+        return parts, dict(urllib.parse.parse_qsl(url.query))
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ['jobs']:
+            self._send(200, self.server.jobs())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'results':
+            if self.server.scheduler.get_job_by_name(parts[1]) is None:
+                self._send(404, {'error': "Unknown job"})
+                return
+            try:
+                n = int(query.get('n', 1))
+            except ValueError:
+                n = -1
+            if n < 0:
+                self._send(400, {'error': "Invalid n, expected a number >= 0"})
+                return
+            results = self.server.results.last(parts[1], n)
+            self._send(200, [{'time': _iso(r.time_ns), 'count': r.count, 'lines': r.lines} for r in results])
+        else:
+            self._send(404, {'error': "Not found"})
+
+    def do_POST(self):
+        parts, query = self._route()
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'run':
+            if self.server.scheduler.get_job_by_name(parts[1]) is None:
+                self._send(404, {'error': "Unknown job"})
+                return
+            try:
+                max_age = float(query.get('max_age', 0))
+            except ValueError:
+                self._send(400, {'error': "Invalid max_age, expected seconds"})
+                return
+            try:
+                answer = self.server.run(parts[1], max_age)
+            except Exception:
+                if self.server.scheduler.get_job_by_name(parts[1]) is not None:
+                    raise
+                # removed since the check
+                self._send(404, {'error': "Unknown job"})
+                return
+            self._send(202 if answer['queued'] else 200, answer)
+        else:
+            self._send(404, {'error': "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(scheduler: Scheduler, address: typing.Tuple[str, int], history: int = 10) -> ControlServer:
+    """Record the results of `scheduler` and start a :class:`ControlServer` at `address`"""
+    results = Results(history)
+    scheduler.add_processor(results)
+    server = ControlServer(scheduler, results, address)
+    server.start()
+    return server
@@ -0,0 +1,279 @@
+"""
+Writing to several InfluxDB endpoints (e.g. a pair or relays) with load balancing and failover.
+
+:class:`MultiInserter` spreads the writes over the endpoints (``round-robin``) or sends every write to all of them
+(``replicate``). Each :class:`Endpoint` keeps a pool of keep-alive connections and statistics. Endpoints that
+fail or whose average latency exceeds `max_latency` are ejected; a health check (``/ping``) re-admits them.
+Writes that could not be delivered are kept, up to `max_pending` bytes, and sent again with the next write or
+health check.
+"""
+import collections
+import http.client
+import itertools
+import logging
+import queue
+import threading
+import time
+import typing
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from .influxdb import _check_precision, Dumper, format_line, precision_url
+
+MODES = ('round-robin', 'replicate')
+
+
+class Endpoint:
+    """
+    One InfluxDB write URL with a pool of up to `connections` keep-alive connections.
+
+    :param max_latency: seconds, average write latency above which the endpoint is ejected
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, connections: int = 4, max_latency: float = 5.0) -> None:
+        self.url = url
+        parts = urllib.parse.urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._netloc = parts.netloc
+        self._path = parts.path + ('?' + parts.query if parts.query else '')
+        self._ping_path = parts.path.rsplit('/', 1)[0] + '/ping'
+        self.timeout = timeout
+        self.max_latency = max_latency
+        self._pool: queue.LifoQueue = queue.LifoQueue(connections)
+        self._lock = threading.Lock()
+        # replicate: held while the pending writes are sent, by the write path or the health check
+        self.flush_lock = threading.Lock()
+        self.healthy = True
+        self.writes = 0
+        self.points = 0
+        self.bytes = 0
+        self.errors = 0
+        self.latency = 0.0  # exponentially weighted average in seconds
+        self.pending: typing.Deque[typing.Tuple[bytes, int]] = collections.deque()
+
+    def _request(self, method: str, path: str, body: typing.Optional[bytes] = None) -> int:
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connection_class(self._netloc, timeout=self.timeout)
+        try:
+            connection.request(method, path, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            response = connection.getresponse()
+            response.read()
+        except Exception:
+            connection.close()
+            raise
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return response.status
+
+    def write(self, body: bytes, points: int) -> None:
+        """Send `body`, raise an exception if it was not accepted"""
+        start = time.monotonic()
+        try:
+            status = self._request('POST', self._path, body)
+            if status // 100 != 2:
+                raise Exception("InfluxDB {} answered {}".format(self.url, status))
+        except Exception:
+            with self._lock:
+                self.errors += 1
+                self.healthy = False
+            raise
+        latency = time.monotonic() - start
+        with self._lock:
+            self.latency = latency if self.writes == 0 else 0.8 * self.latency + 0.2 * latency
+            self.writes += 1
+            self.points += points
+            self.bytes += len(body)
+            if self.latency > self.max_latency:
+                logging.warning("Eject InfluxDB endpoint %s, average latency %.1fs", self.url, self.latency)
+                self.healthy = False
+
+    def ping(self) -> bool:
+        """Health check, :return: True if the endpoint is healthy now"""
+        try:
+            start = time.monotonic()
+            status = self._request('GET', self._ping_path)
+            latency = time.monotonic() - start
+        except Exception:
+            return False
+        with self._lock:
+            if status // 100 == 2 and latency <= self.max_latency:
+                if not self.healthy:
+                    logging.info("InfluxDB endpoint %s is healthy again", self.url)
+                self.healthy = True
+                self.latency = latency
+        return self.healthy
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            return {'url': self.url, 'healthy': self.healthy, 'writes': self.writes, 'points': self.points,
+                    'bytes': self.bytes, 'errors': self.errors, 'latency_ms': round(self.latency * 1000, 1),
+                    'pending': len(self.pending)}
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} {url}>".format(cls=self.__class__, url=self.url)
+
+
+class MultiInserter(Dumper):
+    """
+    Processor writing to several InfluxDB `urls`.
+
+    :param mode: ``round-robin``: every write goes to the next healthy endpoint, to the others if it fails.
+                 ``replicate``: every write goes to all endpoints, an endpoint that is down gets it later
+    :param max_pending: bytes of undelivered writes kept per endpoint (replicate) or in total (round-robin)
+    """
+
+    def __init__(self, urls: typing.Sequence[str], mode: str = 'round-robin', precision: str = 'n',
+                 timeout: float = 10.0, connections: int = 4, max_latency: float = 5.0,
+                 max_pending: int = 64 * 1024 * 1024) -> None:
+        super().__init__()
+        if mode not in MODES:
+            raise Exception("Invalid mode '{}', expected one of {}".format(mode, MODES))
+        _check_precision(precision)
+        self._precision = precision
+        self._mode = mode
+        self._max_pending = max_pending
+        self.endpoints = [Endpoint(precision_url(url, precision), timeout, connections, max_latency) for url in urls]
+        self._next = itertools.cycle(range(len(self.endpoints)))
+        self._pending: typing.Deque[typing.Tuple[bytes, int]] = collections.deque()  # round-robin
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(len(self.endpoints), thread_name_prefix="influxdb")
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def _insert(self, lines: typing.Iterable):
+        try:
+            lines = [format_line(line, self._precision) for line in lines]
+        except Exception:
+            logging.exception("Failed formatting of:\n%s", self._repr.repr(lines))
+            return
+        if not lines:
+            return
+        self.write("\n".join(lines).encode('utf-8'), len(lines))
+
+    def write(self, body: bytes, points: int) -> None:
+        if self._mode == 'round-robin':
+            self._write_any(body, points)
+            self._retry_pending()
+        else:
+            futures = [self._executor.submit(self._write_endpoint, endpoint, body, points)
+                       for endpoint in self.endpoints]
+            for future in futures:
+                future.result()
+
+    def _order(self) -> typing.List[Endpoint]:
+        """:return: the endpoints starting with the next in turn, healthy endpoints first"""
+        with self._lock:
+            start = next(self._next)
+        ordered = self.endpoints[start:] + self.endpoints[:start]
+        return [e for e in ordered if e.healthy] + [e for e in ordered if not e.healthy]
+
+    def _write_any(self, body: bytes, points: int) -> bool:
+        for endpoint in self._order():
+            try:
+                endpoint.write(body, points)
+                return True
+            except Exception as e:
+                logging.warning("Write to %s failed: %s", endpoint.url, e)
+        with self._lock:
+            self._keep(self._pending, body, points)
+        logging.error("All InfluxDB endpoints failed, keeping %d points for later", points)
+        return False
+
+    def _retry_pending(self) -> None:
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                body, points = self._pending.popleft()
+            if not self._write_any(body, points):
+                return
+
+    def _write_endpoint(self, endpoint: Endpoint, body: bytes, points: int) -> None:
+        # replicate: the pending writes of an endpoint are sent before new ones to keep the order
+        with self._lock:
+            self._keep(endpoint.pending, body, points)
+        if endpoint.healthy:
+            self._flush_endpoint(endpoint)
+        # an ejected endpoint gets its pending writes after the health check succeeded
+
+    def _flush_endpoint(self, endpoint: Endpoint) -> None:
+        # one flush per endpoint at a time, two would send the first pending write twice and drop the next
+        with endpoint.flush_lock:
+            while True:
+                with self._lock:
+                    if not endpoint.pending:
+                        return
+                    body, points = endpoint.pending[0]
+                try:
+                    endpoint.write(body, points)
+                except Exception as e:
+                    logging.warning("Write to %s failed, %d writes pending: %s", endpoint.url, len(endpoint.pending),
+                                    e)
+                    return
+                with self._lock:
+                    endpoint.pending.popleft()
+
+    @staticmethod
+    def _pending_bytes(pending: typing.Deque[typing.Tuple[bytes, int]]) -> int:
+        return sum(len(body) for body, _ in pending)
+
+    def _keep(self, pending: typing.Deque[typing.Tuple[bytes, int]], body: bytes, points: int) -> None:
+        pending.append((body, points))
+        while self._pending_bytes(pending) > self._max_pending and len(pending) > 1:
+            _, dropped = pending.popleft()
+            logging.error("Dropped %d undelivered points", dropped)
+
+    def check(self) -> None:
+        """Health check of the ejected endpoints, deliver pending writes to recovered ones"""
+        for endpoint in self.endpoints:
+            if not endpoint.healthy and endpoint.ping():
+                if self._mode == 'replicate':
+                    self._flush_endpoint(endpoint)
+        if self._mode == 'round-robin':
+            self._retry_pending()
+
+    def stats(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """:return: statistics per endpoint"""
+        stats = [endpoint.stats() for endpoint in self.endpoints]
+        if self._mode == 'round-robin':
+            with self._lock:
+                for s in stats:
+                    s['pending'] = len(self._pending)
+        return stats
+
+    def start(self, interval: float = 10.0) -> None:
+        """Run :meth:`check` every `interval` seconds in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="influxdb-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown()
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Health check of %s failed", self)
+
+    def __repr__(self):
+        return f"<{self.__class__.__module__}.{self.__class__.__name__} {self._mode} " \
+               f"urls={[e.url for e in self.endpoints]}>"
@@ -1,12 +1,18 @@
+import collections.abc
 import logging
 import reprlib
 import typing
+import urllib.parse
 from urllib.request import urlopen
 
-import collections
-from pyinflux.client import Line
+try:
+    from pyinflux.client import Line
+except ImportError:  # jobs only return records.Point
+    Line = None
 
 from . import Job
+from .logs import lazy
+from .records import Batch, NO_TAGS, Point
 
 
 def _get_measurement_name(job: Job):
@@ -16,6 +22,45 @@ def _get_measurement_name(job: Job):
         return job.name
 
 
+TIMESTAMPS = ('planned', 'actual', 'none')
+
+# divisor of nanoseconds by value of the precision parameter of the InfluxDB write API
+PRECISIONS = {'n': 1, 'u': 1000, 'ms': 1000 * 1000, 's': 1000 * 1000 * 1000}
+
+
+def _get_timestamp(job: Job) -> typing.Optional[int]:
+    """
+    :return: time for the points of the result of `job` without own timestamp, by the job property ``timestamp``:
+             ``planned`` (default, the actual start for runs that were not planned), ``actual`` or ``none``
+    """
+    mode = job.properties.get('timestamp', 'planned')
+    if mode == 'planned' and job.planned_ns is not None:
+        return job.planned_ns
+    elif mode in ('planned', 'actual'):
+        return job.started_ns
+    elif mode == 'none':
+        return None
+    raise Exception("Invalid timestamp property '{}' of job {}, expected one of {}".format(mode, job, TIMESTAMPS))
+
+
+def _stamp(line, timestamp: int):
+    if line.timestamp is not None:
+        return line
+    elif isinstance(line, Point):
+        return line._replace(timestamp=timestamp)
+    return Line(line.key, line.tags, line.fields, timestamp)
+
+
+def format_line(line, precision: str = 'n') -> str:
+    """:return: `line` in line protocol with the timestamp in `precision`"""
+    divisor = PRECISIONS[precision]
+    if divisor == 1 or line.timestamp is None:
+        return str(line)
+    elif isinstance(line, Point):
+        return str(line._replace(timestamp=line.timestamp // divisor))
+    return str(Line(line.key, line.tags, line.fields, line.timestamp // divisor))
+
+
 class Dumper:
     def __init__(self):
         self._repr = reprlib.Repr()
@@ -32,33 +77,67 @@ class Dumper:
         data = "\n".join(map(str, lines))
         print("===== Would insert:\n" + data)
 
-    def _convert(self, job: Job, data) -> typing.Iterable[Line]:
+    def _convert(self, job: Job, data) -> typing.Iterable:
+        """:return: :class:`Point` or :class:`pyinflux.client.Line` objects"""
         def c(name, value):
-            if isinstance(value, Line):
+            if isinstance(value, Point) or (Line is not None and isinstance(value, Line)):
                 return value
             elif isinstance(value, int) or isinstance(value, str) or isinstance(value, float):
-                return Line(name, {}, {'value': value})
+                return Point(name, NO_TAGS, value)
             else:
                 raise Exception("Cannot simply insert value of type: {} for job {}".format(type(value), job))
 
         measurement = _get_measurement_name(job)
-        if isinstance(data, collections.Iterable):
-            return map(lambda v: c(measurement, v), data)
+        if isinstance(data, Point):
+            lines = [data]
+        elif isinstance(data, Batch):
+            lines = iter(data)
+        elif isinstance(data, collections.abc.Iterable) and not isinstance(data, str):
+            lines = map(lambda v: c(measurement, v), data)
         else:
-            return [c(measurement, data)]
+            lines = [c(measurement, data)]
+
+        timestamp = _get_timestamp(job)
+        if timestamp is None:
+            return lines
+        return map(lambda line: _stamp(line, timestamp), lines)
+
+
+def _check_precision(precision: str) -> None:
+    if precision not in PRECISIONS:
+        raise Exception("Invalid precision '{}', expected one of {}".format(precision, list(PRECISIONS)))
+
+
+def precision_url(url: str, precision: str) -> str:
+    """:return: write `url` with the precision parameter for timestamps in `precision`"""
+    if precision == 'n':
+        return url
+    parts = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query) if k != 'precision']
+    query.append(('precision', precision))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
 
 
 class Inserter(Dumper):
-    def __init__(self, url: str) -> None:
+    """
+    :param precision: precision of the timestamps sent, one of :data:`PRECISIONS`. Coarser timestamps are shorter
+                      to send and to parse
+    """
+
+    def __init__(self, url: str, precision: str = 'n') -> None:
         super().__init__()
-        self._url: str = url
+        _check_precision(precision)
+        self._precision = precision
+        self._url: str = precision_url(url, precision)
 
     def _insert(self, lines: typing.Iterable):
         try:
-            data = "\n".join(map(str, lines)).encode('utf-8')
+            data = "\n".join(format_line(line, self._precision) for line in lines).encode('utf-8')
             try:
                 with urlopen(self._url, data) as fh:
-                    logging.debug("InfluxDB successful answer: %s", self._repr.repr(fh.read().decode('utf-8')))
+                    answer = fh.read()
+                    logging.debug("InfluxDB successful answer: %s",
+                                  lazy(lambda: self._repr.repr(answer.decode('utf-8'))))
             except Exception:
                 logging.exception("Failed insert of:\n%s", self._repr.repr(lines))
         except Exception:
@@ -0,0 +1,67 @@
+"""
+Logging on the job path: :func:`lazy` defers building a message argument until a handler formats the record,
+:func:`queue_logging` moves the handlers of the root logger to a background thread, so a slow console or
+file never delays the execution of jobs::
+
+    logging.info("Schedule %s at %s", job, lazy(datetime_from_ns, next_ns))
+"""
+import copy
+import logging
+import logging.handlers
+import queue
+import typing
+
+
+class lazy:
+    """Message argument formatted as ``str(func(*args))``, only if the record is emitted"""
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: typing.Callable[..., typing.Any], *args) -> None:
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    :class:`logging.handlers.QueueHandler` that drops records instead of blocking when the queue is full. The
+    message arguments, also :class:`lazy` ones, are merged in :meth:`prepare` by the thread that logs, e.g. the job.
+    The handlers format the records and tracebacks and write them in the thread of the listener.
+    """
+
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def queue_logging(max_records: int = 10000,
+                  logger: typing.Optional[logging.Logger] = None) -> logging.handlers.QueueListener:
+    """
+    Replace the handlers of `logger` (default: root) by a queue that is emptied into them by a background thread.
+    Up to `max_records` records wait, further ones are dropped.
+
+    :return: the started listener, :meth:`logging.handlers.QueueListener.stop` writes the remaining records
+    """
+    logger = logger or logging.getLogger()
+    handlers = list(logger.handlers)
+    q: queue.Queue = queue.Queue(max_records)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DroppingQueueHandler(q))
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,186 @@
+"""
+Memory accounting for schedulers running for months.
+
+:class:`JobMemory` records the resident set size (RSS) around every run of a job and, while :mod:`tracemalloc`
+is tracing (e.g. ``PYTHONTRACEMALLOC=1``), the Python memory a run kept and its peak.
+
+:class:`Soak` drives a :class:`scheduler.Scheduler` with a :class:`SimulatedClock` through weeks of schedule
+in minutes and samples the memory, to find state that grows with every run::
+
+    clock = SimulatedClock(time_ns())
+    s = Scheduler(clock)
+    s.add_job(...)
+    soak = Soak(s, clock)
+    soak.run(timedelta_ns(days=28), sample_ns=timedelta_ns(days=1), warmup_ns=timedelta_ns(days=2))
+    problems = soak.check(max_rss_growth=32 * 1024 * 1024, max_traced_growth=4 * 1024 * 1024)
+"""
+import contextlib
+import gc
+import os
+import tracemalloc
+import typing
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss() -> int:
+    """:return: resident set size of this process in bytes, the peak size if the current is not available"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class JobMemory:
+    """
+    Memory statistics of the runs of one job, the ``traced`` values only while tracemalloc is tracing. The growth
+    also counts memory that is freed after the run, by the garbage collector or other threads.
+    """
+    __slots__ = ('runs', 'rss_delta', 'rss_growth', 'traced_delta', 'traced_growth', 'traced_peak')
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.rss_delta = 0  # change of the RSS by the last run
+        self.rss_growth = 0  # sum of the changes by all runs
+        self.traced_delta: typing.Optional[int] = None
+        self.traced_growth = 0
+        self.traced_peak: typing.Optional[int] = None  # allocated during the last run above the start
+
+    @contextlib.contextmanager
+    def measure(self):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_before = rss()
+        try:
+            yield
+        finally:
+            self.runs += 1
+            self.rss_delta = rss() - rss_before
+            self.rss_growth += self.rss_delta
+            if tracing and tracemalloc.is_tracing():
+                traced, peak = tracemalloc.get_traced_memory()
+                self.traced_delta = traced - traced_before
+                self.traced_growth += self.traced_delta
+                self.traced_peak = peak - traced_before
+
+    def as_dict(self) -> typing.Dict[str, typing.Optional[int]]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} runs={_.runs} rss_growth={_.rss_growth} traced_growth={_.traced_growth}>".format(
+            cls=self.__class__, _=self)
+
+
+class SimulatedClock:
+    """Clock for :class:`scheduler.Scheduler` that only moves forward when it is set"""
+
+    def __init__(self, t_ns: int) -> None:
+        self.t_ns = t_ns
+
+    def __call__(self) -> int:
+        return self.t_ns
+
+    def set(self, t_ns: int) -> None:
+        self.t_ns = max(self.t_ns, t_ns)
+
+
+class Sample(typing.NamedTuple):
+    t_ns: int  # simulated time
+    runs: int
+    rss: int
+    traced: typing.Optional[int]
+
+
+class Soak:
+    """
+    Executes the jobs of `scheduler` in simulated time as fast as they run.
+
+    :param trace: trace the Python allocations with :mod:`tracemalloc`, slower but shows where memory grows
+    """
+
+    def __init__(self, scheduler, clock: SimulatedClock, trace: bool = True) -> None:
+        self._scheduler = scheduler
+        self._clock = clock
+        self._trace = trace
+        self.runs = 0
+        self.samples: typing.List[Sample] = []
+        self.baseline: typing.Optional[Sample] = None
+        self._snapshot: typing.Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot: typing.Optional[tracemalloc.Snapshot] = None
+
+    def sample(self) -> Sample:
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        sample = Sample(self._clock(), self.runs, rss(), traced)
+        self.samples.append(sample)
+        return sample
+
+    def run(self, duration_ns: int, sample_ns: int, warmup_ns: int = 0) -> None:
+        """
+        Run the jobs planned within `duration_ns` from now, sample the memory every `sample_ns`. The sample after
+        `warmup_ns` is the baseline of :meth:`check`, until then caches may fill.
+        """
+        started = self._trace and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            start_ns = self._clock()
+            end_ns = start_ns + duration_ns
+            next_sample_ns = start_ns + sample_ns
+            self.sample()
+            while True:
+                due_ns = self._scheduler.next_due_ns()
+                if due_ns is None or due_ns > end_ns:
+                    break
+                self._clock.set(due_ns)
+                self.runs += self._scheduler.run_pending()
+                if self._clock() >= next_sample_ns:
+                    self._sample(start_ns + warmup_ns)
+                    while next_sample_ns <= self._clock():
+                        next_sample_ns += sample_ns
+            self._clock.set(end_ns)
+            self._sample(start_ns + warmup_ns)
+            if self._snapshot is not None:
+                self._last_snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    def _sample(self, warmup_end_ns: int) -> None:
+        sample = self.sample()
+        if self.baseline is None and sample.t_ns >= warmup_end_ns:
+            self.baseline = sample
+            if tracemalloc.is_tracing():
+                self._snapshot = tracemalloc.take_snapshot()
+
+    def growth(self, limit: int = 10) -> typing.List[str]:
+        """:return: the source lines whose allocations grew most since the baseline"""
+        if self._snapshot is None or self._last_snapshot is None:
+            return []
+        diff = self._last_snapshot.compare_to(self._snapshot, 'lineno')
+        return [str(d) for d in diff[:limit] if d.size_diff > 0]
+
+    def check(self, max_rss_growth: int, max_traced_growth: typing.Optional[int] = None) -> typing.List[str]:
+        """:return: descriptions of the limits exceeded from the baseline to the last sample, empty if none"""
+        if self.baseline is None or not self.samples:
+            return ["No baseline sample, the soak was shorter than the warmup"]
+        last = self.samples[-1]
+        problems = []
+        if last.rss - self.baseline.rss > max_rss_growth:
+            problems.append("RSS grew by {:,} bytes in {} runs".format(last.rss - self.baseline.rss,
+                                                                       last.runs - self.baseline.runs))
+        if max_traced_growth is not None and last.traced is not None and self.baseline.traced is not None and \
+                last.traced - self.baseline.traced > max_traced_growth:
+            problems.append("Traced Python memory grew by {:,} bytes in {} runs".format(
+                last.traced - self.baseline.traced, last.runs - self.baseline.runs))
+        return problems
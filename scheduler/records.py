@@ -0,0 +1,95 @@
+"""
+Compact result types that the processors in :mod:`scheduler.influxdb` consume directly.
+
+:class:`Point` is a single value, :class:`Batch` holds many values of one measurement in columns.
+Both format to InfluxDB line protocol with :func:`str`.
+"""
+import array
+import typing
+
+Tags = typing.Tuple[typing.Tuple[str, str], ...]
+
+NO_TAGS: Tags = ()
+
+
+def make_tags(tags: typing.Optional[typing.Mapping[str, str]] = None, **kwargs) -> Tags:
+    """:return: tags as sorted tuple of (key, value) pairs, the form used in :class:`Point`"""
+    items = dict(tags or {}, **kwargs)
+    return tuple(sorted((k, str(v)) for k, v in items.items()))
+
+
+def _escape_measurement(s: str) -> str:
+    return s.replace(',', r'\,').replace(' ', r'\ ')
+
+
+def _escape_key(s: str) -> str:
+    return s.replace(',', r'\,').replace('=', r'\=').replace(' ', r'\ ')
+
+
+def format_value(value) -> str:
+    """:return: `value` formatted as field value of the line protocol"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    elif isinstance(value, int):
+        return str(value) + 'i'
+    elif isinstance(value, float):
+        return repr(value)
+    elif isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    raise Exception("Cannot format value of type {}".format(type(value)))
+
+
+def format_tags(tags: Tags) -> str:
+    """:return: the tag part of a line including the leading comma"""
+    return "".join(",{}={}".format(_escape_key(k), _escape_key(v)) for k, v in tags)
+
+
+class Point(typing.NamedTuple):
+    measurement: str
+    tags: Tags
+    value: typing.Any
+    field: str = 'value'
+    timestamp: typing.Optional[int] = None
+
+    def __str__(self) -> str:
+        line = "{}{} {}={}".format(_escape_measurement(self.measurement), format_tags(self.tags),
+                                   _escape_key(self.field), format_value(self.value))
+        if self.timestamp is not None:
+            line += " " + str(self.timestamp)
+        return line
+
+
+class Batch:
+    """
+    Many values of one measurement and field stored in columns, e.g. a whole catalog.
+    Tag values are kept per tag key, float values in an :class:`array.array`.
+    Iterating yields :class:`Point`.
+    """
+    __slots__ = ('measurement', 'field', 'tag_keys', 'tag_columns', 'values', 'timestamp')
+
+    def __init__(self, measurement: str, tag_keys: typing.Sequence[str] = (), field: str = 'value',
+                 timestamp: typing.Optional[int] = None) -> None:
+        self.measurement = measurement
+        self.field = field
+        self.tag_keys: typing.Tuple[str, ...] = tuple(sorted(tag_keys))
+        self.tag_columns: typing.Tuple[typing.List[str], ...] = tuple([] for _ in self.tag_keys)
+        self.values = array.array('d')
+        self.timestamp = timestamp
+
+    def append(self, value: float, **tags: str) -> None:
+        for key, column in zip(self.tag_keys, self.tag_columns):
+            column.append(tags[key])
+        self.values.append(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> typing.Iterator[Point]:
+        keys = self.tag_keys
+        for i, value in enumerate(self.values):
+            tags = tuple((key, column[i]) for key, column in zip(keys, self.tag_columns))
+            yield Point(self.measurement, tags, value, self.field, self.timestamp)
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} measurement={m} field={f} tags={t} len={n}>".format(
+            cls=self.__class__, m=repr(self.measurement), f=repr(self.field), t=self.tag_keys, n=len(self))
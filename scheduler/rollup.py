@@ -0,0 +1,178 @@
+"""
+Downsampling of job results before they reach the output processors.
+
+:class:`Rollup` keeps one window per series and resolution, the count, min, max, sum and last value of all
+windows are stored in flat :class:`array.array` columns indexed by a slot per series. When a window is complete,
+the rolled-up values are passed to the wrapped processors as fields ``<field>_count``, ``<field>_min``, ... of the
+measurement ``<measurement>_<label>`` with the start of the window as timestamp. Points that arrive after their
+window was passed on are dropped and counted, see :meth:`Rollup.late_points`::
+
+    Rollup([Inserter(url)], {'1h': timedelta_ns(hours=1)}, raw=False)
+"""
+import array
+import logging
+import threading
+import typing
+
+from . import Job, time_ns
+from .influxdb import Dumper
+from .records import Point
+
+Processor = typing.Callable[[Job, typing.Any], None]
+SeriesKey = typing.Tuple[str, typing.Tuple, str]
+
+STATS = ('count', 'min', 'max', 'mean', 'last')
+
+
+def label(resolution_ns: int) -> str:
+    """:return: short name of a resolution, e.g. ``1h`` or ``90s``"""
+    seconds = resolution_ns // (1000 * 1000 * 1000)
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return "{}{}".format(seconds // size, unit)
+    return "{}s".format(seconds)
+
+
+class _Windows:
+    """Open windows of one resolution, one slot per series"""
+
+    def __init__(self, resolution_ns: int, label: str) -> None:
+        self.resolution_ns = resolution_ns
+        self.label = label
+        self.slots: typing.Dict[SeriesKey, int] = {}
+        self.keys: typing.List[SeriesKey] = []
+        self.names: typing.List[str] = []
+        self.start = array.array('q')
+        self.count = array.array('q')
+        self.min = array.array('d')
+        self.max = array.array('d')
+        self.sum = array.array('d')
+        self.last = array.array('d')
+        self.late = 0
+
+    def slot(self, key: SeriesKey) -> int:
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            self.names.append("{}_{}".format(key[0], self.label))
+            self.start.append(-1)
+            self.count.append(0)
+            for column in (self.min, self.max, self.sum, self.last):
+                column.append(0.0)
+        return slot
+
+    def add(self, slot: int, t_ns: int, value: float, emit: typing.List[Point]) -> None:
+        start = t_ns - t_ns % self.resolution_ns
+        if self.start[slot] != start:
+            if start < self.start[slot]:
+                self.late += 1
+                logging.debug("Rollup %s drops late point of %s at %d", self.label, self.keys[slot], t_ns)
+                return
+            self.close(slot, emit)
+            self.start[slot] = start
+        if self.count[slot] == 0:
+            self.min[slot] = self.max[slot] = value
+        elif value < self.min[slot]:
+            self.min[slot] = value
+        elif value > self.max[slot]:
+            self.max[slot] = value
+        self.count[slot] += 1
+        self.sum[slot] += value
+        self.last[slot] = value
+
+    def close(self, slot: int, emit: typing.List[Point]) -> None:
+        count = self.count[slot]
+        if count == 0:
+            return
+        measurement, tags, field = self.keys[slot]
+        name = self.names[slot]
+        start = self.start[slot]
+        values = (count, self.min[slot], self.max[slot], self.sum[slot] / count, self.last[slot])
+        emit.extend(Point(name, tags, value, "{}_{}".format(field, stat), start)
+                    for stat, value in zip(STATS, values))
+        self.count[slot] = 0
+        self.sum[slot] = 0.0
+        # points of the closed window are late from now on
+        self.start[slot] = start + self.resolution_ns
+
+    def close_before(self, slots: typing.Iterable[int], t_ns: int, emit: typing.List[Point]) -> None:
+        """Close the windows of `slots` that ended before `t_ns`"""
+        for slot in slots:
+            if self.count[slot] and self.start[slot] + self.resolution_ns <= t_ns:
+                self.close(slot, emit)
+
+
+class Rollup:
+    """
+    Processor aggregating numeric results into windows of the given `resolutions` (label -> nanoseconds) and
+    passing the rolled-up points to `processors`.
+
+    :param raw: also pass the original results on
+    :param names: names of the jobs to roll up, all if None. Results of other jobs are passed on unchanged
+    """
+
+    def __init__(self, processors: typing.Sequence[Processor], resolutions: typing.Mapping[str, int],
+                 raw: bool = True, names: typing.Optional[typing.Iterable[str]] = None) -> None:
+        self._processors = list(processors)
+        self._windows = [_Windows(ns, name) for name, ns in resolutions.items()]
+        self._raw = raw
+        self._names = frozenset(names) if names is not None else None
+        self._converter = Dumper()
+        self._lock = threading.Lock()
+        self._job_slots: typing.Dict[str, typing.List[typing.Set[int]]] = {}
+
+    def __call__(self, job: Job, result) -> None:
+        if self._names is not None and job.name not in self._names:
+            self._forward(job, result)
+            return
+        now_ns = time_ns()
+        points = list(self._converter._convert(job, result))
+        passed = []
+        emit: typing.List[Point] = []
+        with self._lock:
+            job_slots = self._job_slots.setdefault(job.name, [set() for _ in self._windows])
+            for point in points:
+                value = point.value if isinstance(point, Point) else None
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    passed.append(point)  # strings and pyinflux lines are not aggregated
+                    continue
+                if self._raw:
+                    passed.append(point)
+                key = (point.measurement, point.tags, point.field)
+                t_ns = point.timestamp if point.timestamp is not None else now_ns
+                for windows, slots in zip(self._windows, job_slots):
+                    slot = windows.slot(key)
+                    slots.add(slot)
+                    windows.add(slot, t_ns, float(value), emit)
+            # series the job did not report this time
+            for windows, slots in zip(self._windows, job_slots):
+                windows.close_before(slots, now_ns, emit)
+        if passed or emit:
+            self._forward(job, passed + emit)
+
+    def flush(self, job: typing.Optional[Job] = None) -> None:
+        """Pass the incomplete windows on, e.g. before shutdown"""
+        emit: typing.List[Point] = []
+        with self._lock:
+            for windows in self._windows:
+                for slot in range(len(windows.keys)):
+                    windows.close(slot, emit)
+        if emit:
+            self._forward(job or Job('rollup'), emit)
+
+    def late_points(self) -> typing.Dict[str, int]:
+        """:return: by resolution label the number of points dropped because their window was already passed on"""
+        with self._lock:
+            return {windows.label: windows.late for windows in self._windows}
+
+    def _forward(self, job: Job, result) -> None:
+        for processor in self._processors:
+            try:
+                processor(job, result)
+            except Exception:
+                logging.exception("Rollup processor %s for job %s failed", processor, job)
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} {labels} raw={raw} processors={processors}>".format(
+            cls=self.__class__, labels=[w.label for w in self._windows], raw=self._raw, processors=self._processors)
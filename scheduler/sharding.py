@@ -0,0 +1,127 @@
+import bisect
+import contextlib
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import typing
+
+from . import time_ns, timedelta_ns
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class Ring:
+    """Consistent hash ring mapping job names to nodes"""
+
+    def __init__(self, nodes: typing.Iterable[str], replicas: int = 64) -> None:
+        self.nodes: typing.Tuple[str, ...] = tuple(sorted(set(nodes)))
+        points = sorted((_hash("{}#{}".format(node, i)), node) for node in self.nodes for i in range(replicas))
+        self._keys = [k for k, _ in points]
+        self._nodes = [n for _, n in points]
+
+    def owner(self, name: str) -> typing.Optional[str]:
+        """:return: node responsible for `name` or None if the ring is empty"""
+        if not self._keys:
+            return None
+        i = bisect.bisect(self._keys, _hash(name)) % len(self._keys)
+        return self._nodes[i]
+
+
+class Shard:
+    """
+    Membership of one scheduler node in a group of nodes sharing a SQLite file.
+
+    Every node heartbeats into the file. Jobs are split by consistent hashing of their names over the nodes
+    that heartbeated within `ttl_ns`, so the jobs of a node that disappears move to the remaining ones.
+    Each run is additionally claimed by (job name, planned time) so a run is never executed twice, even while
+    nodes disagree about the membership.
+    """
+
+    def __init__(self, path: str, node: typing.Optional[str] = None,
+                 ttl_ns: int = timedelta_ns(seconds=30), replicas: int = 64) -> None:
+        self.path = path
+        self.node: str = node if node is not None else "{}:{}".format(socket.gethostname(), os.getpid())
+        self.ttl_ns = ttl_ns
+        self._replicas = replicas
+        self._ring: typing.Optional[Ring] = None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS nodes (node TEXT PRIMARY KEY, seen_ns INTEGER NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS runs (job TEXT NOT NULL, planned_ns INTEGER NOT NULL, "
+                       "node TEXT NOT NULL, PRIMARY KEY (job, planned_ns))")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def heartbeat(self, now_ns: typing.Optional[int] = None) -> None:
+        now_ns = time_ns() if now_ns is None else now_ns
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO nodes (node, seen_ns) VALUES (?, ?)", (self.node, now_ns))
+            # forget runs that can no longer be claimed by a lagging node
+            db.execute("DELETE FROM runs WHERE planned_ns < ?", (now_ns - timedelta_ns(days=1),))
+
+    def leave(self) -> None:
+        """Remove this node from the group, its jobs are reassigned immediately"""
+        with self._connect() as db:
+            db.execute("DELETE FROM nodes WHERE node = ?", (self.node,))
+
+    def nodes(self, now_ns: typing.Optional[int] = None) -> typing.List[str]:
+        """:return: the live nodes"""
+        now_ns = time_ns() if now_ns is None else now_ns
+        with self._connect() as db:
+            rows = db.execute("SELECT node FROM nodes WHERE seen_ns >= ? ORDER BY node", (now_ns - self.ttl_ns,))
+            return [node for node, in rows]
+
+    def owner(self, name: str, now_ns: typing.Optional[int] = None) -> typing.Optional[str]:
+        """:return: the live node responsible for the job `name`"""
+        nodes = tuple(self.nodes(now_ns))
+        if self._ring is None or self._ring.nodes != nodes:
+            self._ring = Ring(nodes, self._replicas)
+        return self._ring.owner(name)
+
+    def claim(self, name: str, planned_ns: int, now_ns: typing.Optional[int] = None) -> bool:
+        """
+        :return: True if this node owns job `name` and nobody executed the run planned at `planned_ns` yet
+        """
+        if self.owner(name, now_ns) != self.node:
+            return False
+        with self._connect() as db:
+            cursor = db.execute("INSERT OR IGNORE INTO runs (job, planned_ns, node) VALUES (?, ?, ?)",
+                                (name, planned_ns, self.node))
+            return cursor.rowcount == 1
+
+    def start(self) -> None:
+        """Heartbeat in a background thread every third of `ttl_ns`"""
+        self.heartbeat()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shard-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.leave()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl_ns / 3 / 1000 / 1000 / 1000):
+            try:
+                self.heartbeat()
+            except Exception:
+                logging.exception("Heartbeat of %s failed", self.node)
+
+    def __repr__(self) -> str:
+        return "<{cls.__name__} node={node} path={path}>".format(cls=self.__class__, node=repr(self.node),
+                                                                 path=repr(self.path))
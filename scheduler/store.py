@@ -0,0 +1,310 @@
+"""
+Embedded time-series storage for machines without InfluxDB.
+
+Every series (measurement, tags and field) gets a directory of append-only segment files. A segment is a
+sequence of blocks, each block holds up to `block_size` points in two compressed columns:
+
+* timestamps: delta encoded int64, zlib compressed
+* values: float64 XOR'ed with the previous value, zlib compressed
+
+The block header holds the count and the time range, so readers scan the memory mapped segments by headers
+and only decompress blocks that overlap the queried range.
+"""
+import array
+import hashlib
+import itertools
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import typing
+import zlib
+
+from . import time_ns
+from .influxdb import Dumper
+from .logs import lazy
+from .records import Point, format_tags
+
+_HEADER = struct.Struct('<4sIqqII')
+_MAGIC = b'TSB1'
+
+Sample = typing.Tuple[int, float]
+
+
+def _series_key(measurement: str, tags: typing.Iterable[typing.Tuple[str, str]], field: str) -> str:
+    return "{}{} {}".format(measurement, format_tags(tuple(tags)), field)
+
+
+def _encode_block(timestamps: array.array, values: array.array) -> bytes:
+    deltas = array.array('q', [timestamps[0]])
+    deltas.extend(b - a for a, b in zip(timestamps, timestamps[1:]))
+    bits = array.array('Q', values.tobytes())
+    xored = array.array('Q', [bits[0]])
+    xored.extend(a ^ b for a, b in zip(bits, bits[1:]))
+    ts_data = zlib.compress(deltas.tobytes(), 1)
+    val_data = zlib.compress(xored.tobytes(), 1)
+    header = _HEADER.pack(_MAGIC, len(timestamps), min(timestamps), max(timestamps), len(ts_data), len(val_data))
+    return header + ts_data + val_data
+
+
+def _decode_block(buffer, offset: int, count: int, ts_len: int, val_len: int) -> typing.Iterator[Sample]:
+    start = offset + _HEADER.size
+    timestamps = array.array('q')
+    xored = array.array('Q')
+    with memoryview(buffer) as view:
+        timestamps.frombytes(zlib.decompress(view[start:start + ts_len]))
+        xored.frombytes(zlib.decompress(view[start + ts_len:start + ts_len + val_len]))
+    bits = array.array('Q', itertools.accumulate(xored, lambda a, b: a ^ b))
+    values = array.array('d', bits.tobytes())
+    return zip(itertools.accumulate(timestamps), values)
+
+
+def _blocks(buffer) -> typing.Iterator[typing.Tuple[int, int, int, int, int, int]]:
+    """:return: (offset, count, min_ns, max_ns, ts_len, val_len) of the complete blocks in `buffer`"""
+    offset = 0
+    size = len(buffer)
+    while offset + _HEADER.size <= size:
+        magic, count, min_ns, max_ns, ts_len, val_len = _HEADER.unpack_from(buffer, offset)
+        end = offset + _HEADER.size + ts_len + val_len
+        if magic != _MAGIC or end > size:
+            return
+        yield offset, count, min_ns, max_ns, ts_len, val_len
+        offset = end
+
+
+class _Series:
+    __slots__ = ('key', 'path', 'timestamps', 'values', 'segment')
+
+    def __init__(self, key: str, path: str) -> None:
+        self.key = key
+        self.path = path
+        self.timestamps = array.array('q')
+        self.values = array.array('d')
+        self.segment: typing.Optional[str] = None
+
+    def segments(self) -> typing.List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, name) for name in sorted(os.listdir(self.path)) if name.endswith('.seg')]
+
+
+class Store(Dumper):
+    """
+    Processor writing job results into an embedded time-series store at `path`.
+
+    :param block_size: points per compressed block
+    :param max_buffered: upper bound of points held in memory over all series
+    :param segment_size: bytes after which a new segment file is started
+    :param max_age: seconds after which buffered points are written as partial blocks, so a crash or a reader
+                    of the segments misses at most this span of slow series. Checked on append and query, and
+                    periodically after :meth:`start`
+    """
+
+    def __init__(self, path: str, block_size: int = 1024, max_buffered: int = 64 * 1024,
+                 segment_size: int = 4 * 1024 * 1024, max_age: float = 300.0) -> None:
+        super().__init__()
+        self._path = path
+        self._block_size = block_size
+        self._max_buffered = max_buffered
+        self._segment_size = segment_size
+        self._max_age_ns = int(max_age * 1000 * 1000 * 1000)
+        # monotonic time of the oldest buffered point, None if nothing is buffered
+        self._buffered_since: typing.Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+        self._series: typing.Dict[str, _Series] = {}
+        self._by_point: typing.Dict[typing.Tuple, _Series] = {}
+        self._buffered = 0
+        os.makedirs(path, exist_ok=True)
+        self._load_index()
+
+    def _index_file(self) -> str:
+        return os.path.join(self._path, 'index')
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_file()):
+            return
+        with open(self._index_file(), 'r', encoding='utf-8') as f:
+            for line in f:
+                directory, key = line.rstrip('\n').split('\t', 1)
+                self._series[key] = _Series(key, os.path.join(self._path, directory))
+
+    def _get_series(self, key: str) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            directory = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+            series = _Series(key, os.path.join(self._path, directory))
+            os.makedirs(series.path, exist_ok=True)
+            with open(self._index_file(), 'a', encoding='utf-8') as f:
+                f.write("{}\t{}\n".format(directory, key))
+            self._series[key] = series
+        return series
+
+    def _insert(self, lines: typing.Iterable) -> None:
+        now_ns = time_ns()
+        with self._lock:
+            for line in lines:
+                if isinstance(line, Point):
+                    self.append(line.measurement, line.tags, line.field, line.value,
+                                line.timestamp if line.timestamp is not None else now_ns)
+                else:  # pyinflux.client.Line
+                    tags = tuple(sorted(line.tags.items()))
+                    for field, value in line.fields.items():
+                        self.append(line.key, tags, field, value,
+                                    line.timestamp if line.timestamp is not None else now_ns)
+
+    def append(self, measurement: str, tags: typing.Tuple[typing.Tuple[str, str], ...], field: str,
+               value, timestamp_ns: int) -> None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            logging.debug("Store skips non numeric value %s of %s", lazy(self._repr.repr, value), measurement)
+            return
+        with self._lock:
+            point_key = (measurement, tags, field)
+            series = self._by_point.get(point_key)
+            if series is None:
+                series = self._by_point[point_key] = self._get_series(_series_key(measurement, tags, field))
+            series.timestamps.append(timestamp_ns)
+            series.values.append(value)
+            self._buffered += 1
+            now_ns = time.monotonic_ns()
+            if self._buffered_since is None:
+                self._buffered_since = now_ns
+            if len(series.values) >= self._block_size:
+                self._flush_series(series)
+            if self._buffered >= self._max_buffered:
+                self.flush()
+            else:
+                self.flush_old(now_ns)
+
+    def flush_old(self, now_ns: typing.Optional[int] = None) -> None:
+        """Write all buffered points if the oldest was buffered `max_age` before `now_ns` (monotonic)"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        with self._lock:
+            if self._buffered_since is not None and now_ns - self._buffered_since >= self._max_age_ns:
+                self.flush()
+
+    def start(self) -> None:
+        """Check the age of the buffered points in a background thread, for series without further appends"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="store-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and write all buffered points"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(max(1.0, self._max_age_ns / 1000 / 1000 / 1000 / 10)):
+            try:
+                self.flush_old()
+            except Exception:
+                logging.exception("Flush of %s failed", self)
+
+    def _flush_series(self, series: _Series) -> None:
+        if not series.values:
+            return
+        block = _encode_block(series.timestamps, series.values)
+        if series.segment is None or os.path.getsize(series.segment) >= self._segment_size:
+            series.segment = self._open_segment(series)
+        with open(series.segment, 'ab') as f:
+            f.write(block)
+        self._buffered -= len(series.values)
+        if self._buffered == 0:
+            self._buffered_since = None
+        series.timestamps = array.array('q')
+        series.values = array.array('d')
+
+    def _open_segment(self, series: _Series) -> str:
+        segments = series.segments()
+        if segments and os.path.getsize(segments[-1]) < self._segment_size:
+            # drop a block that was only partially written before a crash
+            with open(segments[-1], 'rb') as f:
+                data = f.read()
+            end = 0
+            for offset, count, min_ns, max_ns, ts_len, val_len in _blocks(data):
+                end = offset + _HEADER.size + ts_len + val_len
+            if end != len(data):
+                os.truncate(segments[-1], end)
+            return segments[-1]
+        return os.path.join(series.path, "{:020d}.seg".format(series.timestamps[0]))
+
+    def flush(self) -> None:
+        """Write all buffered points to the segments"""
+        with self._lock:
+            for series in self._series.values():
+                self._flush_series(series)
+            self._buffered_since = None
+
+    def series(self) -> typing.List[str]:
+        """:return: keys of all series, formatted like line protocol without value: ``measurement,tag=v field``"""
+        with self._lock:
+            return sorted(self._series.keys())
+
+    def range(self, key: str, start_ns: int, stop_ns: int) -> typing.List[Sample]:
+        """:return: (timestamp, value) of series `key` with ``start_ns <= timestamp < stop_ns``, sorted by time"""
+        self.flush_old()
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return []
+            result = [s for s in zip(series.timestamps, series.values) if start_ns <= s[0] < stop_ns]
+            segments = series.segments()
+        for segment in segments:
+            with open(segment, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for offset, count, min_ns, max_ns, ts_len, val_len in _blocks(mm):
+                        if max_ns < start_ns or min_ns >= stop_ns:
+                            continue
+                        result.extend(s for s in _decode_block(mm, offset, count, ts_len, val_len)
+                                      if start_ns <= s[0] < stop_ns)
+        result.sort(key=lambda s: s[0])
+        return result
+
+    def last(self, key: str) -> typing.Optional[Sample]:
+        """:return: the (timestamp, value) with the highest timestamp of series `key`"""
+        self.flush_old()
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return None
+            candidates = list(zip(series.timestamps, series.values))
+            segments = series.segments()
+        # timestamps may arrive out of order, the highest can be in any segment
+        latest: typing.Optional[typing.Tuple[str, int, int, int, int]] = None
+        max_ns = None
+        for segment in segments:
+            with open(segment, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for offset, count, min_ns, block_max_ns, ts_len, val_len in _blocks(mm):
+                        if max_ns is None or block_max_ns > max_ns:
+                            max_ns = block_max_ns
+                            latest = (segment, offset, count, ts_len, val_len)
+        if latest is not None:
+            segment, offset, count, ts_len, val_len = latest
+            with open(segment, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                candidates.extend(_decode_block(mm, offset, count, ts_len, val_len))
+        if not candidates:
+            return None
+        return max(candidates, key=lambda s: s[0])
+
+    def __repr__(self):
+        return f"<{self.__class__.__module__}.{self.__class__.__name__} path={repr(self._path)}>"
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = Store(sys.argv[1])
+    for key in store.series():
+        print(key, store.last(key))
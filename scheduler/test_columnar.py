@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+import unittest
+
+from scheduler import every, timedelta_ns
+from scheduler.columnar import _Buffers, _Columns, day, pyarrow
+from scheduler.records import make_tags, NO_TAGS, Point
+
+DAY = timedelta_ns(days=1)
+START = 17956 * DAY  # 2019-03-01
+
+
+class TestColumns(unittest.TestCase):
+    def test_day(self):
+        self.assertEqual(day(START), '2019-03-01')
+        self.assertEqual(day(START - 1), '2019-02-28')
+
+    def test_tag_padding(self):
+        columns = _Columns()
+        columns.append(1, (('id', 'a'),), 'value', 1.0)
+        columns.append(2, (), 'value', 2.0)
+        columns.append(3, (('name', 'x'),), 'value', 3.0)
+        self.assertEqual(columns.tags, {'id': ['a', None, None], 'name': [None, None, 'x']})
+        self.assertEqual(list(columns.value), [1.0, 2.0, 3.0])
+
+    def test_buffers_due(self):
+        buffers = _Buffers(max_rows=3, max_age_ns=100)
+        today = day(START)
+        self.assertIsNone(buffers.append('a', NO_TAGS, 'value', 1.0, START - 1, now_ns=0))
+        self.assertIsNone(buffers.append('a', NO_TAGS, 'value', 2.0, START, now_ns=0))
+        self.assertEqual(buffers.due(day(START - 1), now_ns=10), [])
+        # the day of the clock ended, the buffer of the day before is written
+        self.assertEqual([(key, list(c.value)) for key, c in buffers.due(today, now_ns=20)],
+                         [(('a', '2019-02-28'), [1.0])])
+        self.assertIsNone(buffers.append('a', NO_TAGS, 'value', 0.5, START - 2, now_ns=30))
+        self.assertEqual(buffers.due(today, now_ns=40), [])
+        self.assertIsNone(buffers.append('b', NO_TAGS, 'value', 3.0, START, now_ns=50))
+        # older than max_age
+        self.assertEqual([(key, list(c.value)) for key, c in buffers.due(today, now_ns=110)],
+                         [(('a', today), [2.0])])
+        self.assertEqual([key for key, c in buffers.due(today, now_ns=130)], [('a', '2019-02-28')])
+        self.assertIsNone(buffers.append('b', NO_TAGS, 'value', 4.0, START, now_ns=140))
+        key, columns = buffers.append('b', NO_TAGS, 'value', 5.0, START, now_ns=140)
+        self.assertEqual((key, list(columns.value)), (('b', today), [3.0, 4.0, 5.0]))
+        self.assertIsNone(buffers.append('b', NO_TAGS, 'value', 6.0, START, now_ns=150))
+        self.assertEqual([list(c.value) for key, c in buffers.pop_all()], [[6.0]])
+        self.assertEqual(buffers.columns, {})
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestColumnarSink(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_write_read(self):
+        from scheduler.columnar import ColumnarSink, read
+        for file_format in ('parquet', 'arrow'):
+            with self.subTest(file_format=file_format):
+                path = tempfile.mkdtemp(dir=self.path)
+                sink = ColumnarSink(path, file_format, max_rows=3)
+                job = every(minutes=15, name='Prices')
+                for i in range(4):
+                    t = START + i * DAY // 2
+                    sink(job, [Point('tankstelle.Diesel', make_tags(id='1', name='ARAL'), 1.4 + i, timestamp=t),
+                               Point('tankstelle.Diesel', make_tags(id='2'), 1.3, timestamp=t),
+                               Point('tankstelle.Diesel', NO_TAGS, 'closed', timestamp=t)])
+                sink.flush()
+
+                table = read(path, 'tankstelle.Diesel', START, START + DAY, file_format=file_format)
+                rows = sorted(zip(table.column('id').to_pylist(), table.column('value').to_pylist()))
+                self.assertEqual(rows, [('1', 1.4), ('1', 2.4), ('2', 1.3), ('2', 1.3)])
+                self.assertEqual(read(path, 'tankstelle.Diesel', START, START + 2 * DAY, ['value'],
+                                      file_format).num_rows, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
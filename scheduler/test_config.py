@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from scheduler import CronJob, PeriodicJob, Scheduler
+from scheduler.config import ConfigLoader, make_job
+
+
+class TestMakeJob(unittest.TestCase):
+    def test_lazy_import(self):
+        sys.modules.pop('colorsys', None)
+        job = make_job({'name': 'HSV', 'every': {'seconds': 10}, 'action': 'colorsys:rgb_to_hsv',
+                        'args': [1.0, 0.0, 0.0], 'transform': 'builtins:list', 'properties': {'cpu_heavy': True}})
+        self.assertIsInstance(job, PeriodicJob)
+        self.assertTrue(job.properties['cpu_heavy'])
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(job.execute(None), [0.0, 1.0, 1.0])
+        self.assertIn('colorsys', sys.modules)
+
+    def test_job_parameter(self):
+        job = make_job({'name': 'Props', 'cron': '*/5 * * * *', 'action': 'scheduler.influxdb:_get_measurement_name'},
+                       {'measurement': 'm'})
+        self.assertIsInstance(job, CronJob)
+        self.assertEqual(job.execute(None), 'm')
+
+    def test_unresolved_transform(self):
+        job = make_job({'name': 'Typo', 'every': {'seconds': 10}, 'action': 'builtins:len', 'args': ['abc'],
+                        'transform': 'builtins:lenn'})
+        for _ in range(2):
+            self.assertRaises(AttributeError, job.execute, None)
+
+    def test_no_schedule(self):
+        self.assertRaises(Exception, make_job, {'name': 'Never', 'action': 'builtins:len'})
+
+
+class TestConfigLoader(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def write(self, *jobs):
+        with open(self.path, 'w') as f:
+            json.dump({'jobs': list(jobs)}, f)
+
+    def test_reload(self):
+        a = {'name': 'A', 'every': {'minutes': 10}, 'action': 'time:time'}
+        b = {'name': 'B', 'at': {'minute': '0'}, 'action': 'time:time'}
+        s = Scheduler()
+        loader = ConfigLoader(self.path, s)
+
+        self.write(a, b)
+        self.assertEqual(loader.reload(), (['A', 'B'], []))
+        job_a = s.get_job_by_name('A')
+
+        self.write(a, dict(b, at={'minute': '30'}), {'name': 'C', 'cron': '0 * * * *', 'action': 'time:time'})
+        self.assertEqual(loader.reload(), (['B', 'C'], ['B']))
+        self.assertIs(s.get_job_by_name('A'), job_a)
+        self.assertEqual(s.get_job_by_name('B').minute, '30')
+
+        self.write(b)
+        self.assertEqual(loader.reload(), (['B'], ['A', 'B', 'C']))
+        self.assertIsNone(s.get_job_by_name('A'))
+        self.assertEqual(loader.reload(), ([], []))
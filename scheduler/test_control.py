@@ -0,0 +1,93 @@
+import json
+import time
+import unittest
+import urllib.request
+
+from scheduler import Scheduler, every
+from scheduler.control import ControlServer, serve
+from scheduler.records import NO_TAGS, Point
+
+
+class TestControl(unittest.TestCase):
+    def setUp(self):
+        self.runs = 0
+
+        def action():
+            self.runs += 1
+            return (Point('m', NO_TAGS, i) for i in range(5))
+
+        self.scheduler = Scheduler()
+        self.scheduler.set_chunk_size(2)  # the parts of a run are one result
+        self.scheduler.add_job(every(hours=1, name='Fuel Prices', action=action))
+        self.server = serve(self.scheduler, ('127.0.0.1', 0), history=2)
+        self.server.results.max_lines = 3
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.stop()
+        self.scheduler.stop(timeout=5)
+
+    def request(self, path, method='GET'):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(self.url + path, method=method)) as f:
+                return f.status, json.loads(f.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def wait_runs(self, n):
+        for _ in range(500):
+            last = self.server.results.last('Fuel Prices')
+            if self.runs >= n and last and last[0].count == 5:
+                return
+            time.sleep(0.01)
+
+    def test_run(self):
+        status, jobs = self.request('/jobs')
+        self.assertEqual(status, 200)
+        self.assertEqual(jobs[0]['name'], 'Fuel Prices')
+        self.assertIsNotNone(jobs[0]['next'])
+        self.assertIsNone(jobs[0]['last'])
+
+        # queued twice before the scheduler runs, executed once
+        self.assertEqual(self.request('/jobs/Fuel%20Prices/run', 'POST')[0], 202)
+        self.assertEqual(self.request('/jobs/Fuel%20Prices/run', 'POST')[1]['queued'], False)
+        self.scheduler.start(False)
+        self.wait_runs(1)
+        self.assertEqual(self.runs, 1)
+
+        status, answer = self.request('/jobs/Fuel%20Prices/run?max_age=60', 'POST')
+        self.assertEqual((status, answer['queued']), (200, False))
+        self.assertIsNotNone(answer['cached'])
+
+        self.assertEqual(self.request('/jobs/Fuel%20Prices/run', 'POST')[0], 202)
+        self.wait_runs(2)
+        self.assertEqual(self.request('/jobs/Fuel%20Prices/run', 'POST')[0], 202)
+        self.wait_runs(3)
+        status, results = self.request('/jobs/Fuel%20Prices/results?n=5')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['count'], 5)
+        self.assertEqual([line.rsplit(' ', 1)[0] for line in results[0]['lines']],
+                         ['m value=0i', 'm value=1i', 'm value=2i'])
+
+    def test_unknown(self):
+        self.assertEqual(self.request('/jobs/Other/run', 'POST')[0], 404)
+        self.assertEqual(self.request('/jobs/Other/results')[0], 404)
+        self.assertEqual(self.request('/other')[0], 404)
+
+    def test_bad_request(self):
+        for path, method in (('/jobs/Fuel%20Prices/results?n=x', 'GET'), ('/jobs/Fuel%20Prices/results?n=-1', 'GET'),
+                             ('/jobs/Fuel%20Prices/run?max_age=soon', 'POST')):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path, method)[0], 400)
+
+    def test_removed_while_queued(self):
+        def run(name, max_age):
+            self.scheduler.remove_job_by_name(name)
+            return ControlServer.run(self.server, name, max_age)
+
+        self.server.run = run
+        self.assertEqual(self.request('/jobs/Fuel%20Prices/run', 'POST')[0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import http.server
+import threading
+import time
+import unittest
+
+from scheduler import every
+from scheduler.endpoints import MultiInserter
+from scheduler.records import NO_TAGS, Point
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delay)
+        status = 500 if self.server.fail else 204
+        if status == 204 and self.command == 'POST':
+            self.server.received.extend(body.decode().split('\n'))
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.received = []
+    server.fail = False
+    server.delay = 0.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestMultiInserter(unittest.TestCase):
+    def setUp(self):
+        self.servers = [_serve(), _serve()]
+        self.urls = ["http://127.0.0.1:{}/write?db=test".format(s.server_port) for s in self.servers]
+        self.job = every(minutes=1, name='Test')
+        self.inserter = None
+
+    def tearDown(self):
+        if self.inserter is not None:
+            self.inserter.stop()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def write(self, *values):
+        self.inserter(self.job, [Point('m', NO_TAGS, v, timestamp=1) for v in values])
+
+    def test_round_robin(self):
+        self.inserter = MultiInserter(self.urls, precision='s')
+        self.write(1)
+        self.write(2)
+        self.assertEqual([s.received for s in self.servers], [['m value=1i 0'], ['m value=2i 0']])
+
+        self.servers[0].fail = True
+        self.write(3)
+        self.write(4)
+        self.assertEqual(self.servers[1].received[1:], ['m value=3i 0', 'm value=4i 0'])
+        stats = self.inserter.stats()
+        self.assertEqual((stats[0]['healthy'], stats[0]['errors']), (False, 1))
+        self.assertEqual((stats[1]['writes'], stats[1]['points']), (3, 3))
+
+        # all down: kept and delivered after recovery
+        self.servers[1].fail = True
+        self.write(5)
+        self.servers[0].fail = False
+        self.inserter.check()
+        self.assertEqual(self.servers[0].received[-1], 'm value=5i 0')
+        self.assertTrue(self.inserter.stats()[0]['healthy'])
+
+    def test_replicate(self):
+        self.inserter = MultiInserter(self.urls, mode='replicate')
+        self.write(1)
+        self.servers[1].fail = True
+        self.write(2)
+        self.write(3)
+        self.assertEqual(self.inserter.stats()[1]['pending'], 2)
+        self.servers[1].fail = False
+        self.inserter.check()
+        for server in self.servers:
+            self.assertEqual(server.received, ['m value=1i 1', 'm value=2i 1', 'm value=3i 1'])
+        self.assertEqual(self.inserter.stats()[1]['pending'], 0)
+
+    def test_replicate_recovery_while_writing(self):
+        self.inserter = MultiInserter(self.urls, mode='replicate')
+        self.servers[1].fail = True
+        for value in (1, 2, 3):
+            self.write(value)
+        self.servers[1].fail = False
+        self.servers[1].delay = 0.02
+        endpoint = self.inserter.endpoints[1]
+        check = threading.Thread(target=self.inserter.check)
+        check.start()
+        # write as soon as the health check admitted the endpoint again, while it sends the pending writes
+        for _ in range(500):
+            if endpoint.healthy:
+                break
+            time.sleep(0.001)
+        self.write(4)
+        check.join()
+        self.assertEqual(self.servers[1].received, ['m value={}i 1'.format(v) for v in (1, 2, 3, 4)])
+        self.assertEqual(self.inserter.stats()[1]['pending'], 0)
+
+    def test_latency_ejection(self):
+        self.servers[0].delay = 0.2
+        self.inserter = MultiInserter(self.urls, max_latency=0.1)
+        self.write(1)
+        self.assertFalse(self.inserter.stats()[0]['healthy'])
+        self.write(2)
+        self.write(3)
+        self.assertEqual(self.servers[1].received, ['m value=2i 1', 'm value=3i 1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from scheduler import Scheduler, every
+from scheduler.influxdb import Dumper, Inserter, format_line
+from scheduler.records import Batch, NO_TAGS, Point
+
+
+class Collect(Dumper):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def _insert(self, lines):
+        self.lines.extend(lines)
+
+
+class TestTimestamps(unittest.TestCase):
+    def run_job(self, planned_ns, result, **properties):
+        s = Scheduler()
+        collect = Collect()
+        s.add_processor(collect)
+        job = every(seconds=10, name='Test', action=lambda: result, **properties)
+        s._process_func(job, planned_ns)()
+        return job, collect.lines
+
+    def test_planned(self):
+        batch = Batch('b', ('id',))
+        batch.append(1.5, id='1')
+        job, lines = self.run_job(10 ** 18, [1, Point('p', NO_TAGS, 2, timestamp=5)])
+        self.assertEqual([str(line) for line in lines], ['Test value=1i 1000000000000000000', 'p value=2i 5'])
+        job, lines = self.run_job(10 ** 18, batch)
+        self.assertEqual([line.timestamp for line in lines], [10 ** 18])
+
+    def test_actual(self):
+        job, lines = self.run_job(10 ** 18, 1, timestamp='actual')
+        self.assertEqual(lines[0].timestamp, job.started_ns)
+        job, lines = self.run_job(None, 1)
+        self.assertEqual(lines[0].timestamp, job.started_ns)
+        job, lines = self.run_job(10 ** 18, 1, timestamp='none')
+        self.assertIsNone(lines[0].timestamp)
+
+    def test_precision(self):
+        point = Point('p', NO_TAGS, 1.5, timestamp=1546300800123456789)
+        self.assertEqual(format_line(point, 's'), 'p value=1.5 1546300800')
+        self.assertEqual(format_line(point, 'ms'), 'p value=1.5 1546300800123')
+        self.assertEqual(format_line(point._replace(timestamp=None), 's'), 'p value=1.5')
+        self.assertEqual(Inserter('http://db:8086/write?db=a&precision=u', 's')._url,
+                         'http://db:8086/write?db=a&precision=s')
+
+
+if __name__ == '__main__':
+    unittest.main()
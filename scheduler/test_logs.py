@@ -0,0 +1,70 @@
+import logging
+import unittest
+
+from scheduler import Scheduler, every
+from scheduler.logs import DroppingQueueHandler, lazy, queue_logging
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class TestLogs(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('scheduler.test_logs')
+        self.logger.propagate = False
+        self.collect = Collect()
+        self.logger.addHandler(self.collect)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+    def test_lazy(self):
+        calls = []
+
+        def describe(value):
+            calls.append(value)
+            return "value {}".format(value)
+
+        self.logger.setLevel(logging.WARNING)
+        self.logger.info("Result: %s", lazy(describe, 1))
+        self.assertEqual(calls, [])
+        self.logger.warning("Result: %s", lazy(describe, 2))
+        self.assertEqual(set(calls), {2})
+        self.assertEqual(self.collect.messages, ["Result: value 2"])
+
+    def test_queue(self):
+        self.logger.setLevel(logging.INFO)
+        listener = queue_logging(max_records=100, logger=self.logger)
+        handler = self.logger.handlers[0]
+        self.assertIsInstance(handler, DroppingQueueHandler)
+        for i in range(3):
+            self.logger.info("Record %d", i)
+        try:
+            raise Exception("failed")
+        except Exception:
+            self.logger.exception("Job %s", 'x')
+        listener.stop()
+        self.assertEqual(self.collect.messages[:3], ["Record 0", "Record 1", "Record 2"])
+        self.assertTrue(self.collect.messages[3].startswith("Job x\nTraceback"))
+
+        # not consumed while stopped: the queue fills up and the rest is dropped
+        for i in range(150):
+            self.logger.info("Record %d", i)
+        self.assertEqual(handler.dropped, 50)
+
+    def test_job_repr(self):
+        s = Scheduler()
+        job = every(minutes=5, name='Test')
+        s.add_job(job)
+        self.assertIs(repr(job), repr(job))
+
+
+if __name__ == '__main__':
+    unittest.main()
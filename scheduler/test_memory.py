@@ -0,0 +1,52 @@
+import unittest
+
+from scheduler import Scheduler, every, timedelta_ns
+from scheduler.memory import SimulatedClock, Soak, rss
+
+START_NS = 1531173600 * 1000 * 1000 * 1000
+
+
+class TestSoak(unittest.TestCase):
+    def soak(self, action):
+        clock = SimulatedClock(START_NS)
+        s = Scheduler(clock)
+        s.add_job(every(minutes=10, name='Test', action=action))
+        soak = Soak(s, clock)
+        soak.run(timedelta_ns(days=7), sample_ns=timedelta_ns(days=1), warmup_ns=timedelta_ns(days=1))
+        return s, soak
+
+    def test_bounded(self):
+        cache = {}
+
+        def action():
+            cache[len(cache) % 10] = bytes(10000)
+            return len(cache)
+
+        s, soak = self.soak(action)
+        self.assertEqual(soak.runs, 7 * 24 * 6)
+        self.assertEqual(len(soak.samples), 9)
+        self.assertEqual(soak.samples[-1].t_ns, START_NS + timedelta_ns(days=7))
+        self.assertEqual(soak.check(1024 * 1024 * 1024, 256 * 1024), [])
+        self.assertEqual(s.get_job_by_name('Test').memory.runs, 7 * 24 * 6)
+
+    def test_leak(self):
+        leak = []
+
+        def action():
+            leak.append(bytes(10000))
+            return len(leak)
+
+        s, soak = self.soak(action)
+        problems = soak.check(1024 * 1024 * 1024, 1024 * 1024)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("Traced Python memory grew", problems[0])
+        self.assertIn('test_memory.py', soak.growth()[0])
+        memory = s.get_job_by_name('Test').memory
+        self.assertGreater(memory.traced_growth, 6 * 24 * 6 * 10000)
+
+    def test_rss(self):
+        self.assertGreater(rss(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
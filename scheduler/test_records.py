@@ -0,0 +1,27 @@
+import unittest
+
+from scheduler.records import Batch, NO_TAGS, Point, make_tags
+
+
+class TestPoint(unittest.TestCase):
+    def test_line_protocol(self):
+        self.assertEqual(str(Point('swr_wetter.temp', NO_TAGS, 21)), 'swr_wetter.temp value=21i')
+        self.assertEqual(str(Point('m', make_tags(name='A, B', id='x=1'), 1.5, timestamp=10)),
+                         r'm,id=x\=1,name=A\,\ B value=1.5 10')
+        self.assertEqual(str(Point('m x', NO_TAGS, 'say "hi"', field='text')), r'm\ x text="say \"hi\""')
+        self.assertEqual(str(Point('m', NO_TAGS, True)), 'm value=true')
+
+    def test_tags(self):
+        self.assertEqual(make_tags({'b': 1}, a='2'), (('a', '2'), ('b', '1')))
+
+
+class TestBatch(unittest.TestCase):
+    def test_iter(self):
+        batch = Batch('esg', ('sku', 'product_name'), 'price')
+        batch.append(10.5, sku='A', product_name='Gold')
+        batch.append(2.0, sku='B', product_name='Silber')
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(list(batch), [
+            Point('esg', (('product_name', 'Gold'), ('sku', 'A')), 10.5, 'price'),
+            Point('esg', (('product_name', 'Silber'), ('sku', 'B')), 2.0, 'price'),
+        ])
@@ -0,0 +1,73 @@
+import unittest
+
+from scheduler import every, time_ns, timedelta_ns
+from scheduler.records import NO_TAGS, Point
+from scheduler.rollup import Rollup, label
+
+MINUTE = timedelta_ns(minutes=1)
+HOUR = timedelta_ns(hours=1)
+
+
+class Collect:
+    def __init__(self):
+        self.points = []
+
+    def __call__(self, job, result):
+        self.points.extend(result)
+
+
+class TestRollup(unittest.TestCase):
+    def test_label(self):
+        self.assertEqual([label(ns) for ns in (HOUR, 5 * MINUTE, timedelta_ns(seconds=90), timedelta_ns(days=1))],
+                         ['1h', '5m', '90s', '1d'])
+
+    def test_windows(self):
+        out = Collect()
+        rollup = Rollup([out], {'1h': HOUR}, raw=False)
+        job = every(minutes=1, name='Rate')
+        now = time_ns()
+        start = now - now % HOUR
+        for i, value in enumerate([3.0, 1, 2, 6]):
+            rollup(job, [Point('rate', NO_TAGS, value, timestamp=start + i * 20 * MINUTE),
+                         Point('state', NO_TAGS, 'idle', timestamp=start)])
+        # strings are passed on
+        self.assertEqual([p.value for p in out.points if p.measurement == 'state'], ['idle'] * 4)
+        rolled = {p.field: p.value for p in out.points if p.measurement == 'rate_1h'}
+        self.assertEqual(rolled, {'value_count': 3, 'value_min': 1.0, 'value_max': 3.0, 'value_mean': 2.0,
+                                  'value_last': 2.0})
+        self.assertEqual({p.timestamp for p in out.points if p.measurement == 'rate_1h'}, {start})
+
+        out.points.clear()
+        rollup.flush()
+        self.assertEqual({p.field: p.value for p in out.points}['value_count'], 1)
+
+    def test_late_points(self):
+        out = Collect()
+        rollup = Rollup([out], {'1h': HOUR, '1m': MINUTE}, raw=False)
+        job = every(minutes=1, name='Rate')
+        now = time_ns()
+        old = now - now % HOUR - 2 * HOUR
+        rollup(job, [Point('rate', NO_TAGS, 1.0, timestamp=old + MINUTE)])
+        self.assertEqual([p.value for p in out.points if p.field == 'value_count'], [1, 1])
+        # the windows were closed as they ended before now, the point is not aggregated again
+        out.points.clear()
+        rollup(job, [Point('rate', NO_TAGS, 2.0, timestamp=old + MINUTE + 1)])
+        self.assertEqual(out.points, [])
+        self.assertEqual(rollup.late_points(), {'1h': 1, '1m': 1})
+        rollup(job, [Point('rate', NO_TAGS, 3.0, timestamp=old + 2 * MINUTE)])
+        self.assertEqual([(p.measurement, p.value) for p in out.points if p.field == 'value_count'],
+                         [('rate_1m', 1)])
+        self.assertEqual(rollup.late_points(), {'1h': 2, '1m': 1})
+
+    def test_raw_and_names(self):
+        out = Collect()
+        rollup = Rollup([out], {'1m': MINUTE}, names=['A'])
+        rollup(every(minutes=1, name='A'), 5)
+        rollup(every(minutes=1, name='B'), [Point('b', NO_TAGS, 1)])
+        self.assertEqual([p.measurement for p in out.points], ['A', 'b'])
+        rollup.flush()
+        self.assertEqual({p.measurement for p in out.points[2:]}, {'A_1m'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,6 @@
+import os
+import threading
+import time
 import unittest
 
 from scheduler import *
@@ -36,6 +39,46 @@ class TestProcessor(unittest.TestCase):
 
         self.assertEqual(p.values, (job, 1234))
 
+    def test_stream(self):
+        received = {'a': [], 'b': []}
+        s = Scheduler()
+        s.set_chunk_size(3)
+        s.add_processor(lambda job, result: received['a'].append(result))
+        s.add_processor(lambda job, result: received['b'].append(result))
+
+        s._process_func(every(seconds=10, action=lambda: (i for i in range(7))))()
+        # every processor gets all items of a generator, in chunks
+        self.assertEqual(received['a'], [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(received['b'], received['a'])
+
+        received['a'].clear()
+        s._process_func(every(seconds=10, action=lambda: iter(())))()
+        self.assertEqual(received['a'], [[]])
+
+        received['a'].clear()
+        s._process_func(every(seconds=10, action=lambda: [0, 1, 2, 3]))()
+        self.assertEqual(received['a'], [[0, 1, 2, 3]])
+
+
+class TestCpuMap(unittest.TestCase):
+    def test_inline(self):
+        s = Scheduler()
+        job = every(seconds=10, cpu_heavy=True)
+        self.assertEqual(list(s.cpu_map(job, abs, [-1, 2, -3])), [1, 2, 3])
+
+    def test_pool(self):
+        s = Scheduler()
+        s.set_worker_processes(2)
+        try:
+            job = every(seconds=10, cpu_heavy=True)
+            self.assertEqual(list(s.cpu_map(job, divmod, [7, 9], [2, 4])), [(3, 1), (2, 1)])
+            self.assertIsNotNone(s._pool)
+
+            job = every(seconds=10, name='Light')
+            self.assertEqual(list(s.cpu_map(job, abs, [-1])), [1])
+        finally:
+            s.close()
+
 
 class TestCronJob(unittest.TestCase):
     def testas(self):
@@ -158,6 +201,69 @@ class TestCronJob(unittest.TestCase):
             self.assertTrue(next_run_dt.minute == 0)
             hours.remove(next_run_dt.hour)
 
+
+class TestCronJobCache(unittest.TestCase):
+    # the expectations of the daylight saving time changes are those of Europe/Berlin
+    def setUp(self):
+        self.tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Berlin'
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = self.tz
+        time.tzset()
+
+    def runs(self, job, start, n):
+        t_ns = int(start.timestamp()) * 1000 * 1000 * 1000
+        runs = []
+        for _ in range(n):
+            t_ns = job.next(0, t_ns, timedelta_ns(days=2))
+            runs.append(t_ns)
+        return runs
+
+    def test_dst_forward(self):
+        # 2018-03-25 02:00 CET -> 03:00 CEST, 02:30 does not exist and is run at 03:30 once
+        runs = self.runs(cron('30 * * * *'), datetime.datetime(2018, 3, 25, 0, 45), 3)
+        self.assertEqual([datetime.datetime.utcfromtimestamp(t / 1e9).strftime('%H:%M') for t in runs],
+                         ['00:30', '01:30', '02:30'])
+        self.assertEqual([datetime_from_ns(t).strftime('%H:%M') for t in runs], ['01:30', '03:30', '04:30'])
+
+    def test_dst_back(self):
+        # 2018-10-28 03:00 CEST -> 02:00 CET, 02:30 occurs twice and is run at its first occurrence
+        runs = self.runs(cron('30 * * * *'), datetime.datetime(2018, 10, 28, 1, 45), 3)
+        self.assertEqual([datetime.datetime.utcfromtimestamp(t / 1e9).strftime('%H:%M') for t in runs],
+                         ['00:30', '02:30', '03:30'])
+        runs = self.runs(cron('0 12 * * *'), datetime.datetime(2018, 10, 27, 11, 0), 2)
+        self.assertEqual(runs[1] - runs[0], timedelta_ns(hours=25))
+
+    def test_cache(self):
+        job = at(minute='*/15', hour='5-24', name='Clever-Tanken')
+        start = datetime.datetime(2018, 7, 17, 11, 51, 10)
+        fills = []
+        fill = job._fill
+        job._fill = lambda t_ns: (fills.append(t_ns), fill(t_ns))
+        runs = self.runs(job, start, 4 * 19 + 1)
+        self.assertEqual(datetime_from_ns(runs[0]), datetime.datetime(2018, 7, 17, 12, 0))
+        self.assertEqual(datetime_from_ns(runs[-1]), datetime.datetime(2018, 7, 18, 12, 0))
+        self.assertEqual(len(fills), 1)
+
+        # clock set back
+        earlier = job.next(0, runs[0] - timedelta_ns(hours=2, minutes=1), timedelta_ns(days=2))
+        self.assertEqual(datetime_from_ns(earlier), datetime.datetime(2018, 7, 17, 10, 0))
+        self.assertEqual(len(fills), 2)
+
+    def test_rare(self):
+        t_ns = int(datetime.datetime(2019, 1, 1).timestamp()) * 1000 * 1000 * 1000
+        leap_day = cron('0 0 29 2 *')
+        self.assertEqual(datetime_from_ns(leap_day.next(0, t_ns, timedelta_ns(days=500))),
+                         datetime.datetime(2020, 2, 29))
+        self.assertIsNone(leap_day.next(0, t_ns, timedelta_ns(days=2)))
+        self.assertIsNone(cron('0 0 31 2 *').next(0, t_ns, timedelta_ns(days=5000)))
+
+
 class TestScheduler(unittest.TestCase):
     def setUp(self):
         self.scheduler = Scheduler()
@@ -169,3 +275,97 @@ class TestScheduler(unittest.TestCase):
             self.assertFalse(True, 'must not happen')
         except:
             pass
+
+    def test_run_now(self):
+        executed = threading.Event()
+        self.scheduler.start(False)
+        try:
+            # the loop sleeps without any job, adding one and running it wakes it up
+            self.scheduler.add_job(at(minute='0', hour='0', name='Run', action=executed.set))
+            self.scheduler.run_now('Run')
+            self.assertTrue(executed.wait(5))
+            with self.assertRaises(Exception):
+                self.scheduler.run_now('Unknown')
+        finally:
+            self.scheduler.stop(timeout=5)
+        self.assertIsNone(self.scheduler._thread)
+
+    def test_remove(self):
+        executed = []
+        self.scheduler.add_job(every(hours=1, name='Removed', action=lambda: executed.append(1)))
+        self.scheduler.run_now('Removed')
+        self.scheduler.remove_job_by_name('Removed')
+        self.scheduler.start(False)
+        self.scheduler.stop(drain=True, timeout=5)
+        self.assertEqual(executed, [])
+
+    def test_add_jobs(self):
+        self.scheduler.add_jobs([every(hours=1, name='A'), at(minute='0', name='B')])
+        self.assertEqual(sorted(self.scheduler.next_runs()), ['A', 'B'])
+        self.assertIsNotNone(self.scheduler.next_due_ns())
+        with self.assertRaises(Exception):
+            self.scheduler.add_jobs([every(hours=1, name='C'), every(hours=1, name='A')])
+        self.assertIsNone(self.scheduler.get_job_by_name('C'))
+
+    def test_prime(self):
+        lock = threading.Lock()
+        running = []
+        concurrent = []
+        results = []
+
+        def action(job):
+            with lock:
+                running.append(job.name)
+                concurrent.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(job.name)
+            return 1
+
+        self.scheduler.add_processor(lambda job, result: results.append(job.name))
+        self.scheduler.add_jobs(at(minute='0', hour='8', name=str(i), action=action) for i in range(6))
+        next_runs = self.scheduler.next_runs()
+        self.assertEqual(self.scheduler.prime(workers=3, timeout=5), {str(i): True for i in range(6)})
+        self.assertEqual(sorted(results), [str(i) for i in range(6)])
+        self.assertEqual(max(concurrent), 3)
+        self.assertEqual(self.scheduler.next_runs(), next_runs)
+        self.assertEqual(self.scheduler.prime(['1'], timeout=5), {'1': True})
+
+    def test_prime_timeout(self):
+        release = threading.Event()
+        executed = []
+
+        def action():
+            executed.append(1)
+            release.wait(5)
+
+        self.scheduler.add_job(every(hours=1, name='Slow', action=action))
+        self.assertEqual(self.scheduler.prime(timeout=0.01), {'Slow': False})
+        self.assertEqual(self.scheduler.prime(timeout=0.01), {'Slow': False})
+        self.scheduler.run_now('Slow')
+        self.scheduler.run_pending()
+        self.assertEqual(executed, [1])
+        release.set()
+        for _ in range(500):
+            if not self.scheduler._priming:
+                break
+            time.sleep(0.01)
+        self.scheduler.run_now('Slow')
+        self.scheduler.run_pending()
+        self.assertEqual(executed, [1, 1])
+
+    def test_drain(self):
+        for drain, expected in ((True, ['A', 'B']), (False, ['A'])):
+            executed = []
+
+            def a(scheduler, job):
+                executed.append('A')
+                scheduler.run_now('B')
+                scheduler.stop(drain=drain)
+
+            s = Scheduler()
+            s.add_job(every(hours=1, name='A', action=a))
+            s.add_job(every(hours=1, name='B', action=lambda: executed.append('B')))
+            s.run_now('A')
+            s.start(True)
+            self.assertEqual(executed, expected)
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from scheduler import every, Scheduler
+from scheduler.sharding import Ring, Shard
+
+NAMES = ["Job-{}".format(i) for i in range(50)]
+
+
+def _claim_all(path: str, node: str, now_ns: int, queue, joined) -> None:
+    shard = Shard(path, node, ttl_ns=10 ** 18)
+    shard.heartbeat(now_ns)
+    # claim once all nodes joined, so they agree on the owners
+    joined.wait(30)
+    claimed = []
+    for planned_ns in range(3):
+        for name in NAMES:
+            # claiming twice must not succeed twice
+            if shard.claim(name, planned_ns, now_ns) | shard.claim(name, planned_ns, now_ns):
+                claimed.append((name, planned_ns))
+    queue.put(claimed)
+
+
+class TestRing(unittest.TestCase):
+    def test_stable(self):
+        ring = Ring(['a', 'b', 'c'])
+        smaller = Ring(['a', 'b'])
+        for name in NAMES:
+            if ring.owner(name) != 'c':
+                self.assertEqual(ring.owner(name), smaller.owner(name))
+        self.assertEqual({ring.owner(name) for name in NAMES}, {'a', 'b', 'c'})
+        self.assertIsNone(Ring([]).owner('x'))
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_failover(self):
+        a = Shard(self.path, 'a', ttl_ns=100)
+        b = Shard(self.path, 'b', ttl_ns=100)
+        a.heartbeat(1000)
+        b.heartbeat(1000)
+        self.assertEqual(a.nodes(1050), ['a', 'b'])
+        owned_by_b = [name for name in NAMES if a.owner(name, 1050) == 'b']
+        self.assertTrue(owned_by_b)
+        self.assertFalse(a.claim(owned_by_b[0], 1, 1050))
+
+        # b dies, a takes over
+        a.heartbeat(1200)
+        self.assertEqual(a.nodes(1250), ['a'])
+        self.assertTrue(a.claim(owned_by_b[0], 2, 1250))
+        self.assertFalse(a.claim(owned_by_b[0], 2, 1250))
+
+    def test_processes(self):
+        queue = multiprocessing.Queue()
+        joined = multiprocessing.Barrier(3)
+        processes = [multiprocessing.Process(target=_claim_all,
+                                             args=(self.path, 'node{}'.format(i), 1000, queue, joined))
+                     for i in range(3)]
+        for p in processes:
+            p.start()
+        results = [queue.get(timeout=30) for _ in processes]
+        for p in processes:
+            p.join()
+
+        claimed = [run for result in results for run in result]
+        # every run is executed exactly once, by its owner
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(claimed), len(NAMES) * 3)
+        self.assertEqual({len(result) > 0 for result in results}, {True})
+
+    def test_set_shard_plans_again(self):
+        s = Scheduler(lambda: 10 ** 12 + 3)
+        s.add_job(every(seconds=10, name='Early'))
+        s.set_shard(Shard(self.path, 'a'))
+        # aligned to the epoch like on all other nodes
+        self.assertEqual(s.next_runs(), {'Early': 10 ** 12 + 10 ** 10})
+        self.assertEqual(s.next_due_ns(), 10 ** 12 + 10 ** 10)
+
+    def test_scheduler_skips(self):
+        shard = Shard(self.path, 'a')
+        Shard(self.path, 'b').heartbeat()
+        shard.heartbeat()
+        s = Scheduler()
+        s.set_shard(shard)
+        executed = []
+        for name in NAMES[:10]:
+            s._process_func(every(seconds=10, name=name, action=lambda j: executed.append(j.name)), 1)()
+        self.assertEqual(executed, [name for name in NAMES[:10] if shard.owner(name) == 'a'])
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from scheduler import every
+from scheduler.records import make_tags, NO_TAGS, Point
+from scheduler.store import Store
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_range_and_last(self):
+        store = Store(self.path, block_size=100, max_buffered=1000)
+        job = every(seconds=10, name='Test')
+        store(job, [Point('temp', NO_TAGS, float(i) / 3, timestamp=1000 + i * 10) for i in range(250)])
+        store(job, [Point('price', make_tags(id='1'), 1.5, timestamp=5)])
+
+        self.assertEqual(store.series(), ['price,id=1 value', 'temp value'])
+        self.assertEqual(store.last('temp value'), (1000 + 249 * 10, 249 / 3))
+        self.assertEqual(store.range('temp value', 1095, 1125), [(1100, 10 / 3), (1110, 11 / 3), (1120, 4.0)])
+        self.assertEqual(len(store.range('temp value', 0, 10 ** 18)), 250)
+
+        # reopen, the unflushed rest is lost without flush
+        store.flush()
+        store = Store(self.path)
+        self.assertEqual(store.last('temp value'), (1000 + 249 * 10, 249 / 3))
+        self.assertEqual(store.last('price,id=1 value'), (5, 1.5))
+        self.assertEqual(store.range('temp value', 0, 10 ** 18)[:2], [(1000, 0.0), (1010, 1 / 3)])
+        self.assertIsNone(store.last('unknown'))
+
+    def test_bounded_and_truncated(self):
+        store = Store(self.path, block_size=1000, max_buffered=10)
+        job = every(seconds=10, name='Test')
+        store(job, [Point('a', NO_TAGS, i, timestamp=i) for i in range(25)])
+        self.assertLessEqual(store._buffered, 10)
+        store.flush()
+
+        segment = store._series['a value'].segments()[0]
+        with open(segment, 'ab') as f:
+            f.write(b'TSB1 partial')
+        store = Store(self.path)
+        self.assertEqual(len(store.range('a value', 0, 100)), 25)
+        store(job, [Point('a', NO_TAGS, 99, timestamp=99)])
+        store.flush()
+        self.assertEqual(store.last('a value'), (99, 99.0))
+        self.assertEqual(len(store.range('a value', 0, 100)), 26)
+
+    def test_max_age(self):
+        store = Store(self.path, block_size=1000, max_age=0.05)
+        job = every(seconds=10, name='Test')
+        store(job, [Point('a', NO_TAGS, 1, timestamp=1)])
+        store(job, [Point('b', NO_TAGS, 2, timestamp=2)])
+        self.assertEqual(store._buffered, 2)
+        time.sleep(0.06)
+        store(job, [Point('a', NO_TAGS, 3, timestamp=3)])
+        self.assertEqual(store._buffered, 0)
+
+        store = Store(self.path)
+        self.assertEqual(store.range('a value', 0, 100), [(1, 1.0), (3, 3.0)])
+        self.assertEqual(store.last('b value'), (2, 2.0))
+
+
+    def test_max_age_without_appends(self):
+        store = Store(self.path, block_size=1000, max_age=0.05)
+        store.start()
+        try:
+            store(every(seconds=10, name='Test'), [Point('a', NO_TAGS, 1, timestamp=1)])
+            for _ in range(100):
+                if store._buffered == 0:
+                    break
+                time.sleep(0.05)
+        finally:
+            store._stop.set()
+            store._thread.join()
+        self.assertEqual(store._buffered, 0)
+        self.assertEqual(Store(self.path).last('a value'), (1, 1.0))
+
+    def test_last_out_of_order(self):
+        store = Store(self.path, block_size=2, segment_size=1)
+        job = every(seconds=10, name='Test')
+        # every block starts a segment, named by its first timestamp
+        store(job, [Point('a', NO_TAGS, float(t), timestamp=t) for t in (100, 500, 200, 300)])
+        store.flush()
+        self.assertEqual(len(store._series['a value'].segments()), 2)
+        self.assertEqual(Store(self.path).last('a value'), (500, 500.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,133 +1,118 @@
 #!/usr/bin/env python3
+import atexit
 import logging
-
-from pyinflux.client import Line
-
-import jobs.clever_tanken
-import jobs.davis_vantage
-import jobs.esg
-import jobs.hplq1300n
-import jobs.prix_carburant
-import jobs.swr_wetter
-import jobs.tankerkoenig
-import jobs.telexoo
-import jobs.transferwise
+import os
+import signal
+
+import jobs
+import scheduler.columnar
+import scheduler.config
+import scheduler.control
+import scheduler.endpoints
 import scheduler.influxdb
+import scheduler.logs
+import scheduler.rollup
+import scheduler.sharding
+import scheduler.store
 
 logging.basicConfig(level=logging.INFO)
 
 s = scheduler.Scheduler()
 
-transform_swr = lambda v: Line(v['name'], {}, {'value': v['value']})
-s.add_job(scheduler.at(minute='0,15,30,45', name='SWR Wetter',
-                       action=lambda: map(transform_swr, jobs.swr_wetter.job('DE0008834'))))
-
-transform_laserjet = lambda v: Line('hplq1300n.toner.{}'.format(v.hostname), {}, {'value': v.value})
-s.add_job(scheduler.at(minute='*/5', name="Laserjet Status",
-                       action=lambda: transform_laserjet(jobs.hplq1300n.job('10.1.0.10'))))
-
-transform_telexoo = lambda qoute: Line('telexoo.{}{}_X'.format(qoute.curr_from, qoute.curr_to), {},
-                                       {'value': qoute.rate})
-s.add_job(scheduler.every(minutes=10, name="Telexoo.com-CHFGBP",
-                          action=lambda: transform_telexoo(jobs.telexoo.execute("CHF", "GBP"))))
-s.add_job(scheduler.every(minutes=10, name="Telexoo.com-CHFEUR",
-                          action=lambda: transform_telexoo(jobs.telexoo.execute("CHF", "EUR"))))
-s.add_job(scheduler.every(minutes=10, name="Telexoo.com-EURCHF",
-                          action=lambda: transform_telexoo(jobs.telexoo.execute("EUR", "CHF"))))
-s.add_job(scheduler.every(minutes=10, name="Telexoo.com-CHFPLN",
-                          action=lambda: transform_telexoo(jobs.telexoo.execute("CHF", "PLN"))))
-
-transform_transferwise = lambda d: Line('transferwise.{}{}_X'.format(d.curr_from, d.curr_to), {}, {
-    'value': d.rate})
-s.add_job(scheduler.every(minutes=10, name='Transferwise-CHFEUR',
-                          action=lambda: transform_transferwise(jobs.transferwise.job('CHF', 'EUR'))))
-s.add_job(scheduler.every(minutes=10, name='Transferwise-EURCHF',
-                          action=lambda: transform_transferwise(jobs.transferwise.job('EUR', 'CHF'))))
-
-transform_esg = lambda products: [Line('esg', {'sku': product.sku, 'product_name': product.name},
-                                       {'price': product.price}) for product in products]
-s.add_job(scheduler.at(minute="0", hour="8,10,12,14,16,18,20", name="ESG",
-                       action=lambda: transform_esg(jobs.esg.execute())))
-
-s.add_job(scheduler.every(hours=2, name="Wettermichel.de", action=
-lambda: [Line('wettermichel.{}'.format(name), {}, {'value': value})
-         for name, value in
-         jobs.davis_vantage.load('http://wettermichel.de/davis/con_davis.php').items()]))
-
-
-def execute_prix_carburant():
-    for station in jobs.prix_carburant.execute('1630001', '1210003', '1630003', '1210002', '1710001',
-                                               '67760001', '67240002', '67452001',
-                                               '68740001',  # Fessenheim
-                                               '67500009',  # Hagenau
-                                               '67116002'):  # Reichstett
-        for fuelname, price in station.prices.items():
-            tags = {'name': station.station_name, 'id': 'prix_carburant:{}'.format(station.id)}
-            fields = {'value': price}
-            if fuelname == "SP95":
-                yield Line('tankstelle.SP95-E5', tags, fields)
-            elif fuelname == "SP95-E10":
-                yield Line('tankstelle.SP95-E10', tags, fields)
-            elif fuelname == "Gazole":
-                yield Line('tankstelle.Diesel', tags, fields)
-            elif fuelname == "E85":
-                yield Line('tankstelle.E85', tags, fields)
-
-
-s.add_job(scheduler.at(minute='10', hour='5-22', name="prix_carburant",
-                       action=execute_prix_carburant))
-
-
-def transform_clever(tankstelle: jobs.clever_tanken.Tankstelle):
-    for fuelname, price in tankstelle.preise.items():
-        tags = {'name': tankstelle.name, 'id': 'clever_tanken:{}'.format(tankstelle.id)}
-        fields = {'value': price}
-        if fuelname == "Super E5":
-            yield Line('tankstelle.SP95-E5', tags, fields)
-        elif fuelname == "Super E10":
-            yield Line('tankstelle.SP95-E10', tags, fields)
-        elif fuelname == "Diesel":
-            yield Line('tankstelle.Diesel', tags, fields)
-
-
-s.add_job(scheduler.at(minute='*/15', hour='5-24', name='Clever-Tanken', action=
-lambda: [line for station in map(transform_clever, map(jobs.clever_tanken.execute, [
-    '20219', '11985', '17004',
-    '19715',  # Kaiserst. Mineralölvertrieb Schwärzle
-    '54296',  # ESSO Endingen
-    '10355',  # ARAL Tiengen
-    '20144',  # bft Rankackerweg
-    '27534',  # EXTROL Freiburg
-    '55690',  # Rheinmünster
-    '15220',  # Esso Achern
-    '5853',  # JET Rastatt
-    '24048',  # Bodersweier
-    '3819',  # JET Freiburg
-])) for line in station]))
-
-
-def transform_tankerkoenig(job):
-    api_key = job.properties['api_key']
-    for data in jobs.tankerkoenig.execute(api_key, 48.651822, 7.927891, 15.0):
-        yield Line("tankerkoenig.{}".format(data.type), {'name': data.name, 'id': data.id}, {'value': data.price})
-
-
-s.add_job(scheduler.at(minute='*/10', hour='5-24', name='Tankerkönig',
-                       action=transform_tankerkoenig))
-
 if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('--influx-url', nargs=1, default=None)
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tab_main.json'),
+                        help='job configuration file (JSON or TOML), default: tab_main.json')
+    parser.add_argument('--reload-interval', type=float, default=10.0,
+                        help='seconds between checks for modifications of the configuration, 0 disables reload')
+    parser.add_argument('--influx-url', nargs='+', default=None,
+                        help='InfluxDB write URL, several URLs are written according to --influx-mode')
+    parser.add_argument('--influx-mode', choices=scheduler.endpoints.MODES, default='round-robin',
+                        help='round-robin: spread the writes with failover, replicate: write to all URLs')
+    parser.add_argument('--precision', choices=scheduler.influxdb.PRECISIONS, default='n',
+                        help='precision of the timestamps written to InfluxDB (default: n, nanoseconds)')
     parser.add_argument('--tankerkoenig', nargs=1, default='00000000-0000-0000-0000-000000000002')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='number of worker processes for parsing in cpu_heavy jobs (default: 0, no workers)')
+    parser.add_argument('--parser', choices=jobs.PARSER_BACKENDS, default=jobs.get_parser_backend(),
+                        help='HTML parser used by the scrapers')
+    parser.add_argument('--store', default=None,
+                        help='directory of an embedded time-series store to write the results into')
+    parser.add_argument('--columnar', default=None,
+                        help='directory to export the results into as Parquet files (requires pyarrow)')
+    parser.add_argument('--columnar-format', choices=scheduler.columnar.FORMATS, default='parquet')
+    parser.add_argument('--shard', default=None,
+                        help='SQLite file on shared storage, split the jobs with all instances using the same file')
+    parser.add_argument('--node', default=None, help='name of this instance in the shard (default: hostname:pid)')
+    parser.add_argument('--control', default=None, metavar='HOST:PORT',
+                        help='serve the HTTP control endpoint (list jobs, run now, last results)')
+    parser.add_argument('--rollup', type=int, action='append', default=[], metavar='SECONDS',
+                        help='also write min/max/mean/count/last per window of SECONDS, can be repeated')
+    parser.add_argument('--rollup-only', action='store_true', help='write only the rolled-up values')
+    parser.add_argument('--prime', action='store_true',
+                        help='run all jobs once on startup, so the dashboards do not wait for the next runs')
+    parser.add_argument('--prime-workers', type=int, default=4, help='jobs run at the same time by --prime')
+    parser.add_argument('--prime-timeout', type=float, default=120.0,
+                        help='seconds --prime waits before the schedule starts')
+    parser.add_argument('--log-queue', action='store_true',
+                        help='write the log in a background thread, records are dropped if it falls behind')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='level of the root logger, DEBUG also logs the answers of InfluxDB')
     args = parser.parse_args()
 
-    tanker: scheduler.Job = s.get_job_by_name('Tankerkönig')
-    tanker.properties['api_key'] = args.tankerkoenig[0]
-
-    if args.influx_url is not None:
-        s.add_processor(scheduler.influxdb.Inserter(args.influx_url[0]))
-    else:
-        s.add_processor(scheduler.influxdb.Dumper())
+    logging.getLogger().setLevel(args.log_level)
+    if args.log_queue:
+        atexit.register(scheduler.logs.queue_logging().stop)
+
+    s.set_worker_processes(args.processes)
+    jobs.set_parser_backend(args.parser)
+
+    # before the jobs are loaded, their first runs are aligned for the shard
+    if args.shard is not None:
+        shard = scheduler.sharding.Shard(args.shard, args.node)
+        shard.start()
+        s.set_shard(shard)
+    config = scheduler.config.ConfigLoader(args.config, s, {'Tankerkönig': {'api_key': args.tankerkoenig[0]}})
+    config.reload()
+    if args.reload_interval > 0:
+        config.start(args.reload_interval)
+
+    outputs = []
+    if args.influx_url is not None and len(args.influx_url) > 1:
+        inserter = scheduler.endpoints.MultiInserter(args.influx_url, args.influx_mode, args.precision)
+        inserter.start()
+        atexit.register(inserter.stop)
+        outputs.append(inserter)
+    elif args.influx_url is not None:
+        outputs.append(scheduler.influxdb.Inserter(args.influx_url[0], args.precision))
+    if args.store is not None:
+        store = scheduler.store.Store(args.store)
+        store.start()
+        atexit.register(store.stop)
+        outputs.append(store)
+    if args.columnar is not None:
+        sink = scheduler.columnar.ColumnarSink(args.columnar, args.columnar_format)
+        atexit.register(sink.flush)
+        outputs.append(sink)
+    if args.influx_url is None and args.store is None and args.columnar is None:
+        outputs.append(scheduler.influxdb.Dumper())
+    if args.rollup:
+        resolutions = {scheduler.rollup.label(seconds * 1000 * 1000 * 1000): seconds * 1000 * 1000 * 1000
+                       for seconds in args.rollup}
+        rollup = scheduler.rollup.Rollup(outputs, resolutions, raw=not args.rollup_only)
+        atexit.register(rollup.flush)
+        outputs = [rollup]
+    for output in outputs:
+        s.add_processor(output)
+
+    if args.control is not None:
+        host, _, port = args.control.rpartition(':')
+        scheduler.control.serve(s, (host or '127.0.0.1', int(port)))
+    if args.prime:
+        s.prime(workers=args.prime_workers, timeout=args.prime_timeout)
+    # finish the running job and the due runs on termination
+    signal.signal(signal.SIGTERM, lambda signum, frame: s.stop(drain=True))
     s.start(True)
+    s.close()
@@ -0,0 +1,131 @@
+"""
+Actions and transforms referenced by ``tab_main.json``.
+
+Job modules are imported inside the functions, so only the modules of the configured jobs are loaded, on
+their first execution.
+"""
+import os
+
+from scheduler.records import Batch, NO_TAGS, Point
+
+
+def telexoo(qoute):
+    return Point('telexoo.{}{}_X'.format(qoute.curr_from, qoute.curr_to), NO_TAGS, qoute.rate)
+
+
+def transferwise(d):
+    return Point('transferwise.{}{}_X'.format(d.curr_from, d.curr_to), NO_TAGS, d.rate)
+
+
+def wettermichel(values):
+    return [Point('wettermichel.{}'.format(name), NO_TAGS, value) for name, value in values.items()]
+
+
+def esg(products):
+    batch = Batch('esg', ('sku', 'product_name'), 'price')
+    for product in products:
+        batch.append(product.price, sku=product.sku, product_name=product.name)
+    return batch
+
+
+def execute_esg(scheduler, job):
+    import jobs.esg
+    return esg(*scheduler.cpu_map(job, jobs.esg.parse, [jobs.esg.fetch()]))
+
+
+_registries = {}
+
+
+def _registry(job):
+    """
+    :return: the :class:`jobs.stations.Registry` of the property ``registry`` (file relative to this directory),
+             loaded again when the file changed. None without the property
+    """
+    import jobs.stations
+    path = job.properties.get('registry')
+    if path is None:
+        return None
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    mtime = os.stat(path).st_mtime
+    cached_mtime, registry = _registries.get(path, (None, None))
+    if registry is None or cached_mtime != mtime:
+        registry = jobs.stations.Registry.load(path)
+        _registries[path] = (mtime, registry)
+    return registry
+
+
+def _stations(job, registry, source):
+    """:return: the station ids of the property ``stations`` (mapping id -> comment), else of the registry"""
+    if 'stations' in job.properties:
+        return list(job.properties['stations'])
+    return registry.ids(source)
+
+
+def execute_prix_carburant(scheduler, job):
+    """Property ``registry`` (stations file, see :mod:`jobs.stations`) and/or ``stations``"""
+    import jobs.fuel
+    import jobs.prix_carburant
+    registry = _registry(job)
+    stations = _stations(job, registry, 'prix_carburant')
+    records = ((station.id, station.station_name, station.prices) for station in scheduler.cpu_map(
+        job, jobs.prix_carburant.parse, map(jobs.prix_carburant.fetch, stations), stations))
+    return jobs.fuel.normalize('prix_carburant', records).points(id_prefix='prix_carburant', registry=registry)
+
+
+def execute_clever_tanken(scheduler, job):
+    """Property ``registry`` (stations file, see :mod:`jobs.stations`) and/or ``stations``"""
+    import jobs.clever_tanken
+    import jobs.fuel
+    registry = _registry(job)
+    stations = _stations(job, registry, 'clever_tanken')
+    records = ((station.id, station.name, station.preise) for station in scheduler.cpu_map(
+        job, jobs.clever_tanken.parse, map(jobs.clever_tanken.fetch, stations), stations))
+    return list(jobs.fuel.normalize('clever_tanken', records).points(id_prefix='clever_tanken', registry=registry))
+
+
+def execute_tankerkoenig(job):
+    """Properties ``api_key``, ``lat``, ``lng``, ``rad``, optional ``registry`` (see :mod:`jobs.stations`)"""
+    import jobs.fuel
+    import jobs.tankerkoenig
+    p = job.properties
+    records = jobs.tankerkoenig.stations(p['api_key'], p['lat'], p['lng'], p['rad'])
+    return jobs.fuel.normalize('tankerkoenig', records).points('tankerkoenig', registry=_registry(job))
+
+
+_tankerkoenig_indexes = {}
+
+
+def execute_tankerkoenig_region(job):
+    """
+    Properties ``api_key``, ``area`` (list of [lat, lng] corners), optional ``rad`` (km), ``index``
+    (file for the station index, kept in memory only if missing) and ``registry`` (see :mod:`jobs.stations`)
+    """
+    import jobs.fuel
+    import jobs.tankerkoenig
+    p = job.properties
+    index = _tankerkoenig_indexes.get(job.name)
+    if index is None or index.path != p.get('index'):
+        index = _tankerkoenig_indexes[job.name] = jobs.tankerkoenig.StationIndex(p.get('index'))
+    records = jobs.tankerkoenig.region(p['api_key'], [tuple(corner) for corner in p['area']], index,
+                                       p.get('rad', jobs.tankerkoenig.MAX_RADIUS))
+    return jobs.fuel.normalize('tankerkoenig', records).points('tankerkoenig', registry=_registry(job))
+
+
+_device_pollers = {}
+
+
+def execute_devices(job):
+    """
+    Properties ``model`` (module in :mod:`jobs` defining ``MODEL``), ``hosts`` (names, addresses or networks)
+    and optional ``timeout`` (seconds per host)
+    """
+    import importlib
+    import jobs.devices
+    p = job.properties
+    key = (p['model'], tuple(p['hosts']), p.get('timeout', 5.0))
+    cached_key, poller = _device_pollers.get(job.name, (None, None))
+    if poller is None or cached_key != key:
+        model = importlib.import_module('jobs.' + p['model']).MODEL
+        poller = jobs.devices.Poller(model, p['hosts'], key[2])
+        _device_pollers[job.name] = (key, poller)
+    return poller.poll()